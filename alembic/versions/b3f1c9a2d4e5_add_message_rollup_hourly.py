@@ -0,0 +1,56 @@
+"""add_message_rollup_hourly
+
+Revision ID: b3f1c9a2d4e5
+Revises: 40e799463869
+Create Date: 2026-10-17 10:12:41.318204
+
+Tables are created empty. Existing messages are not aggregated here: after
+enabling STATS_USE_ROLLUP run `make backfill-rollup` once
+(scripts/backfill_message_rollup.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9a2d4e5'
+down_revision: Union[str, Sequence[str], None] = '40e799463869'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Create message_rollup_hourly table
+    op.create_table(
+        'message_rollup_hourly',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=False),
+        sa.Column('distinct_users', sa.Integer(), nullable=False),
+        sa.Column('user_message_count', sa.Integer(), nullable=False),
+        sa.Column('assistant_message_count', sa.Integer(), nullable=False),
+        sa.Column('total_content_length', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket_start')
+    )
+
+    # Create message_rollup_hourly_users table
+    op.create_table(
+        'message_rollup_hourly_users',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('bucket_start', 'user_id')
+    )
+    op.create_index(op.f('ix_message_rollup_hourly_users_user_id'), 'message_rollup_hourly_users', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Drop message_rollup_hourly_users table
+    op.drop_index(op.f('ix_message_rollup_hourly_users_user_id'), table_name='message_rollup_hourly_users')
+    op.drop_table('message_rollup_hourly_users')
+
+    # Drop message_rollup_hourly table
+    op.drop_table('message_rollup_hourly')
@@ -0,0 +1,72 @@
+"""add_composite_partial_indexes
+
+Revision ID: c7a4e2f8b915
+Revises: b3f1c9a2d4e5
+Create Date: 2026-10-17 11:05:27.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a4e2f8b915'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c9a2d4e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built CONCURRENTLY so writes to live tables are not blocked; that is not
+    # allowed inside a transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        # History lookups: WHERE user_id = ? AND is_deleted = false ORDER BY created_at DESC LIMIT n;
+        # id also serves keyset pagination by (created_at, id)
+        op.create_index(
+            'ix_messages_user_id_created_at_id_live',
+            'messages',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = false'),
+            postgresql_concurrently=True,
+        )
+
+        # Stats range scans over live messages
+        op.create_index(
+            'ix_messages_created_at_live',
+            'messages',
+            ['created_at'],
+            unique=False,
+            postgresql_where=sa.text('is_deleted = false'),
+            postgresql_concurrently=True,
+        )
+
+        # Web chat history: WHERE session_id = ? ORDER BY created_at DESC LIMIT n (and keyset pages)
+        op.create_index(
+            'ix_chat_messages_session_id_created_at_id',
+            'chat_messages',
+            ['session_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_chat_messages_session_id_created_at_id',
+            table_name='chat_messages',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_messages_created_at_live', table_name='messages', postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_messages_user_id_created_at_id_live',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,29 @@
+"""add_rollup_users_hll
+
+Revision ID: d2e8f5a1c367
+Revises: c7a4e2f8b915
+Create Date: 2026-10-17 12:20:03.551876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2e8f5a1c367'
+down_revision: Union[str, Sequence[str], None] = 'c7a4e2f8b915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # HyperLogLog sketch of user ids per hour (filled incrementally and by backfill)
+    op.add_column('message_rollup_hourly', sa.Column('users_hll', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('message_rollup_hourly', 'users_hll')
@@ -0,0 +1,231 @@
+"""partition_messages_by_month
+
+Revision ID: e4c8a1f2b937
+Revises: d2e8f5a1c367
+Create Date: 2026-10-17 15:41:09.227583
+
+"""
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4c8a1f2b937'
+down_revision: Union[str, Sequence[str], None] = 'd2e8f5a1c367'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Future months created up front; scripts/manage_partitions.py keeps extending this
+MONTHS_AHEAD = 3
+
+# Rows written while the migration runs must still fit the legacy range, so
+# the cutover month is picked with a safety margin (also covers DB clock skew)
+CUTOVER_MARGIN = timedelta(days=1)
+
+# Give up instead of queueing application writes behind the swap
+LOCK_TIMEOUT = '10s'
+
+TABLES = {
+    'messages': {
+        'columns': """
+            id integer NOT NULL DEFAULT nextval('messages_id_seq'),
+            user_id integer NOT NULL
+                CONSTRAINT messages_user_id_fkey REFERENCES users (id) ON DELETE CASCADE,
+            role varchar(20) NOT NULL,
+            content text NOT NULL,
+            content_length integer NOT NULL,
+            created_at timestamp without time zone NOT NULL DEFAULT now(),
+            is_deleted boolean NOT NULL
+        """,
+        'column_names': 'id, user_id, role, content, content_length, created_at, is_deleted',
+        'indexes': [
+            'CREATE INDEX ix_messages_created_at ON messages (created_at)',
+            'CREATE INDEX ix_messages_is_deleted ON messages (is_deleted)',
+            'CREATE INDEX ix_messages_user_id ON messages (user_id)',
+            'CREATE INDEX ix_messages_user_id_created_at_id_live ON messages '
+            '(user_id, created_at, id) WHERE is_deleted = false',
+            'CREATE INDEX ix_messages_created_at_live ON messages (created_at) '
+            'WHERE is_deleted = false',
+        ],
+    },
+    'chat_messages': {
+        'columns': """
+            id integer NOT NULL DEFAULT nextval('chat_messages_id_seq'),
+            session_id integer NOT NULL
+                CONSTRAINT chat_messages_session_id_fkey
+                REFERENCES chat_sessions (id) ON DELETE CASCADE,
+            role varchar(20) NOT NULL,
+            content text NOT NULL,
+            mode varchar(20) NOT NULL,
+            created_at timestamp without time zone NOT NULL DEFAULT CURRENT_TIMESTAMP
+        """,
+        'column_names': 'id, session_id, role, content, mode, created_at',
+        'indexes': [
+            'CREATE INDEX ix_chat_messages_created_at ON chat_messages (created_at)',
+            'CREATE INDEX ix_chat_messages_session_id ON chat_messages (session_id)',
+            'CREATE INDEX ix_chat_messages_session_id_created_at_id ON chat_messages '
+            '(session_id, created_at, id)',
+        ],
+    },
+}
+
+
+def _month_start(value: datetime) -> datetime:
+    """First day of the month containing value."""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    """Shift the first day of a month by a number of months."""
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _index_names(table: str) -> list[str]:
+    """Names of the secondary indexes of a table."""
+    return [ddl.split()[2] for ddl in TABLES[table]['indexes']]
+
+
+def _legacy_index_name(table: str, name: str) -> str:
+    """Name of a secondary index once its table becomes the legacy partition."""
+    return name.replace(f'ix_{table}_', f'ix_{table}_legacy_', 1)
+
+
+def _cutover(table: str) -> datetime:
+    """First month stored in monthly partitions; older rows stay in {table}_legacy."""
+    bind = op.get_bind()
+    # Index-only lookup, rows dated in the future must stay inside the legacy range
+    last = bind.execute(sa.text(f'SELECT max(created_at) FROM {table}')).scalar()
+    latest = datetime.utcnow() + CUTOVER_MARGIN
+    if last is not None and last > latest:
+        latest = last
+    return _add_months(_month_start(latest), 1)
+
+
+def _prepare_legacy(table: str, cutover: datetime) -> None:
+    """Prepare a live table for ATTACH PARTITION without long locks.
+
+    Must run in an autocommit block: the unique index is built CONCURRENTLY and
+    the CHECK constraint is validated in its own transaction, which only takes
+    SHARE UPDATE EXCLUSIVE and does not block reads or writes.
+    """
+    # The partitioned primary key (id, created_at) is taken over from this index;
+    # a build interrupted by an earlier attempt leaves an invalid index behind
+    op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {table}_id_created_at_key')
+    op.execute(
+        f'CREATE UNIQUE INDEX CONCURRENTLY {table}_id_created_at_key ON {table} (id, created_at)'
+    )
+    # A validated constraint implying the partition bound lets ATTACH skip its scan
+    op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_legacy_range')
+    op.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {table}_legacy_range '
+        f"CHECK (created_at < '{cutover:%Y-%m-%d}') NOT VALID"
+    )
+    op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {table}_legacy_range')
+
+
+def _swap_in_partitioned(table: str, cutover: datetime) -> None:
+    """Put a partitioned table in place and attach the old table as its legacy partition.
+
+    Catalog-only statements: no rows are copied and no index is rebuilt, so the
+    ACCESS EXCLUSIVE locks are held for milliseconds.
+    """
+    spec = TABLES[table]
+    legacy = f'{table}_legacy'
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+    op.execute(
+        f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey, '
+        f'ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {table}_id_created_at_key'
+    )
+    for name in _index_names(table):
+        op.execute(f'ALTER INDEX {name} RENAME TO {_legacy_index_name(table, name)}')
+
+    # The partition key must be part of the primary key
+    op.execute(
+        f'CREATE TABLE {table} ({spec["columns"]}, '
+        f'CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)) '
+        f'PARTITION BY RANGE (created_at)'
+    )
+    # Instant on a table without partitions; ATTACH adopts the matching legacy indexes
+    for ddl in spec['indexes']:
+        op.execute(ddl)
+
+    op.execute(
+        f'ALTER TABLE {table} ATTACH PARTITION {legacy} '
+        f"FOR VALUES FROM (MINVALUE) TO ('{cutover:%Y-%m-%d}')"
+    )
+    op.execute(f'ALTER TABLE {legacy} DROP CONSTRAINT {table}_legacy_range')
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+    month = cutover
+    last = _add_months(_month_start(datetime.utcnow()), MONTHS_AHEAD)
+    while month <= last:
+        following = _add_months(month, 1)
+        op.execute(
+            f'CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        )
+        month = following
+    # Rows outside the monthly partitions (missed maintenance run) land here
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def _rebuild_plain(table: str) -> None:
+    """Recreate a partitioned table as a plain one and copy its rows over.
+
+    Offline: the copy runs under ACCESS EXCLUSIVE, stop writers first.
+    """
+    spec = TABLES[table]
+    old = f'{table}_old'
+
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey')
+    for name in _index_names(table):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    op.execute(
+        f'CREATE TABLE {table} ({spec["columns"]}, CONSTRAINT {table}_pkey PRIMARY KEY (id))'
+    )
+    op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+    op.execute(
+        f'INSERT INTO {table} ({spec["column_names"]}) '
+        f'SELECT {spec["column_names"]} FROM {old}'
+    )
+    op.execute(f'DROP TABLE {old} CASCADE')
+
+    for ddl in spec['indexes']:
+        op.execute(ddl)
+    op.execute(f'ANALYZE {table}')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Native partitioning is PostgreSQL-only; other backends keep plain tables
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Monthly range partitions on created_at: stats range scans prune to the
+    # months they touch and old months can be detached instead of deleted row by row.
+    # Online: existing rows are not copied, the old table becomes the
+    # partition {table}_legacy for everything before the cutover month
+    cutovers = {table: _cutover(table) for table in TABLES}
+    with op.get_context().autocommit_block():
+        for table, cutover in cutovers.items():
+            _prepare_legacy(table, cutover)
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    for table, cutover in cutovers.items():
+        _swap_in_partitioned(table, cutover)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _rebuild_plain('chat_messages')
+    _rebuild_plain('messages')
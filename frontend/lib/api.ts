@@ -2,7 +2,11 @@
  * API client для работы с TEA Statistics Mock API
  */
 
-import type { ChatMessageRequest, ChatMessageResponse } from "@/types/chat";
+import type {
+    ChatHistoryResponse,
+    ChatMessageRequest,
+    ChatMessageResponse,
+} from "@/types/chat";
 import type { APIError, Period, StatsResponse } from "@/types/stats";
 
 /**
@@ -51,8 +55,8 @@ export async function fetchStats(period: Period): Promise<StatsResponse> {
             headers: {
                 "Content-Type": "application/json",
             },
-            // Отключаем кэширование для разработки
-            cache: "no-store",
+            // Всегда ревалидируем: API отвечает 304 по ETag, если данные не менялись
+            cache: "no-cache",
         });
 
         if (!response.ok) {
@@ -169,4 +173,64 @@ export async function sendChatMessage(
     }
 }
 
+/**
+ * Получить страницу истории чата (от старых сообщений к новым)
+ *
+ * @param sessionId - UUID сессии чата
+ * @param cursor - next_cursor из предыдущей страницы (без него - первая страница)
+ * @param limit - Размер страницы
+ * @returns Promise со страницей истории
+ * @throws APIClientError при ошибке запроса
+ */
+export async function fetchChatHistory(
+    sessionId: string,
+    cursor?: string | null,
+    limit = 50
+): Promise<ChatHistoryResponse> {
+    const apiBaseUrl = getAPIBaseURL();
+    const params = new URLSearchParams({ session_id: sessionId, limit: String(limit) });
+    if (cursor) {
+        params.set("cursor", cursor);
+    }
+    const url = `${apiBaseUrl}/api/v1/chat/history?${params}`;
 
+    try {
+        const response = await fetch(url, {
+            method: "GET",
+            cache: "no-store",
+        });
+
+        if (!response.ok) {
+            const errorData: APIError = await response.json().catch(() => ({
+                detail: "Unknown error",
+            }));
+
+            throw new APIClientError(
+                `Chat history request failed: ${response.statusText}`,
+                response.status,
+                errorData
+            );
+        }
+
+        const data: ChatHistoryResponse = await response.json();
+        return data;
+    } catch (error) {
+        if (error instanceof APIClientError) {
+            throw error;
+        }
+
+        if (error instanceof TypeError) {
+            throw new APIClientError(
+                `Network error: Unable to connect to Chat API at ${apiBaseUrl}`,
+                undefined,
+                { detail: "Network error" }
+            );
+        }
+
+        throw new APIClientError(
+            `Unexpected error: ${error instanceof Error ? error.message : "Unknown error"}`,
+            undefined,
+            { detail: "Unexpected error" }
+        );
+    }
+}
@@ -24,3 +24,15 @@ export interface ChatMessageResponse {
     timestamp: string;
 }
 
+export interface ChatHistoryMessage {
+    id: number;
+    role: ChatRole;
+    content: string;
+    mode: ChatMode;
+    created_at: string;
+}
+
+export interface ChatHistoryResponse {
+    messages: ChatHistoryMessage[];
+    next_cursor: string | null;
+}
@@ -8,6 +8,11 @@
  */
 export type Period = "day" | "week" | "month";
 
+/**
+ * Шаг графика активности для произвольного диапазона
+ */
+export type Granularity = "minute" | "hour" | "day" | "week";
+
 /**
  * Направление тренда метрики
  */
@@ -90,8 +95,8 @@ export interface TopUser {
  * Полный ответ API со статистикой
  */
 export interface StatsResponse {
-    /** Период статистики */
-    period: Period;
+    /** Период статистики (custom для произвольного диапазона from/to) */
+    period: Period | "custom";
     /** Сводная статистика */
     summary: Summary;
     /** Данные для графика активности */
@@ -100,6 +105,14 @@ export interface StatsResponse {
     recent_conversations: RecentConversation[];
     /** Топ-5 наиболее активных пользователей */
     top_users: TopUser[];
+    /** Диалоги и активные пользователи оценены приближённо (HyperLogLog) */
+    is_approximate?: boolean;
+    /** Начало произвольного диапазона (ISO 8601, только для custom) */
+    range_start?: string | null;
+    /** Конец произвольного диапазона (ISO 8601, только для custom) */
+    range_end?: string | null;
+    /** Шаг графика активности (только для custom) */
+    granularity?: Granularity | null;
 }
 
 /**
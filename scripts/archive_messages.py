@@ -0,0 +1,82 @@
+"""Script to archive soft-deleted and old messages and to restore them."""
+
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import Settings
+from src.db.retention import MessageArchive, RetentionWorker
+
+
+def parse_args(settings: Settings) -> argparse.Namespace:
+    """Parse command line arguments (defaults come from settings)."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--archive-dir", default=settings.retention_archive_dir)
+    parser.add_argument("--batch-size", type=int, default=settings.retention_batch_size)
+    parser.add_argument(
+        "--pause", type=float, default=settings.retention_batch_pause_seconds,
+        help="Pause between batches in seconds",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive", help="Move messages to the archive")
+    archive.add_argument(
+        "--days", type=int, default=settings.retention_days,
+        help="Also archive messages older than N days (0 = soft-deleted only)",
+    )
+    archive.add_argument("--max-batches", type=int, default=None)
+
+    restore = commands.add_parser("restore", help="Copy archived messages back")
+    restore.add_argument("--segment", action="append", help="Segment name (repeatable)")
+    restore.add_argument("--user-id", type=int, default=None, help="users.id to restore")
+
+    commands.add_parser("list", help="List archive segments")
+
+    return parser.parse_args()
+
+
+async def run(settings: Settings, args: argparse.Namespace):
+    """Run the selected command."""
+
+    archive = MessageArchive(args.archive_dir)
+    if args.command == "list":
+        for segment in archive.segments():
+            print(
+                f"{segment.name}  rows={segment.rows}  "
+                f"{segment.min_created_at} .. {segment.max_created_at}"
+            )
+        return
+
+    engine = create_async_engine(settings.database_url)
+    async_session = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    worker = RetentionWorker(
+        session_factory=async_session,
+        archive=archive,
+        retention_days=getattr(args, "days", 0),
+        batch_size=args.batch_size,
+        pause_seconds=args.pause,
+    )
+
+    try:
+        if args.command == "archive":
+            print("[ARCHIVE] Moving soft-deleted and old messages to the archive...")
+            count = await worker.run_once(max_batches=args.max_batches)
+            print(f"[OK] Archived {count} messages to {args.archive_dir}")
+        else:
+            print("[RESTORE] Restoring messages from the archive...")
+            count = await worker.restore(segment_names=args.segment, user_id=args.user_id)
+            print(f"[OK] Restored {count} messages")
+    except Exception as e:
+        print(f"[ERROR] Failed to {args.command} messages: {e}")
+        raise
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    settings = Settings()
+    asyncio.run(run(settings, parse_args(settings)))
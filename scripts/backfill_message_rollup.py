@@ -0,0 +1,37 @@
+"""Script to rebuild hourly message rollup from the messages table."""
+
+import asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import Settings
+from src.db.rollup import backfill_rollup
+
+
+async def backfill():
+    """Rebuild message_rollup_hourly from scratch."""
+    
+    settings = Settings()
+    engine = create_async_engine(settings.database_url)
+    
+    async_session = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    
+    print("[ROLLUP] Rebuilding hourly message rollup...")
+    
+    async with async_session() as session:
+        try:
+            bucket_count = await backfill_rollup(session)
+            await session.commit()
+            print(f"[OK] Rollup rebuilt: {bucket_count} hourly buckets")
+        except Exception as e:
+            await session.rollback()
+            print(f"[ERROR] Failed to rebuild rollup: {e}")
+            raise
+    
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,193 @@
+"""Benchmark history and stats queries with and without composite/partial indexes.
+
+Creates an isolated `index_bench` schema in the database from DATABASE_URL,
+fills it with synthetic data via generate_series and compares EXPLAIN ANALYZE
+plans and latencies before and after creating the indexes from migration
+c7a4e2f8b915. The application tables are not touched.
+
+Run with (use a scratch database, 10M rows take several GB):
+    uv run python scripts/benchmark_indexes.py --rows 10000000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.config.settings import Settings
+
+SCHEMA = "index_bench"
+
+SETUP_SQL = [
+    f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE",
+    f"CREATE SCHEMA {SCHEMA}",
+    f"""
+    CREATE TABLE {SCHEMA}.messages (
+        id BIGSERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        role VARCHAR(20) NOT NULL,
+        content TEXT NOT NULL,
+        content_length INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        is_deleted BOOLEAN NOT NULL
+    )
+    """,
+    f"""
+    CREATE TABLE {SCHEMA}.chat_messages (
+        id BIGSERIAL PRIMARY KEY,
+        session_id INTEGER NOT NULL,
+        role VARCHAR(20) NOT NULL,
+        content TEXT NOT NULL,
+        mode VARCHAR(20) NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+# Индексы из начальной схемы (одноколоночные)
+BASELINE_INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.messages (user_id)",
+    f"CREATE INDEX ON {SCHEMA}.messages (created_at)",
+    f"CREATE INDEX ON {SCHEMA}.messages (is_deleted)",
+    f"CREATE INDEX ON {SCHEMA}.chat_messages (session_id)",
+    f"CREATE INDEX ON {SCHEMA}.chat_messages (created_at)",
+]
+
+# Индексы из миграции c7a4e2f8b915
+TUNED_INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.messages (user_id, created_at) WHERE is_deleted = false",
+    f"CREATE INDEX ON {SCHEMA}.messages (created_at) WHERE is_deleted = false",
+    f"CREATE INDEX ON {SCHEMA}.chat_messages (session_id, created_at)",
+]
+
+QUERIES = {
+    "get_history (last 20)": f"""
+        SELECT role, content FROM {SCHEMA}.messages
+        WHERE user_id = :user_id AND is_deleted = false
+        ORDER BY created_at DESC LIMIT 20
+    """,
+    "get_chat_history (last 20)": f"""
+        SELECT role, content FROM {SCHEMA}.chat_messages
+        WHERE session_id = :session_id
+        ORDER BY created_at DESC LIMIT 20
+    """,
+    "stats summary (day)": f"""
+        SELECT count(DISTINCT user_id), count(id) FROM {SCHEMA}.messages
+        WHERE created_at >= :day_ago AND is_deleted = false
+    """,
+    "stats chart (week)": f"""
+        SELECT date_trunc('day', created_at), count(id) FROM {SCHEMA}.messages
+        WHERE created_at >= :week_ago AND is_deleted = false
+        GROUP BY 1
+    """,
+}
+
+
+async def populate(conn: AsyncConnection, rows: int, users: int) -> None:
+    """Fill benchmark tables with synthetic append-only data over 90 days."""
+    await conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.messages (user_id, role, content, content_length, created_at, is_deleted)
+        SELECT
+            1 + (random() * (CAST(:users AS integer) - 1))::int,
+            CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+            repeat('x', 64),
+            64,
+            now() - interval '90 days' + (g * interval '90 days' / CAST(:rows AS integer)),
+            random() < 0.1
+        FROM generate_series(1, CAST(:rows AS integer)) AS g
+    """), {"rows": rows, "users": users})
+
+    chat_rows = max(rows // 10, 1)
+    await conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.chat_messages (session_id, role, content, mode, created_at)
+        SELECT
+            1 + (random() * (CAST(:sessions AS integer) - 1))::int,
+            CASE WHEN g % 2 = 0 THEN 'user' ELSE 'assistant' END,
+            repeat('x', 64),
+            'normal',
+            now() - interval '90 days' + (g * interval '90 days' / CAST(:rows AS integer))
+        FROM generate_series(1, CAST(:rows AS integer)) AS g
+    """), {"rows": chat_rows, "sessions": users})
+
+
+async def measure(conn: AsyncConnection, repeats: int) -> dict[str, tuple[str, float]]:
+    """Return the top plan node and median latency (ms) for every query."""
+    now = datetime.utcnow()
+    params = {
+        "user_id": 42,
+        "session_id": 42,
+        "day_ago": now - timedelta(days=1),
+        "week_ago": now - timedelta(days=7),
+    }
+
+    results = {}
+    for name, sql in QUERIES.items():
+        plan_result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        plan_lines = [row[0] for row in plan_result.fetchall()]
+        scan_lines = [line.strip() for line in plan_lines if "Scan" in line]
+
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            await conn.execute(text(sql), params)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        results[name] = (scan_lines[0] if scan_lines else plan_lines[0], statistics.median(timings))
+    return results
+
+
+async def run_benchmark(rows: int, users: int, repeats: int, keep: bool) -> None:
+    """Run the benchmark and print a before/after comparison."""
+    settings = Settings()
+    engine = create_async_engine(settings.database_url)
+
+    async with engine.begin() as conn:
+        print(f"[BENCH] Creating {SCHEMA} schema with {rows} messages, {users} users...")
+        for sql in SETUP_SQL:
+            await conn.execute(text(sql))
+        await populate(conn, rows, users)
+        for sql in BASELINE_INDEXES:
+            await conn.execute(text(sql))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.messages"))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.chat_messages"))
+
+    async with engine.connect() as conn:
+        before = await measure(conn, repeats)
+
+    async with engine.begin() as conn:
+        print("[BENCH] Creating composite/partial indexes...")
+        for sql in TUNED_INDEXES:
+            await conn.execute(text(sql))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.messages"))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.chat_messages"))
+
+    async with engine.connect() as conn:
+        after = await measure(conn, repeats)
+
+    for name in QUERIES:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f"\n[{name}]")
+        print(f"  before: {ms_before:9.2f} ms  {plan_before}")
+        print(f"  after:  {ms_after:9.2f} ms  {plan_after}")
+
+    if not keep:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Number of messages")
+    parser.add_argument("--users", type=int, default=10_000, help="Number of distinct users")
+    parser.add_argument("--repeats", type=int, default=20, help="Runs per query")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark schema")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.rows, args.users, args.repeats, args.keep))
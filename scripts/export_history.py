@@ -0,0 +1,57 @@
+"""Script to export a long conversation history as JSON lines, page by page."""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import Settings
+from src.db.pagination import MAX_PAGE_SIZE
+from src.db.repository import ChatRepository, MessageRepository
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    user = commands.add_parser("user", help="Telegram bot history of a user")
+    user.add_argument("telegram_id", type=int)
+
+    chat = commands.add_parser("chat", help="Web chat history of a session")
+    chat.add_argument("session_id")
+
+    return parser.parse_args()
+
+
+async def export(settings: Settings, args: argparse.Namespace):
+    """Write messages oldest-first to stdout, one JSON object per line."""
+
+    engine = create_async_engine(settings.database_url)
+    async_session = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    count = 0
+    async with async_session() as session:
+        if args.command == "user":
+            messages = MessageRepository(session).iter_history(args.telegram_id, args.page_size)
+        else:
+            messages = ChatRepository(session).iter_chat_history(args.session_id, args.page_size)
+
+        # Keyset pages: only one page is held in memory at a time
+        async for message in messages:
+            print(json.dumps(message, ensure_ascii=False, default=str))
+            count += 1
+
+    print(f"[OK] Exported {count} messages", file=sys.stderr)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    settings = Settings()
+    asyncio.run(export(settings, parse_args()))
@@ -0,0 +1,68 @@
+"""Script to maintain monthly partitions of messages and chat_messages."""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings import Settings
+from src.db.partitions import DEFAULT_MONTHS_AHEAD, detach_partitions_before, ensure_partitions
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Create partitions for upcoming months")
+    create.add_argument(
+        "--months-ahead",
+        type=int,
+        default=DEFAULT_MONTHS_AHEAD,
+        help=f"Number of future months to create (default: {DEFAULT_MONTHS_AHEAD})",
+    )
+
+    detach = commands.add_parser("detach", help="Detach monthly partitions older than a month")
+    detach.add_argument(
+        "--before",
+        type=lambda value: datetime.strptime(value, "%Y-%m"),
+        required=True,
+        help="First month to keep attached, YYYY-MM",
+    )
+
+    return parser.parse_args()
+
+
+async def manage(args: argparse.Namespace):
+    """Create or detach partitions in one transaction."""
+
+    settings = Settings()
+    engine = create_async_engine(settings.database_url)
+
+    async_session = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+    async with async_session() as session:
+        try:
+            if args.command == "create":
+                names = await ensure_partitions(session, months_ahead=args.months_ahead)
+                print(f"[OK] Created {len(names)} partitions: {', '.join(names) or '-'}")
+            else:
+                names = await detach_partitions_before(session, args.before)
+                print(f"[OK] Detached {len(names)} partitions: {', '.join(names) or '-'}")
+                if names:
+                    print("[INFO] Archive and DROP the detached tables when no longer needed")
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            print(f"[ERROR] Failed to {args.command} partitions: {e}")
+            raise
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(manage(parse_args()))
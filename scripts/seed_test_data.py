@@ -8,6 +8,8 @@ from sqlalchemy.orm import sessionmaker
 
 from src.db.models import Base, User, Message
 from src.config.settings import Settings
+from src.db.database import is_sqlite_url
+from src.db.rollup import backfill_rollup
 
 
 async def seed_test_data():
@@ -21,6 +23,12 @@ async def seed_test_data():
         engine, class_=AsyncSession, expire_on_commit=False
     )
     
+    if is_sqlite_url(settings.database_url):
+        # Local SQLite profile has no Alembic migrations: create schema from models
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        print("[OK] Created SQLite schema")
+
     print("[SEED] Seeding test data...")
     
     async with async_session() as session:
@@ -134,6 +142,11 @@ async def seed_test_data():
             await session.commit()
             print(f"[OK] Created {total_messages} test messages over 30 days")
             
+            # Rebuild hourly rollup for statistics
+            bucket_count = await backfill_rollup(session)
+            await session.commit()
+            print(f"[OK] Rebuilt message rollup: {bucket_count} hourly buckets")
+            
             # Print summary
             print("\n[SUMMARY] Test Data Summary:")
             print(f"   Users: {len(users)}")
@@ -3,11 +3,21 @@
 import logging
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 
-from src.api.dependencies import get_chat_handler, get_chat_repository
-from src.api.models import ChatMessageRequest, ChatMessageResponse
+from src.api.dependencies import (
+    get_chat_handler,
+    get_chat_history_repository,
+    get_chat_repository,
+)
+from src.api.models import (
+    ChatHistoryMessage,
+    ChatHistoryResponse,
+    ChatMessageRequest,
+    ChatMessageResponse,
+)
 from src.chat.chat_handler import ChatHandler
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, HistoryCursor
 from src.db.repository import ChatRepository
 
 logger = logging.getLogger(__name__)
@@ -82,15 +92,8 @@ async def send_chat_message(
             limit=20  # Last 20 messages
         )
         logger.debug(f"Retrieved {len(history)} messages from history")
-        
-        # Save user message to database
-        await chat_repo.add_chat_message(
-            session_id=request.session_id,
-            role="user",
-            content=request.message,
-            mode=request.mode,
-        )
-        logger.debug("Saved user message to database")
+        # Завершаем транзакцию чтения: соединение не держится во время запроса к LLM
+        await chat_repo.session.commit()
         
         # Process message through handler
         response_text = await chat_handler.handle_message(
@@ -99,14 +102,14 @@ async def send_chat_message(
             history=history,
         )
         
-        # Save assistant response to database
-        await chat_repo.add_chat_message(
+        # Save user message and assistant response in one INSERT
+        await chat_repo.add_chat_turn(
             session_id=request.session_id,
-            role="assistant",
-            content=response_text,
+            user_content=request.message,
+            assistant_content=response_text,
             mode=request.mode,
         )
-        logger.debug("Saved assistant response to database")
+        logger.debug("Saved user message and assistant response to database")
         
         logger.info(f"Successfully processed chat message: response_length={len(response_text)}")
         
@@ -129,3 +132,67 @@ async def send_chat_message(
             detail="An error occurred while processing your message. Please try again."
         )
 
+
+
+@router.get(
+    "/chat/history",
+    response_model=ChatHistoryResponse,
+    summary="Get chat history page",
+    description="""
+    Page through the chat history of a session from the oldest message to the newest.
+
+    Pagination is keyset-based on (created_at, id): pass `next_cursor` from the
+    previous response as `cursor` to get the next page. Latency does not depend
+    on page depth. `next_cursor` is null on the last page.
+    """,
+    responses={
+        400: {
+            "description": "Invalid cursor",
+        },
+        500: {
+            "description": "Internal server error (database error, etc.)",
+        }
+    }
+)
+async def get_chat_history(
+    session_id: str = Query(..., min_length=1, description="UUID сессии чата"),
+    cursor: str | None = Query(default=None, description="Курсор из предыдущей страницы"),
+    limit: int = Query(
+        default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Размер страницы"
+    ),
+    chat_repo: ChatRepository = Depends(get_chat_history_repository),
+) -> ChatHistoryResponse:
+    """
+    Get one page of chat history.
+
+    Args:
+        session_id: Chat session UUID
+        cursor: Opaque cursor from the previous page
+        limit: Page size
+        chat_repo: Injected chat repository
+
+    Returns:
+        ChatHistoryResponse: Messages and the cursor of the next page
+
+    Raises:
+        HTTPException: 400 if cursor is invalid, 500 if reading fails
+    """
+    try:
+        position = HistoryCursor.decode(cursor) if cursor is not None else None
+    except ValueError as e:
+        logger.warning(f"Invalid chat history cursor: {e}")
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        page = await chat_repo.get_chat_history_page(session_id, position, limit)
+    except Exception as e:
+        logger.error(f"Error reading chat history: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="An error occurred while reading chat history. Please try again."
+        ) from e
+
+    return ChatHistoryResponse(
+        messages=[ChatHistoryMessage(**message) for message in page.messages],
+        next_cursor=page.next_cursor.encode() if page.next_cursor is not None else None,
+    )
@@ -1,45 +1,151 @@
 """Dependency injection for FastAPI."""
 
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
 from functools import lru_cache
 
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.api.models import StatsResponse
 from src.chat.admin_handler import AdminHandler
 from src.chat.chat_handler import ChatHandler
 from src.config.settings import Settings
 from src.db import get_session
+from src.db.database import get_read_session_factory, get_session_factory
 from src.db.repository import ChatRepository
 from src.llm.llm_client import LLMClient
+from src.stats.cached_collector import CachedStatCollector
 from src.stats.collector import StatCollector
 from src.stats.real_collector import RealStatCollector
+from src.stats.snapshot_worker import StatsSnapshotWorker
+
+
+async def _get_stats_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Фабрика сессий для статистики: реплика (db_replica_stats_reads) или основная БД."""
+    session_factory: async_sessionmaker[AsyncSession]
+    if get_settings().db_replica_stats_reads:
+        session_factory = await get_read_session_factory()
+    else:
+        session_factory = get_session_factory()
+    return session_factory
+
+
+def _create_real_collector(
+    session: AsyncSession, session_factory: async_sessionmaker[AsyncSession]
+) -> RealStatCollector:
+    """Создаёт RealStatCollector с настройками из Settings."""
+    settings = get_settings()
+
+    return RealStatCollector(
+        session,
+        session_factory=session_factory if settings.stats_parallel_enabled else None,
+        max_concurrency=settings.stats_max_concurrency,
+        use_rollup=settings.stats_use_rollup,
+        approximate_users=settings.stats_approximate_users,
+    )
+
+
+async def compute_stats(period: str) -> StatsResponse:
+    """Вычисляет статистику за период в отдельной сессии (для кэша и снапшотов)."""
+    session_factory = await _get_stats_session_factory()
+    async with session_factory() as session:
+        return await _create_real_collector(session, session_factory).get_stats(period)
+
+
+async def compute_range_stats(
+    start: datetime, end: datetime, granularity: str | None
+) -> StatsResponse:
+    """Вычисляет статистику за произвольный диапазон в отдельной сессии (без кэша)."""
+    settings = get_settings()
+    session_factory = await _get_stats_session_factory()
+    async with session_factory() as session:
+        return await _create_real_collector(session, session_factory).get_stats_for_range(
+            start, end, granularity, max_buckets=settings.stats_max_chart_buckets
+        )
+
 
+async def compute_stats_version(period: str) -> str:
+    """Получает версию данных периода для ETag в отдельной короткой сессии."""
+    session_factory = await _get_stats_session_factory()
+    async with session_factory() as session:
+        version: str = await RealStatCollector(session).get_data_version(period)
+    return version
 
-async def get_stat_collector():
+
+class _SessionPerCallStatCollector:
+    """StatCollector, который берёт соединение с БД только на время get_stats."""
+
+    async def get_stats(self, period: str) -> StatsResponse:
+        """Вычисляет статистику за период в отдельной короткой сессии."""
+        return await compute_stats(period)
+
+
+async def get_stat_collector() -> AsyncIterator[StatCollector]:
     """Возвращает экземпляр StatCollector с подключением к БД.
-    
+
     Использует RealStatCollector для получения реальных данных из БД.
-    
+    При включённом stats_parallel_enabled секции собираются параллельно
+    в отдельных сессиях (не более stats_max_concurrency соединений).
+    При stats_cache_ttl_seconds > 0 возвращается общий кэширующий коллектор,
+    и соединение с БД берётся только при пересчёте.
+    При настроенной реплике и db_replica_stats_reads запросы идут на реплику,
+    пока её отставание допустимо.
+
     Yields:
         StatCollector: Экземпляр сборщика статистики
     """
-    async for session in get_session():
-        yield RealStatCollector(session)
+    if get_settings().stats_cache_ttl_seconds > 0:
+        yield get_stats_cache()
+        return
 
+    session_factory = await _get_stats_session_factory()
+    async with session_factory() as session:
+        yield _create_real_collector(session, session_factory)
 
-@lru_cache()
+
+@lru_cache
 def get_settings() -> Settings:
     """
     Get application settings (cached).
-    
+
     Returns:
         Settings: Application configuration
     """
     return Settings()
 
 
-@lru_cache()
+@lru_cache
+def get_stats_cache() -> CachedStatCollector:
+    """
+    Get process-wide statistics cache (cached).
+
+    Returns:
+        CachedStatCollector: Cache shared by stats API and admin chat
+    """
+    settings = get_settings()
+    return CachedStatCollector(
+        loader=compute_stats,
+        ttl_seconds=settings.stats_cache_ttl_seconds,
+        stale_seconds=settings.stats_cache_stale_seconds,
+    )
+
+
+def get_stats_snapshots(request: Request) -> StatsSnapshotWorker | None:
+    """
+    Get background stats snapshot worker, if enabled.
+
+    Returns:
+        StatsSnapshotWorker | None: Worker started in the application lifespan
+    """
+    return getattr(request.app.state, "stats_snapshots", None)
+
+
+@lru_cache
 def get_llm_client() -> LLMClient:
     """
     Get LLM client instance (cached).
-    
+
     Returns:
         LLMClient: Configured LLM client
     """
@@ -48,36 +154,70 @@ def get_llm_client() -> LLMClient:
         api_key=settings.openrouter_api_key,
         model=settings.openrouter_model,
         timeout=settings.llm_timeout,
+        first_token_timeout=settings.llm_first_token_timeout,
         system_prompt_path="prompts/system_prompt.txt",
     )
 
 
-async def get_chat_handler():
+def get_chat_handler() -> ChatHandler:
     """
     Get chat handler instance with dependencies.
-    
-    Yields:
+
+    The chat request does not hold a database connection for the statistics
+    collector: with the stats cache off, a session is opened only while an
+    admin-mode query reads statistics, not during the LLM call.
+
+    Returns:
         ChatHandler: Configured chat message handler
     """
-    llm_client = get_llm_client()
-    
-    async for stat_collector in get_stat_collector():
-        admin_handler = AdminHandler(stat_collector=stat_collector)
-        
-        yield ChatHandler(
-            llm_client=llm_client,
-            admin_handler=admin_handler,
-            max_history_messages=20,
-        )
+    stat_collector: StatCollector
+    if get_settings().stats_cache_ttl_seconds > 0:
+        stat_collector = get_stats_cache()
+    else:
+        stat_collector = _SessionPerCallStatCollector()
+
+    return ChatHandler(
+        llm_client=get_llm_client(),
+        admin_handler=AdminHandler(stat_collector=stat_collector),
+        max_history_messages=20,
+    )
 
 
-async def get_chat_repository():
+async def get_chat_repository(request: Request) -> AsyncIterator[ChatRepository]:
     """
     Get chat repository with database session.
-    
+
+    Uses the write-behind queue from the application lifespan, if enabled.
+
     Yields:
         ChatRepository: Repository for chat operations
     """
+    write_behind = getattr(request.app.state, "write_behind", None)
+    last_active_interval = timedelta(
+        seconds=get_settings().chat_session_last_active_interval_seconds
+    )
     async for session in get_session():
-        yield ChatRepository(session)
+        yield ChatRepository(
+            session, write_behind=write_behind, last_active_interval=last_active_interval
+        )
+
+
+async def get_chat_history_repository(request: Request) -> AsyncIterator[ChatRepository]:
+    """
+    Get chat repository for paginated history reads.
+
+    With a read replica configured and db_replica_history_reads enabled,
+    the session comes from the replica while its lag is acceptable, so the
+    newest messages may appear on the next page request after the lag.
+
+    Yields:
+        ChatRepository: Repository for chat history reads
+    """
+    write_behind = getattr(request.app.state, "write_behind", None)
+    if get_settings().db_replica_history_reads:
+        session_factory = await get_read_session_factory()
+    else:
+        session_factory = get_session_factory()
 
+    async with session_factory() as session:
+        yield ChatRepository(session, write_behind=write_behind)
@@ -103,7 +103,9 @@ class TopUser(BaseModel):
 class StatsResponse(BaseModel):
     """Полный ответ со статистикой."""
 
-    period: Literal["day", "week", "month"] = Field(..., description="Запрошенный период")
+    period: Literal["day", "week", "month", "custom"] = Field(
+        ..., description="Запрошенный период (custom для произвольного диапазона)"
+    )
     summary: Summary = Field(..., description="Сводная статистика")
     activity_chart: ActivityChart = Field(..., description="Данные для графика активности")
     recent_conversations: list[RecentConversation] = Field(
@@ -116,6 +118,19 @@ class StatsResponse(BaseModel):
         max_length=5,
         description="Топ-5 наиболее активных пользователей"
     )
+    is_approximate: bool = Field(
+        default=False,
+        description="Количество диалогов и активных пользователей оценено приближённо (HyperLogLog)"
+    )
+    range_start: datetime | None = Field(
+        default=None, description="Начало произвольного диапазона (только для custom)"
+    )
+    range_end: datetime | None = Field(
+        default=None, description="Конец произвольного диапазона (только для custom)"
+    )
+    granularity: Literal["minute", "hour", "day", "week"] | None = Field(
+        default=None, description="Шаг графика активности (только для custom)"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -153,7 +168,8 @@ class StatsResponse(BaseModel):
                         "values": [23, 45, 67]
                     },
                     "recent_conversations": [],
-                    "top_users": []
+                    "top_users": [],
+                    "is_approximate": False
                 }
             ]
         }
@@ -206,3 +222,43 @@ class ChatMessageResponse(BaseModel):
             ]
         }
     }
+
+
+class ChatHistoryMessage(BaseModel):
+    """Сообщение в истории чата."""
+
+    id: int = Field(..., description="ID сообщения")
+    role: str = Field(..., description="Роль отправителя (user или assistant)")
+    content: str = Field(..., description="Текст сообщения")
+    mode: str = Field(..., description="Режим чата (normal или admin)")
+    created_at: datetime = Field(..., description="Время сообщения")
+
+
+class ChatHistoryResponse(BaseModel):
+    """Страница истории чата (keyset-пагинация)."""
+
+    messages: list[ChatHistoryMessage] = Field(
+        ..., description="Сообщения в хронологическом порядке"
+    )
+    next_cursor: str | None = Field(
+        default=None, description="Курсор следующей страницы (null на последней)"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "messages": [
+                        {
+                            "id": 101,
+                            "role": "user",
+                            "content": "Привет! Расскажи о себе",
+                            "mode": "normal",
+                            "created_at": "2025-10-17T16:30:00Z"
+                        }
+                    ],
+                    "next_cursor": "MjAyNS0xMC0xN1QxNjozMDowMHwxMDE"
+                }
+            ]
+        }
+    }
@@ -1,9 +1,24 @@
 """FastAPI routes for statistics API."""
 
-from fastapi import APIRouter, HTTPException, Depends, Query
+import hashlib
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+
+from src.api.dependencies import (
+    compute_range_stats,
+    compute_stats_version,
+    get_settings,
+    get_stat_collector,
+    get_stats_snapshots,
+)
 from src.api.models import StatsResponse
-from src.api.dependencies import get_stat_collector
+from src.config.settings import Settings
 from src.stats.collector import StatCollector
+from src.stats.snapshot_worker import StatsSnapshotWorker
+
+# Заголовок с возрастом предвычисленного снапшота в секундах
+SNAPSHOT_AGE_HEADER = "X-Stats-Snapshot-Age"
 
 router = APIRouter(prefix="/api/v1", tags=["statistics"])
 
@@ -14,17 +29,23 @@ router = APIRouter(prefix="/api/v1", tags=["statistics"])
     summary="Get conversation statistics",
     description="""
     Получить статистику диалогов за указанный период.
-    
+
     Возвращает:
     - Сводные метрики (всего диалогов, активные пользователи, средняя длина, рост)
     - Данные для графика активности
     - Список последних диалогов
     - Топ-5 наиболее активных пользователей
-    
+
     Периоды:
     - **day**: последние 24 часа (данные по часам)
     - **week**: последние 7 дней (данные по дням)
     - **month**: последние 30 дней (данные по дням)
+
+    Произвольный диапазон: вместо period передаются **from** и **to**
+    (по умолчанию — текущий момент) и, опционально, **granularity**
+    (minute, hour, day, week). Без granularity выбирается самый мелкий шаг,
+    при котором количество интервалов графика не превышает
+    STATS_MAX_CHART_BUCKETS. Такие ответы не кэшируются.
     """,
     responses={
         200: {
@@ -84,8 +105,11 @@ router = APIRouter(prefix="/api/v1", tags=["statistics"])
                 }
             }
         },
+        304: {
+            "description": "Statistics not modified since the ETag sent in If-None-Match",
+        },
         400: {
-            "description": "Invalid period parameter",
+            "description": "Invalid period, range or granularity parameters",
             "content": {
                 "application/json": {
                     "example": {"detail": "Invalid period: invalid. Must be 'day', 'week', or 'month'"}
@@ -95,29 +119,138 @@ router = APIRouter(prefix="/api/v1", tags=["statistics"])
     }
 )
 async def get_stats(
-    period: str = Query(
-        ...,
+    response: Response,
+    period: str | None = Query(
+        None,
         description="Time period for statistics",
         pattern="^(day|week|month)$",
         examples=["day", "week", "month"]
     ),
-    collector: StatCollector = Depends(get_stat_collector)
-) -> StatsResponse:
+    range_from: datetime | None = Query(
+        None,
+        alias="from",
+        description="Start of a custom range (ISO 8601, UTC if no offset)",
+    ),
+    range_to: datetime | None = Query(
+        None,
+        alias="to",
+        description="End of a custom range, exclusive (ISO 8601, defaults to now)",
+    ),
+    granularity: str | None = Query(
+        None,
+        description="Activity chart step for a custom range",
+        pattern="^(minute|hour|day|week)$",
+        examples=["minute", "hour", "day", "week"]
+    ),
+    if_none_match: str | None = Header(default=None),
+    collector: StatCollector = Depends(get_stat_collector),
+    snapshots: StatsSnapshotWorker | None = Depends(get_stats_snapshots),
+    settings: Settings = Depends(get_settings),
+) -> StatsResponse | Response:
     """
     Endpoint для получения статистики диалогов.
-    
+
+    Если включён фоновый пересчёт, отдаёт готовый JSON-снапшот
+    и его возраст в заголовке X-Stats-Snapshot-Age.
+
+    Поддерживает conditional GET: ответ помечается ETag, и при совпадении
+    If-None-Match возвращается 304 без тела. Для снапшотов и кэша ETag
+    считается по отдаваемому JSON, без кэша — по дешёвой версии данных
+    (без пересчёта статистики).
+
     Args:
+        response: Ответ FastAPI (для заголовков)
         period: Период для статистики (day, week, month)
+        range_from: Начало произвольного диапазона (вместо period)
+        range_to: Конец произвольного диапазона (None = сейчас)
+        granularity: Шаг графика для произвольного диапазона
+        if_none_match: Заголовок If-None-Match от клиента
         collector: Инжектируемый сборщик статистики
-        
+        snapshots: Фоновый воркер снапшотов (None если выключен)
+        settings: Настройки приложения
+
     Returns:
         StatsResponse: Полные данные статистики
-        
+
     Raises:
-        HTTPException: 400 если передан невалидный период
+        HTTPException: 400 если передан невалидный период или диапазон
     """
+    if range_from is not None:
+        if period is not None:
+            raise HTTPException(status_code=400, detail="Use either 'period' or 'from'/'to'")
+        start = _to_naive_utc(range_from)
+        end = _to_naive_utc(range_to) if range_to is not None else datetime.utcnow()
+        try:
+            return await compute_range_stats(start, end, granularity)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if range_to is not None or granularity is not None:
+        raise HTTPException(status_code=400, detail="'to' and 'granularity' require 'from'")
+    if period is None:
+        raise HTTPException(status_code=400, detail="Either 'period' or 'from' is required")
+
+    if snapshots is not None:
+        snapshot = snapshots.get_snapshot(period)
+        if snapshot is not None:
+            body, age = snapshot
+            headers = {SNAPSHOT_AGE_HEADER: str(int(age))}
+            return _body_response(body, headers, if_none_match, settings.stats_etag_enabled)
+
     try:
+        if not settings.stats_etag_enabled:
+            return await collector.get_stats(period)
+
+        if settings.stats_cache_ttl_seconds > 0:
+            # Кэш может отдавать ответ старше данных в БД: ETag считается
+            # по отдаваемым байтам, как у снапшотов, а не по версии данных
+            stats = await collector.get_stats(period)
+            body = stats.model_dump_json().encode("utf-8")
+            return _body_response(body, {}, if_none_match, etag_enabled=True)
+
+        version = await compute_stats_version(period)
+        etag = f'W/"{hashlib.sha1(version.encode("utf-8")).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
         return await collector.get_stats(period)
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def _body_response(
+    body: bytes, headers: dict[str, str], if_none_match: str | None, etag_enabled: bool
+) -> Response:
+    """Отдаёт готовый JSON; с etag_enabled помечает его ETag от самих байтов.
+
+    Совпадение If-None-Match с ETag даёт 304 без тела.
+    """
+    headers = {**headers, "Cache-Control": "no-cache"}
+    if etag_enabled:
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        headers["ETag"] = etag
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """Приводит время к naive UTC, в котором хранятся created_at в БД."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Проверяет If-None-Match по слабому сравнению ETag (RFC 9110)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    def strip_weak(tag: str) -> str:
+        return tag.strip().removeprefix("W/")
 
+    return any(strip_weak(tag) == strip_weak(etag) for tag in if_none_match.split(","))
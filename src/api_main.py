@@ -8,14 +8,27 @@ Run with:
 """
 
 from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.chat_api import router as chat_router
+from src.api.dependencies import compute_stats
 from src.api.stats_api import router as stats_router
 from src.config.settings import Settings
-from src.db.database import init_db
+from src.db.database import (
+    create_tables,
+    get_pool_stats,
+    get_replica_stats,
+    get_session_factory,
+    init_db,
+    is_sqlite_url,
+)
+from src.db.retention import MessageArchive, RetentionWorker
+from src.db.write_behind import WriteBehindQueue, persist_turns
+from src.stats.snapshot_worker import StatsSnapshotWorker
 
 
 @asynccontextmanager
@@ -23,10 +36,77 @@ async def lifespan(app: FastAPI):
     """Initialize database connection on startup."""
     # Startup
     settings = Settings()
-    init_db(settings.database_url)
+    init_db(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        statement_cache_size=settings.db_statement_cache_size,
+        prepared_statement_cache_size=settings.db_prepared_statement_cache_size,
+        replica_url=settings.database_replica_url,
+        replica_max_lag_seconds=settings.db_replica_max_lag_seconds,
+        replica_check_interval_seconds=settings.db_replica_check_interval_seconds,
+        replica_check_timeout_seconds=settings.db_replica_check_timeout_seconds,
+    )
+    if is_sqlite_url(settings.database_url):
+        # Local SQLite profile: schema from models, Alembic migrations target PostgreSQL
+        await create_tables()
     print(f"[OK] Database initialized: {settings.database_url.split('@')[0]}@***")
+    if settings.database_replica_url:
+        print(
+            f"[OK] Read replica initialized: "
+            f"{settings.database_replica_url.split('@')[0]}@***"
+        )
+
+    snapshot_worker = None
+    if settings.stats_snapshot_enabled:
+        snapshot_worker = StatsSnapshotWorker(
+            loader=compute_stats,
+            interval_seconds=settings.stats_snapshot_interval_seconds,
+            jitter_seconds=settings.stats_snapshot_jitter_seconds,
+            max_age_seconds=settings.stats_snapshot_max_age_seconds,
+        )
+        snapshot_worker.start()
+        app.state.stats_snapshots = snapshot_worker
+        print("[OK] Stats snapshot worker started")
+
+    write_behind = None
+    if settings.write_behind_enabled:
+        write_behind = WriteBehindQueue(
+            writer=partial(persist_turns, get_session_factory()),
+            max_size=settings.write_behind_max_queue_size,
+            batch_size=settings.write_behind_batch_size,
+            flush_interval_seconds=settings.write_behind_flush_interval_seconds,
+            spool_path=settings.write_behind_spool_path,
+            max_replay_attempts=settings.write_behind_max_replay_attempts,
+        )
+        write_behind.start()
+        app.state.write_behind = write_behind
+        print("[OK] Write-behind queue started")
+
+    retention_worker = None
+    if settings.retention_enabled:
+        retention_worker = RetentionWorker(
+            session_factory=get_session_factory(),
+            archive=MessageArchive(settings.retention_archive_dir),
+            retention_days=settings.retention_days,
+            batch_size=settings.retention_batch_size,
+            pause_seconds=settings.retention_batch_pause_seconds,
+            interval_seconds=settings.retention_interval_seconds,
+        )
+        retention_worker.start()
+        print("[OK] Retention worker started")
+
     yield
     # Cleanup
+    if retention_worker is not None:
+        await retention_worker.stop()
+    if write_behind is not None:
+        await write_behind.stop()
+    if snapshot_worker is not None:
+        await snapshot_worker.stop()
     print("[OK] Application shutdown")
 
 # Create FastAPI application
@@ -83,10 +163,14 @@ async def root():
 
 
 @app.get("/health", tags=["health"])
-async def health_check():
+async def health_check(request: Request) -> dict[str, Any]:
     """Detailed health check."""
+    write_behind = getattr(request.app.state, "write_behind", None)
     return {
         "status": "healthy",
+        "write_behind": write_behind.get_stats() if write_behind is not None else None,
+        "db_pool": get_pool_stats(),
+        "db_replica": get_replica_stats(),
         "service": "TEA API",
         "version": "1.1.0",
         "sprint": "F4",
@@ -8,6 +8,10 @@ from aiogram import types
 from src.db import MessageRepository, get_session
 
 if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from src.db.history_cache import HistoryCache
+    from src.db.write_behind import WriteBehindQueue
     from src.llm.llm_client import LLMClient
 
 logger = logging.getLogger(__name__)
@@ -25,6 +29,9 @@ class MessageHandler:
         self,
         llm_client: "LLMClient",
         max_history_messages: int = 20,
+        history_cache: "HistoryCache | None" = None,
+        write_behind: "WriteBehindQueue | None" = None,
+        maintain_rollup: bool = False,
     ) -> None:
         """
         Инициализация обработчика.
@@ -32,11 +39,26 @@ class MessageHandler:
         Args:
             llm_client: Клиент для работы с LLM (обязательный)
             max_history_messages: Максимальное количество сообщений в истории
+            history_cache: Кэш истории перед БД (None = всегда читать из БД)
+            write_behind: Очередь отложенной записи ходов (None = писать до ответа)
+            maintain_rollup: Обновлять почасовой агрегат статистики при записи
         """
         self.llm_client = llm_client
         self.max_history_messages = max_history_messages
+        self.history_cache = history_cache
+        self.write_behind = write_behind
+        self.maintain_rollup = maintain_rollup
         logger.info("MessageHandler initialized")
 
+    def _create_repository(self, session: "AsyncSession") -> MessageRepository:
+        """Создать repository с кэшем, очередью и настройкой агрегата обработчика."""
+        return MessageRepository(
+            session,
+            history_cache=self.history_cache,
+            write_behind=self.write_behind,
+            maintain_rollup=self.maintain_rollup,
+        )
+
     def _split_message(self, text: str, max_length: int) -> list[str]:
         """
         Разбить длинное сообщение на части для отправки в Telegram.
@@ -220,7 +242,7 @@ class MessageHandler:
 
         try:
             async for session in get_session():
-                repository = MessageRepository(session)
+                repository = self._create_repository(session)
                 count = await repository.clear_history(user_id)
 
             if count > 0:
@@ -263,20 +285,21 @@ class MessageHandler:
         logger.info(f"Received message from user {user_id}: {text}")
 
         try:
-            # Получаем историю диалога из БД
+            # Короткая транзакция чтения: соединение возвращается в пул до запроса к LLM
             async for session in get_session():
-                repository = MessageRepository(session)
+                repository = self._create_repository(session)
                 history = await repository.get_history(user_id, limit=self.max_history_messages)
-                logger.info(f"Retrieved history for user {user_id}: {len(history)} messages")
+            logger.info(f"Retrieved history for user {user_id}: {len(history)} messages")
 
-                # Отправляем запрос в LLM с историей
-                logger.info("Sending user message to LLM")
-                response = await self.llm_client.get_response(text, history=history)
+            # Запрос к LLM (до llm_timeout секунд) не держит соединение с БД
+            logger.info("Sending user message to LLM")
+            response = await self.llm_client.get_response(text, history=history)
 
-                # Сохраняем пару вопрос-ответ в историю
-                await repository.add_message(user_id, "user", text, username=username)
-                await repository.add_message(user_id, "assistant", response, username=username)
-                logger.info(f"Saved user-assistant pair to history for user {user_id}")
+            # Короткая транзакция записи: пара вопрос-ответ одним INSERT
+            async for session in get_session():
+                repository = self._create_repository(session)
+                await repository.add_turn(user_id, text, response, username=username)
+            logger.info(f"Saved user-assistant pair to history for user {user_id}")
 
             # Разбиваем длинные ответы на части (лимит Telegram: 4096 символов)
             max_length = 4000  # Оставляем запас
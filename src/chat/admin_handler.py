@@ -104,8 +104,8 @@ class AdminHandler:
             f"-- Пример SQL запроса для получения этих данных:\n"
             f"SELECT COUNT(DISTINCT user_id) as total_conversations\n"
             f"FROM messages\n"
-            f"WHERE created_at >= datetime('now', '-{self._get_period_days(period)} days')\n"
-            f"  AND is_deleted = 0;\n"
+            f"WHERE created_at >= now() - interval '{self._get_period_days(period)} days'\n"
+            f"  AND is_deleted = false;\n"
             f"```"
         )
 
@@ -139,8 +139,8 @@ class AdminHandler:
             f"SELECT COUNT(DISTINCT telegram_id) as active_users\n"
             f"FROM users u\n"
             f"JOIN messages m ON u.id = m.user_id\n"
-            f"WHERE m.created_at >= datetime('now', '-{self._get_period_days(period)} days')\n"
-            f"  AND m.is_deleted = 0;\n"
+            f"WHERE m.created_at >= now() - interval '{self._get_period_days(period)} days'\n"
+            f"  AND m.is_deleted = false;\n"
             f"```"
         )
 
@@ -32,6 +32,11 @@ class Settings(BaseSettings):
         default=20, description="Максимальное количество сообщений в истории диалога"
     )
     llm_timeout: int = Field(default=30, description="Таймаут запроса к LLM в секундах")
+    llm_first_token_timeout: float | None = Field(
+        default=None,
+        gt=0,
+        description="Таймаут до первого токена потокового ответа LLM (пусто = только llm_timeout)",
+    )
     log_level: str = Field(
         default="INFO", description="Уровень логирования (DEBUG, INFO, WARNING, ERROR)"
     )
@@ -39,6 +44,183 @@ class Settings(BaseSettings):
         default=4000, description="Максимальная длина сообщения Telegram (с запасом от 4096)"
     )
 
+    # Database connection pool (задаётся отдельно для процессов бота и API)
+    db_pool_size: int = Field(default=5, ge=1, description="Постоянных соединений в пуле")
+    db_max_overflow: int = Field(
+        default=10, ge=0, description="Дополнительных соединений сверх db_pool_size"
+    )
+    db_pool_timeout_seconds: float = Field(
+        default=30.0, gt=0, description="Максимальное ожидание свободного соединения в секундах"
+    )
+    db_pool_recycle_seconds: int = Field(
+        default=-1, ge=-1, description="Пересоздавать соединения старше N секунд (-1 = никогда)"
+    )
+    db_pool_pre_ping: bool = Field(
+        default=True, description="Проверять соединение перед выдачей из пула"
+    )
+    db_statement_cache_size: int | None = Field(
+        default=None,
+        ge=0,
+        description="Кэш prepared statements asyncpg (0 для PgBouncer transaction mode)",
+    )
+    db_prepared_statement_cache_size: int | None = Field(
+        default=None, ge=0, description="Кэш prepared statements диалекта SQLAlchemy asyncpg"
+    )
+
+    # Read replica
+    database_replica_url: str | None = Field(
+        default=None,
+        description="URL реплики только для чтения (пусто = все запросы на основную БД)",
+    )
+    db_replica_max_lag_seconds: float = Field(
+        default=10.0,
+        ge=0,
+        description="Допустимое отставание реплики; при большем чтение идёт на основную БД",
+    )
+    db_replica_check_interval_seconds: float = Field(
+        default=5.0, gt=0, description="Интервал проверки отставания реплики в секундах"
+    )
+    db_replica_check_timeout_seconds: float = Field(
+        default=1.0,
+        gt=0,
+        description="Максимальное время проверки отставания; дольше = реплика недоступна",
+    )
+    db_replica_stats_reads: bool = Field(
+        default=True, description="Читать статистику (дашборд и админ-чат) с реплики"
+    )
+    db_replica_history_reads: bool = Field(
+        default=False,
+        description="Читать постраничную историю чата (GET /api/v1/chat/history) с реплики",
+    )
+
+    # History cache
+    history_cache_enabled: bool = Field(
+        default=False,
+        description="Кэшировать последние сообщения диалогов в памяти процесса бота",
+    )
+    history_cache_max_users: int = Field(
+        default=10_000, ge=1, description="Максимум пользователей в кэше истории"
+    )
+    history_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=0,
+        description="Ограничение оценки памяти кэша истории в байтах",
+    )
+
+    # Write-behind
+    write_behind_enabled: bool = Field(
+        default=False,
+        description="Сохранять ходы диалога в фоне, не задерживая ответ пользователю",
+    )
+    write_behind_max_queue_size: int = Field(
+        default=1000, ge=1, description="Максимальная длина очереди отложенной записи"
+    )
+    write_behind_batch_size: int = Field(
+        default=50, ge=1, description="Максимум ходов в одной пачке записи"
+    )
+    write_behind_flush_interval_seconds: float = Field(
+        default=0.5, gt=0, description="Максимальное время накопления пачки в секундах"
+    )
+    write_behind_spool_path: str = Field(
+        default="data/write_behind_spool.jsonl",
+        description="Spool-файл для ходов, которые не удалось записать в БД",
+    )
+    write_behind_max_replay_attempts: int = Field(
+        default=5,
+        ge=1,
+        description=(
+            "Сколько раз подряд повторять запись пачки из spool, прежде чем отложить "
+            "её в <spool>.rejected"
+        ),
+    )
+
+    # Chat sessions
+    chat_session_last_active_interval_seconds: int = Field(
+        default=60,
+        ge=0,
+        description="Минимальный интервал между обновлениями last_active сессии веб-чата",
+    )
+
+    # Retention
+    retention_enabled: bool = Field(
+        default=False,
+        description="Периодически переносить удалённые и устаревшие сообщения в архив (API)",
+    )
+    retention_days: int = Field(
+        default=0,
+        ge=0,
+        description="Архивировать сообщения старше N дней (0 = только удалённые)",
+    )
+    retention_archive_dir: str = Field(
+        default="data/archive", description="Каталог сжатых архивных сегментов"
+    )
+    retention_batch_size: int = Field(
+        default=1000, ge=1, description="Максимум сообщений в одной пачке архивации"
+    )
+    retention_batch_pause_seconds: float = Field(
+        default=0.5, ge=0, description="Пауза между пачками архивации в секундах"
+    )
+    retention_interval_seconds: float = Field(
+        default=3600.0, gt=0, description="Интервал между запусками архивации в секундах"
+    )
+
+    # Statistics
+    stats_parallel_enabled: bool = Field(
+        default=False,
+        description="Собирать секции статистики параллельно в отдельных сессиях БД",
+    )
+    stats_max_concurrency: int = Field(
+        default=2,
+        ge=1,
+        description="Максимум одновременных соединений на один запрос статистики",
+    )
+    stats_use_rollup: bool = Field(
+        default=False,
+        description=(
+            "Читать сводку и график из почасового агрегата message_rollup_hourly. "
+            "Бот обновляет агрегат только при включённой настройке; после включения "
+            "нужен make backfill-rollup"
+        ),
+    )
+    stats_approximate_users: bool = Field(
+        default=False,
+        description="Оценивать уникальных пользователей по HLL-скетчам агрегата (нужен backfill)",
+    )
+    stats_cache_ttl_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        description="Время жизни закэшированной статистики в секундах (0 = без кэша)",
+    )
+    stats_cache_stale_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        description="Сколько секунд после TTL отдавать устаревшую статистику, пересчитывая в фоне",
+    )
+    stats_etag_enabled: bool = Field(
+        default=True,
+        description="Отдавать ETag для статистики и отвечать 304 на If-None-Match",
+    )
+    stats_snapshot_enabled: bool = Field(
+        default=False,
+        description="Предвычислять статистику в фоне и отдавать готовые JSON-снапшоты",
+    )
+    stats_snapshot_interval_seconds: float = Field(
+        default=60.0, gt=0, description="Интервал фонового пересчёта снапшотов в секундах"
+    )
+    stats_snapshot_jitter_seconds: float = Field(
+        default=5.0, ge=0, description="Случайная добавка к интервалу пересчёта в секундах"
+    )
+    stats_snapshot_max_age_seconds: float = Field(
+        default=300.0,
+        gt=0,
+        description="Максимальный возраст снапшота; более старый пересчитывается по запросу",
+    )
+    stats_max_chart_buckets: int = Field(
+        default=500,
+        ge=1,
+        description="Максимум интервалов графика для произвольного диапазона from/to",
+    )
+
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", case_sensitive=False
     )
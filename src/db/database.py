@@ -2,46 +2,251 @@
 
 import logging
 from collections.abc import AsyncGenerator
+from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import StaticPool
 
 from src.db.models import Base
+from src.db.pool_stats import InstrumentedPool, PoolStats
+from src.db.replica import ReplicaRouter
 
 logger = logging.getLogger(__name__)
 
 # Global engine и session factory (будут инициализированы в init_db)
 engine = None
 AsyncSessionLocal = None
+pool_stats = None
 
+# Реплика только для чтения (None, если не настроена)
+replica_engine = None
+replica_router = None
 
-def init_db(database_url: str) -> None:
+
+def init_db(
+    database_url: str,
+    pool_size: int = 5,
+    max_overflow: int = 10,
+    pool_timeout: float = 30.0,
+    pool_recycle: int = -1,
+    pool_pre_ping: bool = True,
+    statement_cache_size: int | None = None,
+    prepared_statement_cache_size: int | None = None,
+    replica_url: str | None = None,
+    replica_max_lag_seconds: float = 10.0,
+    replica_check_interval_seconds: float = 5.0,
+    replica_check_timeout_seconds: float = 1.0,
+) -> None:
     """
     Инициализация подключения к базе данных.
 
     Args:
-        database_url: URL подключения к PostgreSQL
+        database_url: URL подключения к PostgreSQL или SQLite
+            (sqlite+aiosqlite:///file.db, sqlite+aiosqlite:// — в памяти)
+        pool_size: Количество постоянных соединений в пуле
+        max_overflow: Дополнительные соединения сверх pool_size под нагрузкой
+        pool_timeout: Максимальное ожидание свободного соединения в секундах
+        pool_recycle: Пересоздавать соединения старше N секунд (-1 = никогда)
+        pool_pre_ping: Проверять соединение перед выдачей (лишний round trip)
+        statement_cache_size: Размер кэша prepared statements asyncpg
+            (0 — для PgBouncer в режиме transaction; None = по умолчанию)
+        prepared_statement_cache_size: Размер кэша prepared statements
+            диалекта SQLAlchemy asyncpg (None = по умолчанию)
+        replica_url: URL реплики только для чтения (None = все запросы на primary);
+            пул реплики создаётся с теми же параметрами
+        replica_max_lag_seconds: Допустимое отставание реплики, при большем
+            чтение идёт на primary
+        replica_check_interval_seconds: Интервал проверки отставания реплики
+        replica_check_timeout_seconds: Максимальное время проверки отставания;
+            не ответившая за это время реплика считается недоступной
     """
-    global engine, AsyncSessionLocal
+    global engine, AsyncSessionLocal, pool_stats, replica_engine, replica_router
 
     logger.info(f"Initializing database connection: {database_url.split('@')[0]}@***")
 
-    engine = create_async_engine(
+    engine_options: dict[str, Any] = dict(
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        statement_cache_size=statement_cache_size,
+        prepared_statement_cache_size=prepared_statement_cache_size,
+    )
+    pool_stats = PoolStats()
+    engine = _create_engine(database_url, pool_stats=pool_stats, **engine_options)
+    pool_stats.attach(engine.sync_engine.pool)
+
+    AsyncSessionLocal = _create_session_factory(engine)
+
+    replica_engine = None
+    replica_router = None
+    if replica_url:
+        logger.info(f"Initializing read replica connection: {replica_url.split('@')[0]}@***")
+        replica_engine = _create_engine(replica_url, **engine_options)
+        replica_router = ReplicaRouter(
+            primary=AsyncSessionLocal,
+            replica=_create_session_factory(replica_engine),
+            max_lag_seconds=replica_max_lag_seconds,
+            check_interval_seconds=replica_check_interval_seconds,
+            check_timeout_seconds=replica_check_timeout_seconds,
+        )
+
+    logger.info(
+        f"Database connection initialized successfully (pool_size={pool_size}, "
+        f"max_overflow={max_overflow}, pool_timeout={pool_timeout}s, pre_ping={pool_pre_ping})"
+    )
+
+
+def _create_engine(
+    database_url: str,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: int,
+    pool_pre_ping: bool,
+    statement_cache_size: int | None,
+    prepared_statement_cache_size: int | None,
+    pool_stats: PoolStats | None = None,
+) -> AsyncEngine:
+    """Создать engine с инструментированным пулом (параметры см. init_db).
+
+    In-memory SQLite живёт, пока открыто соединение, поэтому для неё
+    используется одно общее соединение (StaticPool) без параметров пула.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return create_async_engine(database_url, echo=False, poolclass=StaticPool)
+
+    connect_args: dict[str, Any] = {}
+    if url.drivername.endswith("+asyncpg"):
+        if statement_cache_size is not None:
+            connect_args["statement_cache_size"] = statement_cache_size
+        if prepared_statement_cache_size is not None:
+            connect_args["prepared_statement_cache_size"] = prepared_statement_cache_size
+
+    return create_async_engine(
         database_url,
         echo=False,  # Не логировать SQL запросы (можно включить для отладки)
-        pool_pre_ping=True,  # Проверка соединения перед использованием
-        pool_size=5,  # Размер пула соединений
-        max_overflow=10,  # Максимальное количество дополнительных соединений
+        poolclass=InstrumentedPool,
+        pool_stats=pool_stats,
+        pool_pre_ping=pool_pre_ping,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        connect_args=connect_args,
     )
 
-    AsyncSessionLocal = async_sessionmaker(
-        engine,
+
+def _create_session_factory(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """Создать фабрику сессий для engine."""
+    return async_sessionmaker(
+        bind,
         class_=AsyncSession,
         expire_on_commit=False,  # Не истекать объекты после commit
         autoflush=False,  # Не автоматически flush перед запросами
         autocommit=False,  # Не автоматически commit
     )
 
-    logger.info("Database connection initialized successfully")
+
+def is_sqlite_url(database_url: str) -> bool:
+    """Указывает ли URL на локальный профиль SQLite."""
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def get_pool_stats() -> dict[str, Any] | None:
+    """
+    Получить статистику пула соединений.
+
+    Returns:
+        Словарь со статистикой (см. PoolStats.get_stats) или None,
+        если база данных не инициализирована
+    """
+    if engine is None or pool_stats is None:
+        return None
+
+    stats: dict[str, Any] = pool_stats.get_stats(engine.sync_engine.pool)
+    return stats
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Получить фабрику сессий для самостоятельного управления сессиями.
+
+    Returns:
+        async_sessionmaker: Фабрика асинхронных сессий SQLAlchemy
+
+    Raises:
+        RuntimeError: Если база данных не инициализирована
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError(
+            "Database not initialized. Call init_db() first with database_url."
+        )
+
+    return AsyncSessionLocal
+
+
+async def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Получить фабрику сессий для запросов только на чтение.
+
+    Если настроена реплика и её отставание допустимо, возвращается фабрика
+    реплики, иначе — основная фабрика. Результат нужно использовать сразу:
+    при следующем вызове реплика может оказаться отстающей.
+
+    Returns:
+        async_sessionmaker: Фабрика асинхронных сессий SQLAlchemy
+
+    Raises:
+        RuntimeError: Если база данных не инициализирована
+    """
+    if replica_router is None:
+        return get_session_factory()
+
+    session_factory: async_sessionmaker[AsyncSession]
+    session_factory = await replica_router.get_session_factory()
+    return session_factory
+
+
+def get_replica_stats() -> dict[str, Any] | None:
+    """
+    Получить статистику маршрутизации чтения на реплику.
+
+    Returns:
+        Словарь со статистикой (см. ReplicaRouter.get_stats) или None,
+        если реплика не настроена
+    """
+    if replica_router is None:
+        return None
+
+    stats: dict[str, Any] = replica_router.get_stats()
+    return stats
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Получить сессию для запросов только на чтение (реплика или primary).
+
+    Yields:
+        AsyncSession: Асинхронная сессия SQLAlchemy
+
+    Raises:
+        RuntimeError: Если база данных не инициализирована
+    """
+    session_factory = await get_read_session_factory()
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -74,7 +279,8 @@ async def create_tables() -> None:
     """
     Создать все таблицы в базе данных.
 
-    Используется для тестирования. В продакшене используйте Alembic миграции.
+    Используется для тестов и локального профиля SQLite (миграции Alembic
+    рассчитаны на PostgreSQL). В продакшене используйте Alembic миграции.
     """
     if engine is None:
         raise RuntimeError("Database not initialized. Call init_db() first.")
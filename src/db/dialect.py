@@ -0,0 +1,116 @@
+"""SQL constructs that differ between PostgreSQL and SQLite (local profile)."""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import ColumnElement, DateTime, LargeBinary, case, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Форматы strftime, повторяющие date_trunc PostgreSQL. Дробная часть
+# записана явно: SQLAlchemy хранит DateTime в SQLite строкой с
+# микросекундами, и сравнение строк должно совпадать со сравнением дат.
+SQLITE_TRUNC_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+    "week": "%Y-%m-%d 00:00:00.000000",
+    "month": "%Y-%m-01 00:00:00.000000",
+}
+
+# Модификаторы date(): ближайшее воскресенье не раньше даты минус 6 дней —
+# понедельник той же недели (date_trunc('week') начинает неделю с понедельника)
+SQLITE_WEEK_MODIFIERS = ("weekday 0", "-6 days")
+
+
+def dialect_name(session: AsyncSession) -> str:
+    """Имя диалекта БД сессии ("postgresql", "sqlite")."""
+    return session.get_bind().dialect.name
+
+
+def is_postgresql(session: AsyncSession) -> bool:
+    """Работает ли сессия с PostgreSQL."""
+    return dialect_name(session) == "postgresql"
+
+
+def insert_for(session: AsyncSession, table: Any) -> Any:
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта сессии.
+
+    PostgreSQL и SQLite (3.24+) поддерживают одинаковые
+    on_conflict_do_nothing/on_conflict_do_update и RETURNING (3.35+).
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        table: Модель или таблица
+
+    Returns:
+        Insert-конструкция postgresql или sqlite
+
+    Raises:
+        NotImplementedError: Если диалект не поддерживается
+    """
+    name = dialect_name(session)
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upserts are not supported for dialect {name!r}")
+
+
+def date_trunc(
+    session: AsyncSession, unit: str, column: ColumnElement[datetime]
+) -> ColumnElement[datetime]:
+    """
+    Округление даты вниз до начала интервала (date_trunc PostgreSQL).
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy (определяет диалект)
+        unit: Интервал ("minute", "hour", "day", "week", "month")
+        column: Колонка или выражение с датой
+
+    Returns:
+        SQL-выражение типа DateTime
+    """
+    if dialect_name(session) != "sqlite":
+        return func.date_trunc(unit, column, type_=DateTime)
+
+    modifiers = SQLITE_WEEK_MODIFIERS if unit == "week" else ()
+    return func.strftime(SQLITE_TRUNC_FORMATS[unit], column, *modifiers, type_=DateTime)
+
+
+def set_byte_max(
+    session: AsyncSession, value: ColumnElement[bytes], index: int, byte: int
+) -> ColumnElement[bytes]:
+    """
+    Байтовая строка value, где байт index заменён на max(текущий, byte).
+
+    Выражение вычисляется в одном UPDATE, поэтому параллельные обновления
+    разных регистров не теряются.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy (определяет диалект)
+        value: Выражение типа bytea/BLOB
+        index: Номер байта (с нуля)
+        byte: Новое значение байта (0-255)
+
+    Returns:
+        SQL-выражение типа LargeBinary
+    """
+    if dialect_name(session) != "sqlite":
+        return func.set_byte(
+            value,
+            index,
+            func.greatest(func.get_byte(value, index), byte),
+            type_=LargeBinary,
+        )
+
+    # В SQLite нет побайтовых функций: hex() байта сравнивается как строка
+    # фиксированной длины, замена собирается из substr() и приводится к BLOB
+    replaced = (
+        func.substr(value, 1, index).concat(bytes([byte])).concat(func.substr(value, index + 2))
+    )
+    return case(
+        (func.hex(func.substr(value, index + 1, 1)) < f"{byte:02X}", cast(replaced, LargeBinary)),
+        else_=value,
+    )
@@ -0,0 +1,247 @@
+"""Write-through in-memory cache of recent dialog history."""
+
+import logging
+from collections import OrderedDict, deque
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Ключ в session.info для операций, применяемых к кэшу после коммита
+PENDING_KEY = "pending_history_ops"
+
+# Оценка накладных расходов на одно сообщение (dict, строки, deque) в байтах
+MESSAGE_OVERHEAD_BYTES = 200
+
+
+class HistoryCache:
+    """
+    In-memory кэш последних сообщений диалогов по telegram_id.
+
+    Для каждого пользователя хранится кольцевой буфер из max_messages
+    последних сообщений. Пользователи вытесняются по LRU при превышении
+    max_users или оценки занимаемой памяти max_bytes.
+
+    Кэш работает write-through поверх MessageRepository: новые сообщения
+    и очистка истории применяются к кэшу только после коммита транзакции,
+    поэтому откаченные изменения в него не попадают.
+    """
+
+    def __init__(
+        self, max_messages: int = 20, max_users: int = 10_000, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        """
+        Инициализация кэша.
+
+        Args:
+            max_messages: Размер буфера сообщений на пользователя
+            max_users: Максимальное количество пользователей в кэше
+            max_bytes: Ограничение оценки занимаемой памяти в байтах
+        """
+        self.max_messages = max_messages
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+
+        self._entries: OrderedDict[int, deque[dict[str, str]]] = OrderedDict()
+        self._sizes: dict[int, int] = {}
+        # Незавершённые загрузки из БД: telegram_id -> токен (None = загрузка устарела)
+        self._loading: dict[int, object | None] = {}
+
+        logger.info(
+            f"History cache initialized with max_messages={max_messages}, "
+            f"max_users={max_users}, max_bytes={max_bytes}"
+        )
+
+    def get(self, telegram_id: int, limit: int) -> list[dict[str, str]] | None:
+        """
+        Получить последние limit сообщений пользователя из кэша.
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            limit: Количество последних сообщений (не больше max_messages)
+
+        Returns:
+            Копия сообщений или None при промахе
+        """
+        messages = self._entries.get(telegram_id)
+        if messages is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        start = max(len(messages) - limit, 0)
+        return [dict(message) for message in list(messages)[start:]]
+
+    def begin_load(self, telegram_id: int) -> object:
+        """
+        Отметить начало загрузки истории из БД.
+
+        Если до store() история пользователя изменится, загруженные данные
+        будут отброшены, чтобы не закэшировать устаревшее состояние.
+
+        Returns:
+            Токен загрузки для store() или abort_load()
+        """
+        token = object()
+        self._loading[telegram_id] = token
+        return token
+
+    def store(self, telegram_id: int, messages: list[dict[str, str]], token: object) -> bool:
+        """
+        Сохранить загруженную из БД историю (последние max_messages сообщений).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            messages: Сообщения в хронологическом порядке
+            token: Токен из begin_load()
+
+        Returns:
+            True, если история сохранена в кэш
+        """
+        if not self._finish_load(telegram_id, token):
+            return False
+
+        self._remove(telegram_id)
+        buffer: deque[dict[str, str]] = deque(maxlen=self.max_messages)
+        for message in messages[-self.max_messages :]:
+            buffer.append(dict(message))
+
+        self._entries[telegram_id] = buffer
+        self._sizes[telegram_id] = sum(self._message_size(message) for message in buffer)
+        self.total_bytes += self._sizes[telegram_id]
+        self._evict()
+        return True
+
+    def abort_load(self, telegram_id: int, token: object) -> None:
+        """Отменить загрузку (например, при ошибке запроса к БД)."""
+        self._finish_load(telegram_id, token)
+
+    def append(self, telegram_id: int, role: str, content: str) -> None:
+        """
+        Дописать сообщение в буфер пользователя, если он закэширован.
+
+        Для отсутствующих в кэше пользователей буфер не создаётся: в нём не
+        было бы более ранних сообщений.
+        """
+        self._mark_loading_stale(telegram_id)
+
+        messages = self._entries.get(telegram_id)
+        if messages is None:
+            return
+
+        if len(messages) == messages.maxlen:
+            removed = messages.popleft()
+            self._resize(telegram_id, -self._message_size(removed))
+
+        message = {"role": role, "content": content}
+        messages.append(message)
+        self._resize(telegram_id, self._message_size(message))
+        self._entries.move_to_end(telegram_id)
+        self._evict()
+
+    def invalidate(self, telegram_id: int) -> None:
+        """Удалить историю пользователя из кэша (очистка истории, soft delete)."""
+        self._mark_loading_stale(telegram_id)
+        self._remove(telegram_id)
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Получить статистику по кэшу.
+
+        Returns:
+            Словарь со статистикой: total_users, total_messages, total_bytes, hits, misses
+        """
+        return {
+            "total_users": len(self._entries),
+            "total_messages": sum(len(messages) for messages in self._entries.values()),
+            "total_bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def record_append(self, session: Session, telegram_id: int, role: str, content: str) -> None:
+        """Отложить запись сообщения в кэш до коммита транзакции сессии."""
+        self._pending(session).append((self, telegram_id, {"role": role, "content": content}))
+
+    def record_invalidate(self, session: Session, telegram_id: int) -> None:
+        """Отложить инвалидацию истории до коммита транзакции сессии."""
+        self._pending(session).append((self, telegram_id, None))
+
+    @staticmethod
+    def has_pending(session: Session, telegram_id: int) -> bool:
+        """Есть ли у пользователя незакоммиченные изменения истории в этой сессии."""
+        return any(pending[1] == telegram_id for pending in session.info.get(PENDING_KEY, []))
+
+    @staticmethod
+    def _pending(
+        session: Session,
+    ) -> list[tuple["HistoryCache", int, dict[str, str] | None]]:
+        """Список отложенных операций транзакции."""
+        pending: list[tuple[HistoryCache, int, dict[str, str] | None]]
+        pending = session.info.setdefault(PENDING_KEY, [])
+        return pending
+
+    def _finish_load(self, telegram_id: int, token: object) -> bool:
+        """Завершить загрузку; возвращает True, если она не устарела."""
+        current = self._loading.get(telegram_id)
+        if current is token:
+            del self._loading[telegram_id]
+            return True
+        if current is None:
+            # Загрузка устарела или уже завершена другим запросом
+            self._loading.pop(telegram_id, None)
+        return False
+
+    def _mark_loading_stale(self, telegram_id: int) -> None:
+        """Пометить идущую загрузку пользователя как устаревшую."""
+        if telegram_id in self._loading:
+            self._loading[telegram_id] = None
+
+    def _remove(self, telegram_id: int) -> None:
+        """Удалить буфер пользователя и вычесть его размер."""
+        if self._entries.pop(telegram_id, None) is not None:
+            self.total_bytes -= self._sizes.pop(telegram_id)
+
+    def _resize(self, telegram_id: int, delta: int) -> None:
+        """Изменить учтённый размер буфера пользователя."""
+        self._sizes[telegram_id] += delta
+        self.total_bytes += delta
+
+    def _evict(self) -> None:
+        """Вытеснить давно неиспользуемых пользователей сверх лимитов."""
+        while self._entries and (
+            len(self._entries) > self.max_users or self.total_bytes > self.max_bytes
+        ):
+            telegram_id = next(iter(self._entries))
+            self._remove(telegram_id)
+            logger.debug(f"Evicted history of user {telegram_id} from cache")
+
+    @staticmethod
+    def _message_size(message: dict[str, str]) -> int:
+        """Оценка памяти, занимаемой сообщением."""
+        return len(message["content"]) + len(message["role"]) + MESSAGE_OVERHEAD_BYTES
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_history_ops(session: Session) -> None:
+    """Применяет отложенные операции транзакции к кэшу после успешного коммита."""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+
+    for cache, telegram_id, message in pending:
+        if message is None:
+            cache.invalidate(telegram_id)
+        else:
+            cache.append(telegram_id, message["role"], message["content"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_history_ops(session: Session) -> None:
+    """Отбрасывает операции откаченной транзакции."""
+    session.info.pop(PENDING_KEY, None)
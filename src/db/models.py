@@ -2,7 +2,19 @@
 
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -46,9 +58,32 @@ class Message(Base):
     Модель сообщения в диалоге.
 
     Хранит историю сообщений пользователей и ассистента с метаданными.
+
+    В PostgreSQL таблица партиционирована по месяцам created_at (первичный
+    ключ в БД — (id, created_at), см. src.db.partitions). Запросы по диапазону
+    должны фильтровать по самому created_at, чтобы читались только нужные партиции.
     """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # История пользователя: WHERE user_id=? AND NOT is_deleted ORDER BY created_at, id
+        # (включая keyset-пагинацию по (created_at, id))
+        Index(
+            "ix_messages_user_id_created_at_id_live",
+            "user_id",
+            "created_at",
+            "id",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0"),
+        ),
+        # Диапазонные запросы статистики по живым сообщениям
+        Index(
+            "ix_messages_created_at_live",
+            "created_at",
+            postgresql_where=text("is_deleted = false"),
+            sqlite_where=text("is_deleted = 0"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(
@@ -112,9 +147,17 @@ class ChatMessage(Base):
 
     Хранит историю сообщений для веб-интерфейса чата
     с поддержкой разных режимов (normal/admin).
+
+    В PostgreSQL партиционирована по месяцам created_at, как и messages.
     """
 
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        # История чата: WHERE session_id=? ORDER BY created_at, id (включая keyset-пагинацию)
+        Index(
+            "ix_chat_messages_session_id_created_at_id", "session_id", "created_at", "id"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     session_id: Mapped[int] = mapped_column(
@@ -140,3 +183,53 @@ class ChatMessage(Base):
             f"role={self.role}, mode={self.mode})>"
         )
 
+
+
+class MessageRollupHourly(Base):
+    """
+    Почасовой агрегат сообщений для статистики.
+
+    Поддерживается инкрементально из MessageRepository, чтобы статистика
+    читала не более одной строки на час вместо сырых сообщений.
+    """
+
+    __tablename__ = "message_rollup_hourly"
+
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    distinct_users: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    user_message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    assistant_message_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    total_content_length: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    # HyperLogLog-скетч ID пользователей за час (src.stats.hyperloglog)
+    users_hll: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True)
+
+    def __repr__(self) -> str:
+        """Строковое представление почасового агрегата."""
+        return (
+            f"<MessageRollupHourly(bucket_start={self.bucket_start}, "
+            f"messages={self.message_count}, users={self.distinct_users})>"
+        )
+
+
+class MessageRollupHourlyUser(Base):
+    """
+    Пользователи, писавшие в течение часа.
+
+    Нужна для инкрементального подсчёта distinct_users и для подсчёта
+    уникальных пользователей за произвольный набор часов.
+    """
+
+    __tablename__ = "message_rollup_hourly_users"
+
+    bucket_start: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+    def __repr__(self) -> str:
+        """Строковое представление записи активности пользователя за час."""
+        return (
+            f"<MessageRollupHourlyUser(bucket_start={self.bucket_start}, "
+            f"user_id={self.user_id})>"
+        )
@@ -0,0 +1,47 @@
+"""Keyset (cursor) pagination over message history."""
+
+import base64
+import binascii
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+# Размер страницы по умолчанию и максимальный
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class HistoryCursor:
+    """Позиция последнего прочитанного сообщения: ключ сортировки (created_at, id)."""
+
+    created_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        """Закодировать курсор в непрозрачную строку для API."""
+        raw = f"{self.created_at.isoformat()}|{self.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "HistoryCursor":
+        """
+        Разобрать курсор, полученный от клиента.
+
+        Raises:
+            ValueError: Если курсор повреждён
+        """
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            created_at, message_id = base64.urlsafe_b64decode(padded).decode().split("|")
+            return cls(created_at=datetime.fromisoformat(created_at), id=int(message_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise ValueError(f"Invalid history cursor: {value!r}") from e
+
+
+@dataclass
+class HistoryPage:
+    """Страница истории в хронологическом порядке."""
+
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    next_cursor: HistoryCursor | None = None
@@ -0,0 +1,233 @@
+"""Maintenance of monthly range partitions of message tables (PostgreSQL)."""
+
+import logging
+import re
+from datetime import datetime
+from typing import Any, cast
+
+from sqlalchemy import CursorResult, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, партиционированные по месяцам created_at (миграция e4c8a1f2b937)
+PARTITIONED_TABLES = ("messages", "chat_messages")
+
+# Сколько будущих месяцев держать созданными заранее
+DEFAULT_MONTHS_AHEAD = 3
+
+# Суффикс партиции с данными до перехода на партиционирование (миграция e4c8a1f2b937)
+LEGACY_SUFFIX = "_legacy"
+
+
+def month_start(value: datetime) -> datetime:
+    """Начало месяца, содержащего value."""
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """Сдвинуть начало месяца на months месяцев."""
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    """Имя партиции таблицы за месяц, например messages_p202510."""
+    return f"{table}_p{month:%Y%m}"
+
+
+def _check_table(table: str) -> None:
+    """Проверить, что таблица партиционируется (имена подставляются в DDL)."""
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"Table {table!r} is not partitioned. Must be one of {PARTITIONED_TABLES}")
+
+
+async def is_partitioned(session: AsyncSession, table: str) -> bool:
+    """Является ли таблица партиционированной (миграция применена, БД — PostgreSQL)."""
+    _check_table(table)
+    if session.get_bind().dialect.name != "postgresql":
+        return False
+
+    result = await session.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = :table)"
+        ),
+        {"table": table},
+    )
+    return bool(result.scalar())
+
+
+async def list_partitions(session: AsyncSession, table: str) -> list[str]:
+    """Имена партиций таблицы по возрастанию."""
+    _check_table(table)
+    result = await session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table ORDER BY c.relname"
+        ),
+        {"table": table},
+    )
+    return list(result.scalars())
+
+
+async def legacy_upper_bound(session: AsyncSession, table: str) -> datetime | None:
+    """
+    Верхняя граница legacy-партиции таблицы.
+
+    Миграция e4c8a1f2b937 присоединяет исходную таблицу целиком как партицию
+    {table}_legacy с диапазоном [MINVALUE, граница); месячные партиции
+    начинаются с этой границы.
+
+    Returns:
+        Граница или None, если legacy-партиции нет
+    """
+    _check_table(table)
+    result = await session.execute(
+        text(
+            "SELECT pg_get_expr(c.relpartbound, c.oid) FROM pg_class c "
+            "WHERE c.relname = :name AND c.relispartition"
+        ),
+        {"name": f"{table}{LEGACY_SUFFIX}"},
+    )
+    bound = result.scalar()
+    if bound is None:
+        return None
+
+    # FOR VALUES FROM (MINVALUE) TO ('2026-12-01 00:00:00')
+    match = re.search(r"TO \('([^']+)'\)", bound)
+    if match is None:
+        raise ValueError(f"Unexpected bound of {table}{LEGACY_SUFFIX}: {bound}")
+    return datetime.fromisoformat(match.group(1))
+
+
+async def ensure_partitions(
+    session: AsyncSession,
+    months_ahead: int = DEFAULT_MONTHS_AHEAD,
+    now: datetime | None = None,
+) -> list[str]:
+    """
+    Создать партиции текущего и months_ahead следующих месяцев.
+
+    Вызывается командой обслуживания (scripts/manage_partitions.py) по
+    расписанию. Строки вне созданных месяцев попадают в DEFAULT-партицию,
+    поэтому пропущенный запуск не ломает запись; при создании месяца такие
+    строки переносятся из DEFAULT в новую партицию. Месяцы, покрытые
+    legacy-партицией, пропускаются.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        months_ahead: Количество будущих месяцев
+        now: Текущее время (None = datetime.utcnow())
+
+    Returns:
+        Имена созданных партиций
+    """
+    current = month_start(now or datetime.utcnow())
+    created = []
+
+    for table in PARTITIONED_TABLES:
+        if not await is_partitioned(session, table):
+            logger.warning(f"Table {table} is not partitioned, skipping")
+            continue
+
+        existing = set(await list_partitions(session, table))
+        legacy_until = await legacy_upper_bound(session, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(table, month)
+            if name in existing or (legacy_until is not None and month < legacy_until):
+                continue
+
+            await _create_partition(session, table, name, month)
+            created.append(name)
+            logger.info(f"Created partition {name}")
+
+        default_rows = await session.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table}_default)"))
+        if default_rows.scalar():
+            logger.warning(
+                f"Default partition {table}_default contains rows outside monthly partitions"
+            )
+
+    return created
+
+
+async def _create_partition(session: AsyncSession, table: str, name: str, month: datetime) -> None:
+    """
+    Создать месячную партицию, забрав её строки из DEFAULT-партиции.
+
+    PostgreSQL не создаёт партицию, пока в DEFAULT есть строки её диапазона.
+    Тогда месяц создаётся отдельной таблицей, строки переносятся в неё и
+    она присоединяется (ATTACH PARTITION). Всё в транзакции вызывающего,
+    поэтому строки не теряются и не видны дважды.
+    """
+    following = add_months(month, 1)
+    bounds = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+    in_month = "created_at >= :start AND created_at < :end"
+    params = {"start": month, "end": following}
+
+    stray = await session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {table}_default WHERE {in_month})"), params
+    )
+    if not stray.scalar():
+        await session.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+        return
+
+    await session.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    moved = cast(
+        CursorResult[Any],
+        await session.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {table}_default WHERE {in_month} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ),
+            params,
+        ),
+    )
+    await session.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+    logger.info(f"Moved {moved.rowcount} rows from {table}_default to {name}")
+
+
+async def detach_partitions_before(session: AsyncSession, before: datetime) -> list[str]:
+    """
+    Отсоединить месячные партиции, целиком лежащие раньше before.
+
+    Отсоединённые партиции остаются обычными таблицами с тем же именем:
+    их можно выгрузить в архив и удалить (DROP TABLE) без построчного
+    DELETE. Legacy-партиция отсоединяется, когда её граница не позже
+    before. Почасовой агрегат message_rollup_hourly не меняется, поэтому
+    статистика по этим месяцам сохраняется.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        before: Граница; отсоединяются месяцы, закончившиеся не позже неё
+
+    Returns:
+        Имена отсоединённых партиций
+    """
+    detached = []
+
+    for table in PARTITIONED_TABLES:
+        if not await is_partitioned(session, table):
+            logger.warning(f"Table {table} is not partitioned, skipping")
+            continue
+
+        prefix = f"{table}_p"
+        legacy = f"{table}{LEGACY_SUFFIX}"
+        for name in await list_partitions(session, table):
+            if name == legacy:
+                until = await legacy_upper_bound(session, table)
+            elif name.startswith(prefix):
+                until = add_months(datetime.strptime(name.removeprefix(prefix), "%Y%m"), 1)
+            else:
+                continue
+            if until is None or until > before:
+                continue
+
+            await session.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            detached.append(name)
+            logger.info(f"Detached partition {name}")
+
+    return detached
@@ -0,0 +1,131 @@
+"""Connection pool instrumentation: checkout wait times and failures."""
+
+import bisect
+import time
+from typing import Any, cast
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+# Верхние границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolStats:
+    """
+    Счётчики пула соединений.
+
+    Количество выдач, новых и инвалидированных соединений считается
+    через события пула SQLAlchemy, время ожидания и отказы (таймаут
+    ожидания) — в InstrumentedPool.connect().
+    """
+
+    def __init__(self) -> None:
+        """Инициализация счётчиков."""
+        self.checkouts = 0
+        self.connections_created = 0
+        self.invalidations = 0
+        self.checkout_failures = 0
+        self.max_wait_ms = 0.0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def attach(self, pool: Pool) -> None:
+        """Подписаться на события пула."""
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def record_wait(self, wait_ms: float) -> None:
+        """Учесть время ожидания соединения из пула."""
+        self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_failure(self) -> None:
+        """Учесть отказ в выдаче соединения (истёк pool_timeout)."""
+        self.checkout_failures += 1
+
+    def get_stats(self, pool: Pool) -> dict[str, Any]:
+        """
+        Получить текущее состояние пула и накопленные счётчики.
+
+        Args:
+            pool: Пул, к которому подключены счётчики
+
+        Returns:
+            Словарь: size, checked_out, checked_in, overflow, checkouts,
+            connections_created, invalidations, checkout_failures,
+            max_wait_ms, wait_ms_histogram (граница корзины → количество)
+        """
+        labels = [f"<={bound}" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}"]
+        stats: dict[str, Any] = {}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+            )
+        stats.update(
+            checkouts=self.checkouts,
+            connections_created=self.connections_created,
+            invalidations=self.invalidations,
+            checkout_failures=self.checkout_failures,
+            max_wait_ms=round(self.max_wait_ms, 1),
+            wait_ms_histogram=dict(zip(labels, self.wait_histogram, strict=True)),
+        )
+        return stats
+
+    def _on_connect(self, dbapi_connection: Any, connection_record: Any) -> None:
+        """Событие: открыто новое соединение с БД."""
+        self.connections_created += 1
+
+    def _on_checkout(
+        self, dbapi_connection: Any, connection_record: Any, connection_proxy: Any
+    ) -> None:
+        """Событие: соединение выдано из пула."""
+        self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        """Событие: соединение признано неработоспособным."""
+        self.invalidations += 1
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, измеряющий время ожидания соединения.
+
+    Счётчики передаются через create_async_engine(..., pool_stats=...):
+    SQLAlchemy передаёт конструктору пула аргументы, которые он объявляет.
+    """
+
+    def __init__(self, creator: Any, pool_stats: PoolStats | None = None, **kw: Any):
+        """
+        Инициализация пула.
+
+        Args:
+            creator: Функция открытия соединения (передаёт SQLAlchemy)
+            pool_stats: Счётчики пула (None = без учёта ожидания)
+            **kw: Параметры AsyncAdaptedQueuePool
+        """
+        super().__init__(creator, **kw)
+        self.stats = pool_stats
+
+    def connect(self) -> Any:
+        """Выдать соединение, учитывая время ожидания и таймауты."""
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            if self.stats is not None:
+                self.stats.record_failure()
+            raise
+
+        if self.stats is not None:
+            self.stats.record_wait((time.perf_counter() - started) * 1000)
+        return connection
+
+    def recreate(self) -> "InstrumentedPool":
+        """Пересоздать пул (engine.dispose()), сохранив счётчики."""
+        pool = cast("InstrumentedPool", super().recreate())
+        pool.stats = self.stats
+        return pool
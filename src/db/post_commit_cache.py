@@ -0,0 +1,111 @@
+"""In-process LRU cache whose new entries become visible only after commit."""
+
+from collections import OrderedDict
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+# Ключ в session.info для записей, ожидающих коммита транзакции
+PENDING_KEY = "post_commit_cache_pending"
+
+DEFAULT_CACHE_SIZE = 10_000
+
+
+class PostCommitLRUCache(Generic[K, V]):
+    """Ограниченный LRU-кэш ключ → значение с отложенной до коммита записью.
+
+    Значения, полученные внутри транзакции, сохраняются через remember и
+    переносятся в кэш только после её коммита; при откате они
+    отбрасываются. Поэтому ID строки из откаченного INSERT никогда не будет
+    отдан из кэша. До коммита запись видна только своей сессии (см. lookup).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        """Инициализация кэша.
+
+        Args:
+            maxsize: Максимальное количество записей в кэше
+        """
+        self.maxsize = maxsize
+        self._entries: OrderedDict[K, V] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        """Получить закоммиченную запись и отметить её как свежую."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: K, value: V) -> None:
+        """Сохранить запись, вытеснив самую старую при переполнении."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        """Удалить запись из кэша."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кэш."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Количество записей в кэше."""
+        return len(self._entries)
+
+    def remember(self, session: Session, key: K, value: V) -> None:
+        """Отложить запись в кэш до коммита транзакции сессии.
+
+        Args:
+            session: Синхронная сессия (AsyncSession.sync_session)
+            key: Ключ записи
+            value: Значение, записанное в текущей транзакции
+        """
+        self._pending(session).setdefault(self, {})[key] = value
+
+    def get_pending(self, session: Session, key: K) -> V | None:
+        """Получить запись, сделанную в текущей транзакции сессии."""
+        pending: dict[K, V] = self._pending(session).get(self, {})
+        return pending.get(key)
+
+    def forget_pending(self, session: Session, key: K) -> None:
+        """Убрать отложенную запись текущей транзакции."""
+        self._pending(session).get(self, {}).pop(key, None)
+
+    def lookup(self, session: Session, key: K) -> V | None:
+        """Получить запись: сначала из текущей транзакции, затем из кэша."""
+        entry = self.get_pending(session, key)
+        if entry is None:
+            entry = self.get(key)
+        return entry
+
+    @staticmethod
+    def _pending(session: Session) -> dict["PostCommitLRUCache[Any, Any]", dict[Any, Any]]:
+        """Отложенные записи сессии по кэшам."""
+        pending: dict[PostCommitLRUCache[Any, Any], dict[Any, Any]]
+        pending = session.info.setdefault(PENDING_KEY, {})
+        return pending
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    """Переносит записи транзакции в кэши после успешного коммита."""
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+
+    for cache, entries in pending.items():
+        for key, value in entries.items():
+            cache.put(key, value)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    """Отбрасывает записи откаченной транзакции."""
+    session.info.pop(PENDING_KEY, None)
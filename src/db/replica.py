@@ -0,0 +1,155 @@
+"""Routing of read-only queries to a database replica with a replication lag guard."""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Отставание реплики PostgreSQL в секундах. Если всё полученное WAL уже
+# применено, реплика актуальна (без этого на простаивающем primary
+# отставание росло бы вместе с временем с последней транзакции).
+# На сервере не в режиме восстановления (не реплика) отставание 0.
+PG_REPLICATION_LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+class ReplicaRouter:
+    """
+    Выбор фабрики сессий для запросов только на чтение.
+
+    Запросы идут на реплику, пока её отставание не превышает max_lag_seconds.
+    Отставание проверяется не чаще раза в check_interval_seconds; если
+    реплика отстаёт или недоступна, запросы идут на primary до следующей
+    проверки. Проверку выполняет один запрос и ждёт её не дольше
+    check_timeout_seconds (зависшая реплика считается недоступной);
+    остальные запросы её не ждут и используют последнее известное
+    состояние. Для БД без репликации (не PostgreSQL) отставание считается
+    нулевым.
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker[AsyncSession],
+        replica: async_sessionmaker[AsyncSession],
+        max_lag_seconds: float = 10.0,
+        check_interval_seconds: float = 5.0,
+        check_timeout_seconds: float = 1.0,
+    ):
+        """
+        Инициализация маршрутизатора.
+
+        Args:
+            primary: Фабрика сессий основной БД
+            replica: Фабрика сессий реплики
+            max_lag_seconds: Допустимое отставание реплики
+            check_interval_seconds: Как долго использовать результат проверки отставания
+            check_timeout_seconds: Максимальное время проверки отставания
+        """
+        self.primary = primary
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.check_timeout_seconds = check_timeout_seconds
+
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.last_lag_seconds: float | None = None
+        self._replica_ok = False
+        self._checked_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def get_session_factory(self) -> async_sessionmaker[AsyncSession]:
+        """
+        Получить фабрику сессий для чтения.
+
+        Returns:
+            Фабрика сессий реплики, если она достаточно свежая, иначе primary
+        """
+        # Проверку выполняет один запрос, остальные не ждут её на блокировке
+        if self._check_due() and not self._lock.locked():
+            async with self._lock:
+                if self._check_due():
+                    await self._check_replica()
+
+        if self._replica_ok:
+            self.replica_reads += 1
+            return self.replica
+
+        self.primary_fallbacks += 1
+        return self.primary
+
+    async def measure_lag(self) -> float:
+        """
+        Измерить отставание реплики.
+
+        Returns:
+            Отставание в секундах
+
+        Raises:
+            Exception: Ошибки подключения к реплике пробрасываются
+        """
+        async with self.replica() as session:
+            if session.get_bind().dialect.name != "postgresql":
+                return 0.0
+            result = await session.execute(text(PG_REPLICATION_LAG_QUERY))
+            return float(result.scalar() or 0)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Получить статистику маршрутизации.
+
+        Returns:
+            Словарь: replica_ok, last_lag_seconds, max_lag_seconds,
+            replica_reads, primary_fallbacks
+        """
+        return {
+            "replica_ok": self._replica_ok,
+            "last_lag_seconds": self.last_lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+        }
+
+    def _check_due(self) -> bool:
+        """Пора ли заново проверить отставание реплики."""
+        return (
+            self._checked_at is None
+            or time.monotonic() - self._checked_at >= self.check_interval_seconds
+        )
+
+    async def _check_replica(self) -> None:
+        """Проверить отставание реплики и запомнить результат."""
+        first_check = self._checked_at is None
+        was_ok = self._replica_ok
+        try:
+            lag = await asyncio.wait_for(self.measure_lag(), timeout=self.check_timeout_seconds)
+        except Exception as e:
+            reason = str(e)
+            if isinstance(e, asyncio.TimeoutError):
+                reason = f"lag check took longer than {self.check_timeout_seconds}s"
+            self.last_lag_seconds = None
+            self._replica_ok = False
+            if was_ok or first_check:
+                logger.warning(f"Read replica is unavailable, reading from primary: {reason}")
+        else:
+            self.last_lag_seconds = lag
+            self._replica_ok = lag <= self.max_lag_seconds
+            if not self._replica_ok and (was_ok or first_check):
+                logger.warning(
+                    f"Read replica lags {lag:.1f}s (max {self.max_lag_seconds}s), "
+                    f"reading from primary"
+                )
+            elif self._replica_ok and not was_ok and not first_check:
+                logger.info(f"Read replica caught up (lag {lag:.1f}s), reading from replica")
+
+        self._checked_at = time.monotonic()
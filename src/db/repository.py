@@ -1,14 +1,98 @@
 """Repository для работы с сообщениями и пользователями."""
 
+import asyncio
 import logging
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, cast
 
-from sqlalchemy import select
+from sqlalchemy import CursorResult, Row, Select, delete, func, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.db.dialect import insert_for, is_postgresql
+from src.db.history_cache import HistoryCache
 from src.db.models import ChatMessage, ChatSession, Message, User
+from src.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, HistoryCursor, HistoryPage
+from src.db.rollup import (
+    add_message_to_rollup,
+    add_messages_to_rollup,
+    remove_messages_from_rollup,
+)
+from src.db.session_cache import ChatSessionCache, chat_session_cache
+from src.db.user_cache import UserIdCache, user_id_cache
+from src.db.write_behind import PendingTurn
+
+if TYPE_CHECKING:
+    from src.db.write_behind import WriteBehindQueue
 
 logger = logging.getLogger(__name__)
 
+# Максимум строк в одном UPDATE/DELETE при очистке истории
+CLEAR_HISTORY_CHUNK_SIZE = 5000
+
+# Пауза между порциями очистки истории (каждая порция — отдельная транзакция)
+CLEAR_HISTORY_CHUNK_PAUSE_SECONDS = 0.05
+
+# Минимальный интервал между обновлениями chat_sessions.last_active
+LAST_ACTIVE_UPDATE_INTERVAL = timedelta(seconds=60)
+
+
+def _turn_created_at(position: int, base: datetime | None = None) -> Any:
+    """Время сообщения в ходе диалога: base или now() со сдвигом в микросекундах.
+
+    Все строки одного INSERT получают одинаковое now() (время начала транзакции),
+    сдвиг сохраняет порядок "вопрос → ответ" при сортировке по created_at.
+    """
+    if base is not None:
+        return base + timedelta(microseconds=position)
+    if position == 0:
+        return func.now()
+    return func.now() + timedelta(microseconds=position)
+
+
+def _turn_base(session: AsyncSession, created_at: datetime | None) -> datetime | None:
+    """Базовое время хода для _turn_created_at.
+
+    None (now() транзакции) остаётся только для PostgreSQL: в SQLite
+    CURRENT_TIMESTAMP имеет точность до секунды и не складывается с
+    интервалом, поэтому время берётся в Python.
+    """
+    if created_at is None and not is_postgresql(session):
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    return created_at
+
+
+async def _fetch_page(
+    session: AsyncSession,
+    query: Select[Any],
+    created_at: Any,
+    message_id: Any,
+    cursor: HistoryCursor | None,
+    limit: int,
+) -> HistoryPage:
+    """Прочитать страницу истории после cursor по ключу (created_at, id).
+
+    Условие по кортежу вместо OFFSET: запрос идёт по индексу
+    (..., created_at, id) и не зависит от глубины страницы.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}, got {limit}")
+
+    if cursor is not None:
+        query = query.where(tuple_(created_at, message_id) > tuple_(cursor.created_at, cursor.id))
+
+    # Лишняя строка показывает, есть ли следующая страница
+    query = query.order_by(created_at.asc(), message_id.asc()).limit(limit + 1)
+    result = await session.execute(query)
+    rows = result.mappings().all()
+
+    page = HistoryPage(messages=[dict(row) for row in rows[:limit]])
+    if len(rows) > limit:
+        last = page.messages[-1]
+        page.next_cursor = HistoryCursor(created_at=last["created_at"], id=last["id"])
+
+    return page
+
 
 class MessageRepository:
     """
@@ -17,47 +101,101 @@ class MessageRepository:
     Предоставляет простой интерфейс для операций с историей диалогов.
     """
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        user_cache: UserIdCache | None = None,
+        history_cache: HistoryCache | None = None,
+        write_behind: "WriteBehindQueue | None" = None,
+        maintain_rollup: bool = False,
+    ) -> None:
         """
         Инициализация repository.
 
         Args:
             session: Асинхронная сессия SQLAlchemy
+            user_cache: Кэш telegram_id → users.id (None = общий кэш процесса)
+            history_cache: Write-through кэш последних сообщений (None = без кэша)
+            write_behind: Очередь отложенной записи ходов (None = писать сразу)
+            maintain_rollup: Обновлять почасовой агрегат message_rollup_hourly
+                при записи и очистке (нужен только статистике с stats_use_rollup)
         """
         self.session = session
+        self.user_cache = user_cache if user_cache is not None else user_id_cache
+        self.history_cache = history_cache
+        self.write_behind = write_behind
+        self.maintain_rollup = maintain_rollup
 
-    async def get_or_create_user(self, telegram_id: int, username: str | None) -> User:
+    async def get_or_create_user_id(self, telegram_id: int, username: str | None) -> int:
         """
-        Получить существующего пользователя или создать нового.
+        Получить ID пользователя, создав или обновив его при необходимости.
+
+        При промахе кэша выполняется один INSERT ... ON CONFLICT DO UPDATE
+        ... RETURNING id: он же обновляет username и восстанавливает
+        soft-deleted пользователя. Одновременные сообщения одного нового
+        пользователя не приводят к ошибке уникальности.
+
+        Попадание в кэш не читает users.is_deleted: если пользователя
+        удалил другой процесс (со своим кэшем), до вытеснения записи
+        возвращается ID удалённого пользователя без восстановления.
 
         Args:
             telegram_id: ID пользователя в Telegram
             username: Имя пользователя в Telegram (может быть None)
 
         Returns:
-            User: Объект пользователя
+            ID пользователя в БД
         """
-        # Ищем пользователя
-        result = await self.session.execute(
-            select(User).where(User.telegram_id == telegram_id, User.is_deleted == False)
+        sync_session = self.session.sync_session
+        entry = self.user_cache.lookup(sync_session, telegram_id)
+        if entry is not None and entry[1] == username:
+            cached_id: int = entry[0]
+            return cached_id
+
+        statement = insert_for(self.session, User).values(
+            telegram_id=telegram_id, username=username, is_deleted=False
         )
-        user = result.scalar_one_or_none()
-
-        if user is None:
-            # Создаём нового пользователя
-            user = User(telegram_id=telegram_id, username=username, is_deleted=False)
-            self.session.add(user)
-            await self.session.flush()  # Чтобы получить ID
-            logger.info(f"Created new user: telegram_id={telegram_id}, username={username}")
-        else:
-            # Обновляем username, если изменился
-            if user.username != username:
-                user.username = username
-                logger.info(
-                    f"Updated username for user {telegram_id}: {user.username} -> {username}"
-                )
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.telegram_id],
+            set_={"username": statement.excluded.username, "is_deleted": False},
+        ).returning(User.id)
+        result = await self.session.execute(statement)
+        user_id: int = result.scalar_one()
+
+        # Старая запись (другой username) больше не актуальна
+        self.user_cache.invalidate(telegram_id)
+        self.user_cache.remember(sync_session, telegram_id, (user_id, username))
+        logger.debug(f"Upserted user: telegram_id={telegram_id}, username={username}, id={user_id}")
+
+        return user_id
 
-        return user
+    async def delete_user(self, telegram_id: int) -> bool:
+        """
+        Пометить пользователя как удалённого (soft delete).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+
+        Returns:
+            True, если пользователь был найден и помечен
+        """
+        result = cast(
+            CursorResult[Any],
+            await self.session.execute(
+                update(User)
+                .where(User.telegram_id == telegram_id, User.is_deleted == False)
+                .values(is_deleted=True)
+            ),
+        )
+
+        self.user_cache.invalidate(telegram_id)
+        self.user_cache.forget_pending(self.session.sync_session, telegram_id)
+        self._invalidate_history_cache(telegram_id)
+
+        deleted: bool = result.rowcount > 0
+        if deleted:
+            logger.info(f"Soft-deleted user {telegram_id}")
+        return deleted
 
     async def add_message(
         self, telegram_id: int, role: str, content: str, username: str | None = None
@@ -69,32 +207,121 @@ class MessageRepository:
             telegram_id: ID пользователя в Telegram
             role: Роль отправителя ("user" или "assistant")
             content: Содержимое сообщения
-            username: Имя пользователя (опционально, для get_or_create_user)
+            username: Имя пользователя (опционально, для get_or_create_user_id)
 
         Returns:
             Message: Созданное сообщение
         """
         # Получаем или создаём пользователя
-        user = await self.get_or_create_user(telegram_id, username)
+        user_id = await self.get_or_create_user_id(telegram_id, username)
 
         # Создаём сообщение с автоматическим вычислением длины
         message = Message(
-            user_id=user.id,
+            user_id=user_id,
             role=role,
             content=content,
             content_length=len(content),
             is_deleted=False,
         )
+        if not is_postgresql(self.session):
+            # В SQLite CURRENT_TIMESTAMP имеет точность до секунды
+            message.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
         self.session.add(message)
         await self.session.flush()
 
+        if self.maintain_rollup:
+            # Учитываем сообщение в почасовом агрегате для статистики
+            await add_message_to_rollup(self.session, message.id)
+
+        if self.history_cache is not None:
+            self.history_cache.record_append(self.session.sync_session, telegram_id, role, content)
+
         logger.debug(
             f"Added message for user {telegram_id}: role={role}, length={len(content)}"
         )
 
         return message
 
+    async def add_turn(
+        self,
+        telegram_id: int,
+        user_content: str,
+        assistant_content: str,
+        username: str | None = None,
+        created_at: datetime | None = None,
+    ) -> list[int]:
+        """
+        Сохранить ход диалога: сообщение пользователя и ответ ассистента.
+
+        Пользователь определяется один раз, оба сообщения вставляются одним
+        многострочным INSERT с упорядоченными created_at. С очередью
+        write-behind ход только ставится в очередь.
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            user_content: Сообщение пользователя
+            assistant_content: Ответ ассистента
+            username: Имя пользователя (опционально, для get_or_create_user_id)
+            created_at: Время хода (None = время транзакции)
+
+        Returns:
+            ID созданных сообщений в порядке [пользователь, ассистент]
+            (пустой список, если запись отложена)
+        """
+        turn = [("user", user_content), ("assistant", assistant_content)]
+
+        if self.write_behind is not None:
+            await self.write_behind.enqueue(
+                PendingTurn(
+                    kind="message",
+                    key=telegram_id,
+                    user_content=user_content,
+                    assistant_content=assistant_content,
+                    created_at=datetime.utcnow(),
+                    username=username,
+                )
+            )
+            # Транзакции нет: ход сразу виден в кэше истории
+            if self.history_cache is not None:
+                for role, content in turn:
+                    self.history_cache.append(telegram_id, role, content)
+            return []
+
+        user_id = await self.get_or_create_user_id(telegram_id, username)
+
+        created_at = _turn_base(self.session, created_at)
+        rows = [
+            {
+                "user_id": user_id,
+                "role": role,
+                "content": content,
+                "content_length": len(content),
+                "is_deleted": False,
+                "created_at": _turn_created_at(position, created_at),
+            }
+            for position, (role, content) in enumerate(turn)
+        ]
+        result = await self.session.execute(insert(Message).values(rows).returning(Message.id))
+        message_ids = [row.id for row in result]
+
+        if self.maintain_rollup:
+            # Учитываем сообщения в почасовом агрегате для статистики
+            await add_messages_to_rollup(self.session, message_ids)
+
+        if self.history_cache is not None:
+            for role, content in turn:
+                self.history_cache.record_append(
+                    self.session.sync_session, telegram_id, role, content
+                )
+
+        logger.debug(
+            f"Added turn for user {telegram_id}: "
+            f"user length={len(user_content)}, assistant length={len(assistant_content)}"
+        )
+
+        return message_ids
+
     async def get_history(
         self, telegram_id: int, limit: int | None = None
     ) -> list[dict[str, str]]:
@@ -109,40 +336,61 @@ class MessageRepository:
             Список сообщений в формате [{"role": "user", "content": "..."}, ...]
             Возвращает пустой список, если пользователя или сообщений нет
         """
-        # Сначала находим пользователя
-        result = await self.session.execute(
-            select(User).where(User.telegram_id == telegram_id, User.is_deleted == False)
-        )
-        user = result.scalar_one_or_none()
-
-        if user is None:
-            logger.debug(f"No user found with telegram_id={telegram_id}")
-            return []
+        cache = self.history_cache
+        if (
+            cache is None
+            or limit is None
+            or limit > cache.max_messages
+            or HistoryCache.has_pending(self.session.sync_session, telegram_id)
+        ):
+            return await self._load_history(telegram_id, limit)
+
+        cached: list[dict[str, str]] | None = cache.get(telegram_id, limit)
+        if cached is not None:
+            logger.debug(f"History cache hit for user {telegram_id}: {len(cached)} messages")
+            return cached
+
+        # Промах: загружаем полный буфер, чтобы следующие запросы обслуживались из памяти
+        token = cache.begin_load(telegram_id)
+        try:
+            history = await self._load_history(telegram_id, cache.max_messages)
+        except BaseException:
+            cache.abort_load(telegram_id, token)
+            raise
+        cache.store(telegram_id, history, token)
+
+        return history[max(len(history) - limit, 0):]
+
+    async def _load_history(
+        self, telegram_id: int, limit: int | None
+    ) -> list[dict[str, str]]:
+        """Загрузить историю пользователя из БД (см. get_history)."""
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("message", telegram_id)
 
-        # Получаем сообщения пользователя (только не удалённые)
+        # Один запрос: сообщения по telegram_id через join с users, только нужные колонки
         query = (
-            select(Message)
-            .where(Message.user_id == user.id, Message.is_deleted == False)
-            .order_by(Message.created_at.asc())
+            select(Message.role, Message.content)
+            .join(User, User.id == Message.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                User.is_deleted == False,
+                Message.is_deleted == False,
+            )
         )
 
         if limit is not None:
             # Берём последние N сообщений
             # Для этого сортируем по убыванию, берём limit, и переворачиваем
-            query = (
-                select(Message)
-                .where(Message.user_id == user.id, Message.is_deleted == False)
-                .order_by(Message.created_at.desc())
-                .limit(limit)
-            )
+            query = query.order_by(Message.created_at.desc()).limit(limit)
             result = await self.session.execute(query)
-            messages = list(reversed(result.scalars().all()))
+            rows = list(reversed(result.all()))
         else:
-            result = await self.session.execute(query)
-            messages = result.scalars().all()
+            result = await self.session.execute(query.order_by(Message.created_at.asc()))
+            rows = list(result.all())
 
         # Преобразуем в формат для LLM
-        history = [{"role": msg.role, "content": msg.content} for msg in messages]
+        history = [{"role": row.role, "content": row.content} for row in rows]
 
         logger.debug(
             f"Retrieved history for user {telegram_id}: {len(history)} messages"
@@ -150,46 +398,180 @@ class MessageRepository:
 
         return history
 
-    async def clear_history(self, telegram_id: int) -> int:
+    async def get_history_page(
+        self,
+        telegram_id: int,
+        cursor: HistoryCursor | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> HistoryPage:
+        """
+        Получить страницу истории пользователя (от старых сообщений к новым).
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            cursor: Курсор из предыдущей страницы (None = с начала истории)
+            limit: Размер страницы (от 1 до MAX_PAGE_SIZE)
+
+        Returns:
+            Страница с сообщениями {"id", "role", "content", "created_at"}
+            и курсором следующей страницы (None на последней)
+
+        Raises:
+            ValueError: Если размер страницы вне допустимого диапазона
+        """
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("message", telegram_id)
+
+        query = (
+            select(Message.id, Message.role, Message.content, Message.created_at)
+            .join(User, User.id == Message.user_id)
+            .where(
+                User.telegram_id == telegram_id,
+                User.is_deleted == False,
+                Message.is_deleted == False,
+            )
+        )
+        page = await _fetch_page(
+            self.session, query, Message.created_at, Message.id, cursor, limit
+        )
+
+        logger.debug(
+            f"Retrieved history page for user {telegram_id}: {len(page.messages)} messages"
+        )
+
+        return page
+
+    async def iter_history(
+        self, telegram_id: int, page_size: int = MAX_PAGE_SIZE
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Последовательно перебрать всю историю пользователя постранично.
+
+        В памяти одновременно находится не больше одной страницы.
+
+        Args:
+            telegram_id: ID пользователя в Telegram
+            page_size: Размер страницы запроса
+
+        Yields:
+            Сообщения {"id", "role", "content", "created_at"} в хронологическом порядке
+        """
+        cursor = None
+        while True:
+            page = await self.get_history_page(telegram_id, cursor, page_size)
+            for message in page.messages:
+                yield message
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    async def clear_history(
+        self,
+        telegram_id: int,
+        chunk_size: int = CLEAR_HISTORY_CHUNK_SIZE,
+        pause_seconds: float = CLEAR_HISTORY_CHUNK_PAUSE_SECONDS,
+    ) -> int:
         """
         Очистить историю диалога пользователя (soft delete).
 
+        Сообщения помечаются set-based UPDATE порциями по chunk_size строк,
+        от старых к новым. Каждая порция коммитится отдельно, с паузой
+        pause_seconds между порциями, поэтому блокировки строк держатся не
+        дольше одной порции. Метод коммитит сессию репозитория: вызывать без
+        других незакоммиченных изменений. Если очистка прервётся, уже
+        закоммиченные порции останутся удалёнными, а повторный вызов
+        дочистит остальное. Ходы из очереди write-behind сначала дописываются
+        в БД, чтобы очистка их тоже удалила.
+
         Args:
             telegram_id: ID пользователя в Telegram
+            chunk_size: Максимум сообщений в одном UPDATE
+            pause_seconds: Пауза между порциями в секундах
 
         Returns:
             Количество помеченных как удалённые сообщений
         """
-        # Находим пользователя
-        result = await self.session.execute(
-            select(User).where(User.telegram_id == telegram_id, User.is_deleted == False)
-        )
-        user = result.scalar_one_or_none()
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("message", telegram_id)
 
-        if user is None:
-            logger.debug(f"No user found with telegram_id={telegram_id}")
+        user_id = await self.session.scalar(
+            select(User.id).where(User.telegram_id == telegram_id, User.is_deleted == False)
+        )
+        if user_id is None:
             return 0
 
-        # Получаем все не удалённые сообщения
-        result = await self.session.execute(
-            select(Message).where(
-                Message.user_id == user.id, Message.is_deleted == False
-            )
+        # Самые старые живые сообщения пользователя (по индексу user_id, created_at, id)
+        chunk = (
+            select(Message.id, Message.created_at)
+            .where(Message.user_id == user_id, Message.is_deleted == False)
+            .order_by(Message.created_at, Message.id)
+            .limit(chunk_size)
+            .with_for_update()
         )
-        messages = result.scalars().all()
 
-        # Помечаем как удалённые
         count = 0
-        for message in messages:
-            message.is_deleted = True
-            count += 1
+        while True:
+            rows = (await self.session.execute(chunk)).all()
+            if rows:
+                message_ids = [row.id for row in rows]
+                await self.session.execute(
+                    update(Message)
+                    .where(
+                        Message.id.in_(message_ids),
+                        Message.created_at.between(rows[0].created_at, rows[-1].created_at),
+                    )
+                    .values(is_deleted=True)
+                    .execution_options(synchronize_session=False)
+                )
+                if self.maintain_rollup:
+                    vacated_ids = await self._vacated_message_ids(user_id, rows)
+                    await remove_messages_from_rollup(
+                        self.session, user_id, message_ids, vacated_ids
+                    )
+                count += len(rows)
 
-        await self.session.flush()
+            # Инвалидация и после коммита: история, прочитанная между порциями, устарела
+            self._invalidate_history_cache(telegram_id)
+            await self.session.commit()
+
+            if len(rows) < chunk_size:
+                break
+            await asyncio.sleep(pause_seconds)
 
         logger.info(f"Cleared history for user {telegram_id}: {count} messages marked as deleted")
 
         return count
 
+    async def _vacated_message_ids(self, user_id: int, rows: Sequence[Row[Any]]) -> list[int]:
+        """Сообщения порции из часов, где у пользователя не осталось живых сообщений.
+
+        Порция — самые старые живые сообщения, поэтому живые сообщения могут
+        остаться только в часе последнего сообщения порции.
+        """
+        last_hour = rows[-1].created_at.replace(minute=0, second=0, microsecond=0)
+        still_live = await self.session.scalar(
+            select(Message.id)
+            .where(
+                Message.user_id == user_id,
+                Message.is_deleted == False,
+                Message.created_at < last_hour + timedelta(hours=1),
+            )
+            .limit(1)
+        )
+        return [row.id for row in rows if still_live is None or row.created_at < last_hour]
+
+    def _invalidate_history_cache(self, telegram_id: int) -> None:
+        """Сбросить кэш истории сейчас и ещё раз после коммита транзакции.
+
+        Повторная инвалидация отбрасывает историю, загруженную конкурентным
+        запросом до коммита очистки.
+        """
+        if self.history_cache is None:
+            return
+
+        self.history_cache.invalidate(telegram_id)
+        self.history_cache.record_invalidate(self.session.sync_session, telegram_id)
+
 
 class ChatRepository:
     """
@@ -198,14 +580,83 @@ class ChatRepository:
     Предоставляет интерфейс для операций с историей чата в веб-приложении.
     """
 
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        write_behind: "WriteBehindQueue | None" = None,
+        session_cache: ChatSessionCache | None = None,
+        last_active_interval: timedelta = LAST_ACTIVE_UPDATE_INTERVAL,
+    ) -> None:
         """
         Инициализация repository.
 
         Args:
             session: Асинхронная сессия SQLAlchemy
+            write_behind: Очередь отложенной записи ходов (None = писать сразу)
+            session_cache: Кэш session_id → chat_sessions.id (None = общий кэш процесса)
+            last_active_interval: Минимальный интервал между обновлениями last_active
         """
         self.session = session
+        self.write_behind = write_behind
+        self.session_cache = session_cache if session_cache is not None else chat_session_cache
+        self.last_active_interval = last_active_interval
+
+    async def get_or_create_session_id(self, session_id: str) -> int:
+        """
+        Получить ID сессии чата, создав её при необходимости.
+
+        Известные сессии берутся из кэша без запроса к БД; last_active
+        обновляется не чаще раза в last_active_interval. При промахе кэша
+        выполняется один INSERT ... ON CONFLICT DO UPDATE ... RETURNING id,
+        поэтому первые сообщения новой сессии не конфликтуют по уникальности.
+
+        Args:
+            session_id: UUID сессии от клиента
+
+        Returns:
+            ID сессии в БД
+        """
+        sync_session = self.session.sync_session
+        now = datetime.utcnow()
+
+        entry: tuple[int, datetime] | None = self.session_cache.lookup(sync_session, session_id)
+
+        if entry is not None:
+            chat_session_id, last_active = entry
+            if now - last_active < self.last_active_interval:
+                return chat_session_id
+
+            updated = cast(
+                CursorResult[Any],
+                await self.session.execute(
+                    update(ChatSession)
+                    .where(ChatSession.id == chat_session_id)
+                    .values(last_active=now)
+                    .execution_options(synchronize_session=False)
+                ),
+            )
+            if updated.rowcount > 0:
+                self.session_cache.remember(sync_session, session_id, (chat_session_id, now))
+                logger.debug(f"Updated last_active for session: session_id={session_id}")
+                return chat_session_id
+
+            # Сессия удалена другим процессом: создаём заново
+            self.session_cache.invalidate(session_id)
+
+        statement = insert_for(self.session, ChatSession).values(
+            session_id=session_id, last_active=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[ChatSession.session_id],
+            set_={"last_active": statement.excluded.last_active},
+        ).returning(ChatSession.id)
+        result = await self.session.execute(statement)
+        chat_session_id = cast(int, result.scalar_one())
+
+        self.session_cache.remember(sync_session, session_id, (chat_session_id, now))
+        logger.debug(f"Upserted chat session: session_id={session_id}, id={chat_session_id}")
+
+        return chat_session_id
 
     async def get_or_create_session(self, session_id: str) -> ChatSession:
         """
@@ -217,25 +668,8 @@ class ChatRepository:
         Returns:
             ChatSession: Объект сессии чата
         """
-        # Ищем сессию
-        result = await self.session.execute(
-            select(ChatSession).where(ChatSession.session_id == session_id)
-        )
-        chat_session = result.scalar_one_or_none()
-
-        if chat_session is None:
-            # Создаём новую сессию
-            chat_session = ChatSession(session_id=session_id)
-            self.session.add(chat_session)
-            await self.session.flush()  # Чтобы получить ID
-            logger.info(f"Created new chat session: session_id={session_id}")
-        else:
-            # Обновляем last_active
-            from datetime import datetime
-            chat_session.last_active = datetime.utcnow()
-            logger.debug(f"Updated last_active for session: session_id={session_id}")
-
-        return chat_session
+        chat_session_id = await self.get_or_create_session_id(session_id)
+        return await self.session.get_one(ChatSession, chat_session_id)
 
     async def add_chat_message(
         self, session_id: str, role: str, content: str, mode: str = "normal"
@@ -253,15 +687,18 @@ class ChatRepository:
             ChatMessage: Созданное сообщение
         """
         # Получаем или создаём сессию
-        chat_session = await self.get_or_create_session(session_id)
+        chat_session_id = await self.get_or_create_session_id(session_id)
 
         # Создаём сообщение
         message = ChatMessage(
-            session_id=chat_session.id,
+            session_id=chat_session_id,
             role=role,
             content=content,
             mode=mode,
         )
+        if not is_postgresql(self.session):
+            # В SQLite CURRENT_TIMESTAMP имеет точность до секунды
+            message.created_at = datetime.now(timezone.utc).replace(tzinfo=None)
 
         self.session.add(message)
         await self.session.flush()
@@ -272,6 +709,71 @@ class ChatRepository:
 
         return message
 
+    async def add_chat_turn(
+        self,
+        session_id: str,
+        user_content: str,
+        assistant_content: str,
+        mode: str = "normal",
+        created_at: datetime | None = None,
+    ) -> list[int]:
+        """
+        Сохранить ход чата: сообщение пользователя и ответ ассистента.
+
+        Сессия определяется один раз, оба сообщения вставляются одним
+        многострочным INSERT с упорядоченными created_at. С очередью
+        write-behind ход только ставится в очередь.
+
+        Args:
+            session_id: UUID сессии от клиента
+            user_content: Сообщение пользователя
+            assistant_content: Ответ ассистента
+            mode: Режим чата ("normal" или "admin")
+            created_at: Время хода (None = время транзакции)
+
+        Returns:
+            ID созданных сообщений в порядке [пользователь, ассистент]
+            (пустой список, если запись отложена)
+        """
+        if self.write_behind is not None:
+            await self.write_behind.enqueue(
+                PendingTurn(
+                    kind="chat",
+                    key=session_id,
+                    user_content=user_content,
+                    assistant_content=assistant_content,
+                    created_at=datetime.utcnow(),
+                    mode=mode,
+                )
+            )
+            return []
+
+        chat_session_id = await self.get_or_create_session_id(session_id)
+
+        turn = [("user", user_content), ("assistant", assistant_content)]
+        created_at = _turn_base(self.session, created_at)
+        rows = [
+            {
+                "session_id": chat_session_id,
+                "role": role,
+                "content": content,
+                "mode": mode,
+                "created_at": _turn_created_at(position, created_at),
+            }
+            for position, (role, content) in enumerate(turn)
+        ]
+        result = await self.session.execute(
+            insert(ChatMessage).values(rows).returning(ChatMessage.id)
+        )
+        message_ids = [row.id for row in result]
+
+        logger.debug(
+            f"Added chat turn for session {session_id}: mode={mode}, "
+            f"user length={len(user_content)}, assistant length={len(assistant_content)}"
+        )
+
+        return message_ids
+
     async def get_chat_history(
         self, session_id: str, limit: int | None = None
     ) -> list[dict[str, str]]:
@@ -286,39 +788,27 @@ class ChatRepository:
             Список сообщений в формате [{"role": "user", "content": "..."}, ...]
             Возвращает пустой список, если сессии или сообщений нет
         """
-        # Находим сессию
-        result = await self.session.execute(
-            select(ChatSession).where(ChatSession.session_id == session_id)
-        )
-        chat_session = result.scalar_one_or_none()
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("chat", session_id)
 
-        if chat_session is None:
-            logger.debug(f"No chat session found with session_id={session_id}")
-            return []
-
-        # Получаем сообщения сессии
+        # Один запрос: сообщения по session_id через join с chat_sessions
         query = (
-            select(ChatMessage)
-            .where(ChatMessage.session_id == chat_session.id)
-            .order_by(ChatMessage.created_at.asc())
+            select(ChatMessage.role, ChatMessage.content)
+            .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .where(ChatSession.session_id == session_id)
         )
 
         if limit is not None:
             # Берём последние N сообщений
-            query = (
-                select(ChatMessage)
-                .where(ChatMessage.session_id == chat_session.id)
-                .order_by(ChatMessage.created_at.desc())
-                .limit(limit)
-            )
+            query = query.order_by(ChatMessage.created_at.desc()).limit(limit)
             result = await self.session.execute(query)
-            messages = list(reversed(result.scalars().all()))
+            rows = list(reversed(result.all()))
         else:
-            result = await self.session.execute(query)
-            messages = result.scalars().all()
+            result = await self.session.execute(query.order_by(ChatMessage.created_at.asc()))
+            rows = list(result.all())
 
         # Преобразуем в формат для LLM
-        history = [{"role": msg.role, "content": msg.content} for msg in messages]
+        history = [{"role": row.role, "content": row.content} for row in rows]
 
         logger.debug(
             f"Retrieved chat history for session {session_id}: {len(history)} messages"
@@ -326,41 +816,124 @@ class ChatRepository:
 
         return history
 
-    async def clear_chat_history(self, session_id: str) -> int:
+    async def get_chat_history_page(
+        self,
+        session_id: str,
+        cursor: HistoryCursor | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> HistoryPage:
         """
-        Очистить историю чата (полное удаление).
+        Получить страницу истории чата (от старых сообщений к новым).
 
         Args:
             session_id: UUID сессии от клиента
+            cursor: Курсор из предыдущей страницы (None = с начала истории)
+            limit: Размер страницы (от 1 до MAX_PAGE_SIZE)
 
         Returns:
-            Количество удалённых сообщений
+            Страница с сообщениями {"id", "role", "content", "mode", "created_at"}
+            и курсором следующей страницы (None на последней)
+
+        Raises:
+            ValueError: Если размер страницы вне допустимого диапазона
         """
-        # Находим сессию
-        result = await self.session.execute(
-            select(ChatSession).where(ChatSession.session_id == session_id)
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("chat", session_id)
+
+        query = (
+            select(
+                ChatMessage.id,
+                ChatMessage.role,
+                ChatMessage.content,
+                ChatMessage.mode,
+                ChatMessage.created_at,
+            )
+            .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .where(ChatSession.session_id == session_id)
+        )
+        page = await _fetch_page(
+            self.session, query, ChatMessage.created_at, ChatMessage.id, cursor, limit
         )
-        chat_session = result.scalar_one_or_none()
 
-        if chat_session is None:
-            logger.debug(f"No chat session found with session_id={session_id}")
-            return 0
+        logger.debug(
+            f"Retrieved chat history page for session {session_id}: "
+            f"{len(page.messages)} messages"
+        )
 
-        # Получаем все сообщения
-        result = await self.session.execute(
-            select(ChatMessage).where(ChatMessage.session_id == chat_session.id)
+        return page
+
+    async def iter_chat_history(
+        self, session_id: str, page_size: int = MAX_PAGE_SIZE
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Последовательно перебрать всю историю чата постранично.
+
+        Args:
+            session_id: UUID сессии от клиента
+            page_size: Размер страницы запроса
+
+        Yields:
+            Сообщения {"id", "role", "content", "mode", "created_at"} в хронологическом порядке
+        """
+        cursor = None
+        while True:
+            page = await self.get_chat_history_page(session_id, cursor, page_size)
+            for message in page.messages:
+                yield message
+            if page.next_cursor is None:
+                return
+            cursor = page.next_cursor
+
+    async def clear_chat_history(
+        self,
+        session_id: str,
+        chunk_size: int = CLEAR_HISTORY_CHUNK_SIZE,
+        pause_seconds: float = CLEAR_HISTORY_CHUNK_PAUSE_SECONDS,
+    ) -> int:
+        """
+        Очистить историю чата (полное удаление).
+
+        Сообщения удаляются set-based DELETE порциями по chunk_size строк.
+        Каждая порция коммитится отдельно, с паузой pause_seconds между
+        порциями, поэтому блокировки держатся не дольше одной порции. Метод
+        коммитит сессию репозитория: вызывать без других незакоммиченных
+        изменений. Ходы из очереди write-behind сначала дописываются в БД,
+        чтобы очистка их тоже удалила.
+
+        Args:
+            session_id: UUID сессии от клиента
+            chunk_size: Максимум сообщений в одном DELETE
+            pause_seconds: Пауза между порциями в секундах
+
+        Returns:
+            Количество удалённых сообщений
+        """
+        if self.write_behind is not None:
+            await self.write_behind.wait_flushed("chat", session_id)
+
+        chunk = (
+            select(ChatMessage.id)
+            .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+            .where(ChatSession.session_id == session_id)
+            .limit(chunk_size)
+        )
+        statement = (
+            delete(ChatMessage)
+            .where(ChatMessage.id.in_(chunk))
+            .execution_options(synchronize_session=False)
         )
-        messages = result.scalars().all()
 
-        # Удаляем все сообщения
         count = 0
-        for message in messages:
-            await self.session.delete(message)
-            count += 1
+        while True:
+            result = cast(CursorResult[Any], await self.session.execute(statement))
+            deleted: int = result.rowcount
+            count += deleted
+            await self.session.commit()
 
-        await self.session.flush()
+            if deleted < chunk_size:
+                break
+            await asyncio.sleep(pause_seconds)
 
         logger.info(f"Cleared chat history for session {session_id}: {count} messages deleted")
 
         return count
-
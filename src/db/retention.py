@@ -0,0 +1,345 @@
+"""Retention worker that moves old and soft-deleted messages to compressed archives."""
+
+import asyncio
+import contextlib
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.db.dialect import insert_for
+from src.db.models import Message
+
+logger = logging.getLogger(__name__)
+
+# Колонки messages, сохраняемые в архив (в порядке записи)
+ARCHIVED_COLUMNS = (
+    "id",
+    "user_id",
+    "role",
+    "content",
+    "content_length",
+    "created_at",
+    "is_deleted",
+)
+
+
+@dataclass(frozen=True)
+class ArchiveSegment:
+    """Запись индекса архива: один сжатый JSONL-сегмент."""
+
+    name: str
+    rows: int
+    min_id: int
+    max_id: int
+    min_created_at: str
+    max_created_at: str
+    sha256: str
+    archived_at: str
+
+
+class MessageArchive:
+    """
+    Append-only архив сообщений в каталоге.
+
+    Каждая пачка пишется в отдельный gzip-сжатый JSONL-сегмент
+    (messages-<min_id>-<max_id>.jsonl.gz), сведения о сегменте дописываются
+    в index.jsonl. Сегмент и строка индекса сбрасываются на диск (fsync)
+    до удаления строк из БД.
+    """
+
+    def __init__(self, directory: str | Path):
+        """
+        Инициализация архива.
+
+        Args:
+            directory: Каталог архива (создаётся при первой записи)
+        """
+        self.directory = Path(directory)
+        self.index_path = self.directory / "index.jsonl"
+
+    def segments(self) -> list[ArchiveSegment]:
+        """
+        Прочитать индекс архива.
+
+        Returns:
+            Сегменты в порядке записи (повторная запись сегмента заменяет прежнюю)
+        """
+        if not self.index_path.exists():
+            return []
+
+        segments: dict[str, ArchiveSegment] = {}
+        for line in self.index_path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                segment = ArchiveSegment(**json.loads(line))
+                segments.pop(segment.name, None)
+                segments[segment.name] = segment
+        return list(segments.values())
+
+    def write_segment(self, rows: list[dict[str, Any]]) -> ArchiveSegment:
+        """
+        Записать пачку сообщений в новый сегмент и добавить его в индекс.
+
+        Args:
+            rows: Сообщения (словари с колонками ARCHIVED_COLUMNS), отсортированные по id
+
+        Returns:
+            Запись индекса о сегменте
+        """
+        lines = [
+            json.dumps(
+                {column: self._dump_value(row[column]) for column in ARCHIVED_COLUMNS},
+                ensure_ascii=False,
+            )
+            for row in rows
+        ]
+        data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+
+        created = [row["created_at"] for row in rows]
+        segment = ArchiveSegment(
+            name=f"messages-{rows[0]['id']:012d}-{rows[-1]['id']:012d}.jsonl.gz",
+            rows=len(rows),
+            min_id=rows[0]["id"],
+            max_id=rows[-1]["id"],
+            min_created_at=min(created).isoformat(),
+            max_created_at=max(created).isoformat(),
+            sha256=hashlib.sha256(data).hexdigest(),
+            archived_at=datetime.utcnow().isoformat(),
+        )
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / segment.name
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        tmp_path.replace(path)
+
+        with self.index_path.open("a", encoding="utf-8") as index:
+            index.write(json.dumps(asdict(segment)) + "\n")
+            index.flush()
+            os.fsync(index.fileno())
+
+        return segment
+
+    def read_segment(self, segment: ArchiveSegment) -> list[dict[str, Any]]:
+        """
+        Прочитать сообщения сегмента.
+
+        Raises:
+            ValueError: Если контрольная сумма сегмента не совпадает с индексом
+        """
+        data = (self.directory / segment.name).read_bytes()
+        if hashlib.sha256(data).hexdigest() != segment.sha256:
+            raise ValueError(f"Archive segment {segment.name} is corrupted (checksum mismatch)")
+
+        rows = []
+        for line in gzip.decompress(data).decode("utf-8").splitlines():
+            if line.strip():
+                row = json.loads(line)
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def _dump_value(value: Any) -> Any:
+        """Преобразовать значение колонки в JSON-совместимое."""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+
+class RetentionWorker:
+    """
+    Перенос удалённых (is_deleted) и устаревших сообщений в архив.
+
+    Сообщения выбираются пачками по batch_size (FOR UPDATE SKIP LOCKED),
+    пачка записывается в сегмент архива и удаляется из messages в одной
+    транзакции. Между пачками выдерживается пауза pause_seconds, чтобы
+    работа не мешала основной нагрузке.
+
+    Почасовой агрегат message_rollup_hourly не меняется: удалённые
+    сообщения уже вычтены из него при очистке истории, а статистика по
+    устаревшим сообщениям сохраняется.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        archive: MessageArchive,
+        retention_days: int = 0,
+        batch_size: int = 1000,
+        pause_seconds: float = 0.0,
+        interval_seconds: float = 3600.0,
+    ):
+        """
+        Инициализация воркера.
+
+        Args:
+            session_factory: Фабрика сессий SQLAlchemy
+            archive: Архив сообщений
+            retention_days: Возраст, после которого сообщения архивируются
+                (0 = архивировать только удалённые)
+            batch_size: Максимум сообщений в одной пачке
+            pause_seconds: Пауза между пачками
+            interval_seconds: Интервал между запусками в фоновом режиме
+        """
+        self.session_factory = session_factory
+        self.archive = archive
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.pause_seconds = pause_seconds
+        self.interval_seconds = interval_seconds
+        self._task: asyncio.Task[None] | None = None
+
+    async def run_once(self, max_batches: int | None = None) -> int:
+        """
+        Архивировать все подходящие сообщения пачками.
+
+        Args:
+            max_batches: Ограничение количества пачек за запуск (None = без ограничения)
+
+        Returns:
+            Количество архивированных сообщений
+        """
+        cutoff = None
+        if self.retention_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            archived = await self.archive_batch(cutoff)
+            total += archived
+            batches += 1
+            if archived < self.batch_size:
+                break
+            await asyncio.sleep(self.pause_seconds)
+
+        logger.info(f"Retention run archived {total} messages in {batches} batches")
+        return total
+
+    async def archive_batch(self, cutoff: datetime | None) -> int:
+        """
+        Архивировать и удалить одну пачку сообщений.
+
+        Args:
+            cutoff: Сообщения старше этого времени архивируются (None = только удалённые)
+
+        Returns:
+            Количество архивированных сообщений
+        """
+        condition = Message.is_deleted == True
+        if cutoff is not None:
+            condition = or_(condition, Message.created_at < cutoff)
+
+        columns = [getattr(Message, column) for column in ARCHIVED_COLUMNS]
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(*columns)
+                .where(condition)
+                .order_by(Message.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = [dict(row) for row in result.mappings()]
+            if not rows:
+                return 0
+
+            # Сначала сегмент на диске, потом удаление: сбой между ними даёт
+            # только повторную запись той же пачки при следующем запуске
+            segment = await asyncio.to_thread(self.archive.write_segment, rows)
+            await session.execute(
+                delete(Message)
+                .where(Message.id.in_([row["id"] for row in rows]))
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+        logger.debug(f"Archived {segment.rows} messages to {segment.name}")
+        return segment.rows
+
+    async def restore(
+        self, segment_names: list[str] | None = None, user_id: int | None = None
+    ) -> int:
+        """
+        Вернуть сообщения из архива в messages.
+
+        Уже существующие строки пропускаются, поэтому восстановление можно
+        повторять. Сегменты остаются в архиве.
+
+        Args:
+            segment_names: Имена сегментов (None = все сегменты)
+            user_id: Восстановить только сообщения этого пользователя (users.id)
+
+        Returns:
+            Количество прочитанных из архива сообщений
+
+        Raises:
+            ValueError: Если сегмент не найден в индексе или повреждён
+        """
+        segments = self.archive.segments()
+        if segment_names is not None:
+            known = {segment.name: segment for segment in segments}
+            missing = [name for name in segment_names if name not in known]
+            if missing:
+                raise ValueError(f"Unknown archive segments: {', '.join(missing)}")
+            segments = [known[name] for name in segment_names]
+
+        total = 0
+        for segment in segments:
+            rows = await asyncio.to_thread(self.archive.read_segment, segment)
+            if user_id is not None:
+                rows = [row for row in rows if row["user_id"] == user_id]
+
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                async with self.session_factory() as session:
+                    await session.execute(
+                        insert_for(session, Message).values(batch).on_conflict_do_nothing()
+                    )
+                    await session.commit()
+                total += len(batch)
+                await asyncio.sleep(self.pause_seconds)
+
+            logger.info(f"Restored {len(rows)} messages from {segment.name}")
+
+        return total
+
+    def start(self) -> None:
+        """Запустить периодическую архивацию."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Retention worker started (interval {self.interval_seconds}s, "
+                f"retention {self.retention_days} days)"
+            )
+
+    async def stop(self) -> None:
+        """Остановить периодическую архивацию."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Retention worker stopped")
+
+    async def _run(self) -> None:
+        """Цикл: архивация, затем пауза."""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error running message retention: {e}")
+            await asyncio.sleep(self.interval_seconds)
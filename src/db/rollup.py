@@ -0,0 +1,304 @@
+"""Инкрементальное обслуживание почасовых агрегатов сообщений."""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import (
+    ColumnElement,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.dialect import date_trunc, insert_for, set_byte_max
+from src.db.models import Message, MessageRollupHourly, MessageRollupHourlyUser
+from src.stats.hyperloglog import HLL_REGISTERS, HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+EMPTY_HLL = bytes(HLL_REGISTERS)
+HLL_BACKFILL_BATCH_SIZE = 500
+
+
+def _hour_bucket(session: AsyncSession, column: ColumnElement[datetime]) -> ColumnElement[datetime]:
+    """SQL-выражение начала часа для колонки с датой."""
+    bucket: ColumnElement[datetime] = date_trunc(session, "hour", column)
+    return bucket
+
+
+async def add_message_to_rollup(session: AsyncSession, message_id: int) -> None:
+    """
+    Учесть новое сообщение в почасовом агрегате.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        message_id: ID уже сохранённого (flush) сообщения
+    """
+    await add_messages_to_rollup(session, [message_id])
+
+
+async def add_messages_to_rollup(session: AsyncSession, message_ids: list[int]) -> None:
+    """
+    Учесть пачку новых сообщений в почасовом агрегате.
+
+    Час берётся из created_at, выставленного базой данных при вставке.
+    Сообщения группируются по часу, поэтому на пачку (например, ход
+    диалога) выполняется одинаковое число запросов, что и на одно сообщение.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        message_ids: ID уже сохранённых (flush) сообщений
+    """
+    if not message_ids:
+        return
+
+    bucket = _hour_bucket(session, Message.created_at)
+    in_batch = Message.id.in_(message_ids)
+
+    # Отмечаем пользователей в часах; RETURNING вернёт только впервые встреченные пары
+    users_stmt = (
+        insert_for(session, MessageRollupHourlyUser)
+        .from_select(
+            ["bucket_start", "user_id"],
+            select(bucket, Message.user_id).where(in_batch).distinct(),
+        )
+        .on_conflict_do_nothing()
+        .returning(MessageRollupHourlyUser.bucket_start, MessageRollupHourlyUser.user_id)
+    )
+    result = await session.execute(users_stmt)
+    new_users = result.all()
+
+    new_users_by_bucket: dict[datetime, int] = {}
+    for row in new_users:
+        new_users_by_bucket[row.bucket_start] = new_users_by_bucket.get(row.bucket_start, 0) + 1
+    distinct_users: ColumnElement[int]
+    if new_users_by_bucket:
+        distinct_users = case(new_users_by_bucket, value=bucket, else_=0)
+    else:
+        distinct_users = literal(0)
+
+    grouped_bucket = bucket.label("bucket_start")
+    rollup_stmt = insert_for(session, MessageRollupHourly).from_select(
+        [
+            "bucket_start",
+            "message_count",
+            "distinct_users",
+            "user_message_count",
+            "assistant_message_count",
+            "total_content_length",
+        ],
+        select(
+            grouped_bucket,
+            func.count(Message.id),
+            func.max(distinct_users),
+            func.count(case((Message.role == "user", Message.id))),
+            func.count(case((Message.role == "assistant", Message.id))),
+            func.sum(Message.content_length),
+        )
+        .where(in_batch)
+        .group_by(grouped_bucket),
+    )
+    excluded = rollup_stmt.excluded
+    rollup_stmt = rollup_stmt.on_conflict_do_update(
+        index_elements=[MessageRollupHourly.bucket_start],
+        set_={
+            "message_count": MessageRollupHourly.message_count + excluded.message_count,
+            "distinct_users": MessageRollupHourly.distinct_users + excluded.distinct_users,
+            "user_message_count": (
+                MessageRollupHourly.user_message_count + excluded.user_message_count
+            ),
+            "assistant_message_count": (
+                MessageRollupHourly.assistant_message_count + excluded.assistant_message_count
+            ),
+            "total_content_length": (
+                MessageRollupHourly.total_content_length + excluded.total_content_length
+            ),
+        },
+    )
+    await session.execute(rollup_stmt)
+
+    for row in new_users:
+        await _add_user_to_hll(session, row.bucket_start, row.user_id)
+
+
+async def _add_user_to_hll(session: AsyncSession, bucket_start: datetime, user_id: int) -> None:
+    """
+    Добавить пользователя в HLL-скетч часа атомарным обновлением одного регистра.
+
+    Индекс и ранг считаются в Python, а max по регистру выполняется в SQL
+    (set_byte_max), поэтому параллельные вставки не теряют обновления.
+    """
+    index, rank = HyperLogLog.position(user_id)
+    sketch = func.coalesce(MessageRollupHourly.users_hll, EMPTY_HLL)
+
+    await session.execute(
+        update(MessageRollupHourly)
+        .where(MessageRollupHourly.bucket_start == bucket_start)
+        .values(users_hll=set_byte_max(session, sketch, index, rank))
+    )
+
+
+async def remove_messages_from_rollup(
+    session: AsyncSession, user_id: int, message_ids: list[int], vacated_ids: list[int]
+) -> None:
+    """
+    Вычесть из агрегата сообщения пользователя, только что помеченные удалёнными.
+
+    distinct_users уменьшается на 1 только в часах, где у пользователя не
+    осталось живых сообщений: такие часы задаются сообщениями из vacated_ids.
+    Поэтому порции одной очистки истории можно коммитить по отдельности.
+    HLL-скетчи не поддерживают удаление и остаются как есть до следующего backfill.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+        user_id: Внутренний ID пользователя (users.id)
+        message_ids: ID сообщений пользователя, помеченных удалёнными
+        vacated_ids: Подмножество message_ids из часов, где живых сообщений
+            пользователя больше нет
+    """
+    if not message_ids:
+        return
+
+    bucket = _hour_bucket(session, Message.created_at).label("bucket_start")
+    removed = (
+        select(
+            bucket,
+            func.count(Message.id).label("message_count"),
+            func.count(case((Message.role == "user", Message.id))).label("user_message_count"),
+            func.count(case((Message.role == "assistant", Message.id))).label(
+                "assistant_message_count"
+            ),
+            func.coalesce(func.sum(Message.content_length), 0).label("total_content_length"),
+        )
+        .where(Message.id.in_(message_ids))
+        .group_by(bucket)
+        .subquery()
+    )
+
+    await session.execute(
+        update(MessageRollupHourly)
+        .where(MessageRollupHourly.bucket_start == removed.c.bucket_start)
+        .values(
+            message_count=MessageRollupHourly.message_count - removed.c.message_count,
+            user_message_count=(
+                MessageRollupHourly.user_message_count - removed.c.user_message_count
+            ),
+            assistant_message_count=(
+                MessageRollupHourly.assistant_message_count - removed.c.assistant_message_count
+            ),
+            total_content_length=(
+                MessageRollupHourly.total_content_length - removed.c.total_content_length
+            ),
+        )
+    )
+
+    if not vacated_ids:
+        return
+
+    # Часы, которые пользователь покинул: уменьшаем distinct_users и убираем отметку
+    vacated_buckets = select(_hour_bucket(session, Message.created_at)).where(
+        Message.id.in_(vacated_ids)
+    )
+    user_in_bucket = (MessageRollupHourlyUser.user_id == user_id) & (
+        MessageRollupHourlyUser.bucket_start.in_(vacated_buckets)
+    )
+    await session.execute(
+        update(MessageRollupHourly)
+        .where(
+            MessageRollupHourly.bucket_start.in_(
+                select(MessageRollupHourlyUser.bucket_start).where(user_in_bucket)
+            )
+        )
+        .values(distinct_users=MessageRollupHourly.distinct_users - 1)
+    )
+    await session.execute(delete(MessageRollupHourlyUser).where(user_in_bucket))
+
+
+async def backfill_rollup(session: AsyncSession) -> int:
+    """
+    Полностью пересобрать почасовые агрегаты из таблицы messages.
+
+    Args:
+        session: Асинхронная сессия SQLAlchemy
+
+    Returns:
+        Количество созданных почасовых строк
+    """
+    await session.execute(delete(MessageRollupHourlyUser))
+    await session.execute(delete(MessageRollupHourly))
+
+    bucket = _hour_bucket(session, Message.created_at)
+    live_messages = Message.is_deleted == False
+
+    await session.execute(
+        insert(MessageRollupHourlyUser).from_select(
+            ["bucket_start", "user_id"],
+            select(bucket, Message.user_id).where(live_messages).distinct(),
+        )
+    )
+
+    result = await session.execute(
+        insert(MessageRollupHourly)
+        .from_select(
+            [
+                "bucket_start",
+                "message_count",
+                "distinct_users",
+                "user_message_count",
+                "assistant_message_count",
+                "total_content_length",
+            ],
+            select(
+                bucket,
+                func.count(Message.id),
+                func.count(func.distinct(Message.user_id)),
+                func.count(case((Message.role == "user", Message.id))),
+                func.count(case((Message.role == "assistant", Message.id))),
+                func.sum(Message.content_length),
+            )
+            .where(live_messages)
+            .group_by(bucket),
+        )
+        .returning(MessageRollupHourly.bucket_start)
+    )
+    bucket_count = len(result.all())
+
+    await _backfill_hll(session)
+
+    logger.info(f"Message rollup backfilled: {bucket_count} hourly buckets")
+    return bucket_count
+
+
+async def _backfill_hll(session: AsyncSession) -> None:
+    """Пересобрать HLL-скетчи всех часов из message_rollup_hourly_users."""
+    rows = await session.stream(
+        select(MessageRollupHourlyUser.bucket_start, MessageRollupHourlyUser.user_id).order_by(
+            MessageRollupHourlyUser.bucket_start
+        )
+    )
+
+    pending: list[dict[str, object]] = []
+    current_bucket: datetime | None = None
+    sketch = HyperLogLog()
+
+    async for bucket_start, user_id in rows:
+        if bucket_start != current_bucket:
+            if current_bucket is not None:
+                pending.append({"bucket_start": current_bucket, "users_hll": sketch.to_bytes()})
+            current_bucket = bucket_start
+            sketch = HyperLogLog()
+        sketch.add(user_id)
+
+        if len(pending) >= HLL_BACKFILL_BATCH_SIZE:
+            await session.execute(update(MessageRollupHourly), pending)
+            pending = []
+
+    if current_bucket is not None:
+        pending.append({"bucket_start": current_bucket, "users_hll": sketch.to_bytes()})
+    if pending:
+        await session.execute(update(MessageRollupHourly), pending)
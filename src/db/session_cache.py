@@ -0,0 +1,13 @@
+"""In-process LRU cache mapping chat session_id to chat_sessions.id."""
+
+from datetime import datetime
+
+from src.db.post_commit_cache import PostCommitLRUCache
+
+# Кэш session_id → (chat_sessions.id, last_active). last_active — последнее
+# записанное в БД значение: по нему ChatRepository решает, пора ли обновлять
+# строку сессии. Новые записи попадают в кэш только после коммита транзакции.
+ChatSessionCache = PostCommitLRUCache[str, tuple[int, datetime]]
+
+# Общий кэш процесса (репозитории создаются на каждую сессию)
+chat_session_cache = ChatSessionCache()
@@ -0,0 +1,11 @@
+"""In-process LRU cache mapping telegram_id to users.id."""
+
+from src.db.post_commit_cache import PostCommitLRUCache
+
+# Кэш telegram_id → (users.id, username). Username хранится рядом с ID:
+# если он изменился, запись считается промахом и пользователь обновляется
+# через upsert. Новые записи попадают в кэш только после коммита транзакции.
+UserIdCache = PostCommitLRUCache[int, tuple[int, str | None]]
+
+# Общий кэш процесса (репозитории создаются на каждую сессию)
+user_id_cache = UserIdCache()
@@ -0,0 +1,403 @@
+"""Write-behind queue that persists conversation turns off the response path."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Literal
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Суффикс файла рядом со spool для повреждённых строк и отложенных пачек
+REJECTED_SUFFIX = ".rejected"
+
+TurnKind = Literal["message", "chat"]
+
+
+@dataclass(frozen=True)
+class PendingTurn:
+    """Ход диалога, ожидающий записи в БД.
+
+    kind="message" — диалог Telegram-бота (key = telegram_id),
+    kind="chat" — веб-чат (key = session_id).
+    """
+
+    kind: TurnKind
+    key: int | str
+    user_content: str
+    assistant_content: str
+    created_at: datetime
+    username: str | None = None
+    mode: str = "normal"
+
+    def to_json(self) -> str:
+        """Сериализовать в строку JSON для spool-файла."""
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return json.dumps(data, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PendingTurn":
+        """Восстановить из строки spool-файла."""
+        data = json.loads(line)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+async def persist_turns(
+    session_factory: async_sessionmaker[AsyncSession],
+    turns: list[PendingTurn],
+    maintain_rollup: bool = False,
+) -> None:
+    """
+    Записать пачку ходов в БД одной транзакцией.
+
+    Args:
+        session_factory: Фабрика сессий SQLAlchemy
+        turns: Ходы в порядке поступления
+        maintain_rollup: Обновлять почасовой агрегат статистики
+    """
+    # Импорт здесь: репозитории сами ссылаются на очередь
+    from src.db.repository import ChatRepository, MessageRepository
+
+    async with session_factory() as session:
+        messages = MessageRepository(session, maintain_rollup=maintain_rollup)
+        chats = ChatRepository(session)
+        for turn in turns:
+            if turn.kind == "message":
+                await messages.add_turn(
+                    int(turn.key),
+                    turn.user_content,
+                    turn.assistant_content,
+                    username=turn.username,
+                    created_at=turn.created_at,
+                )
+            else:
+                await chats.add_chat_turn(
+                    str(turn.key),
+                    turn.user_content,
+                    turn.assistant_content,
+                    mode=turn.mode,
+                    created_at=turn.created_at,
+                )
+        await session.commit()
+
+
+class WriteBehindQueue:
+    """
+    Ограниченная очередь отложенной записи ходов диалога.
+
+    Обработчики кладут ход в очередь и сразу отвечают пользователю,
+    фоновый воркер пишет ходы пачками по batch_size или раз в
+    flush_interval_seconds. Если запись в БД не удалась, пачка дописывается
+    в локальный append-only spool-файл и повторяется после следующей
+    успешной записи (и при старте). При остановке очередь дописывается до конца.
+
+    Повреждённые строки spool (например, недописанная при сбое процесса) и
+    пачки, запись которых из spool не удалась max_replay_attempts раз подряд,
+    переносятся в файл <spool>.rejected, чтобы не блокировать остальные ходы.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[list[PendingTurn]], Awaitable[None]],
+        max_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval_seconds: float = 0.5,
+        spool_path: str | Path | None = None,
+        max_replay_attempts: int = 5,
+    ):
+        """
+        Инициализация очереди.
+
+        Args:
+            writer: Функция записи пачки ходов в БД (см. persist_turns)
+            max_size: Максимальная длина очереди (enqueue ждёт при переполнении)
+            batch_size: Максимальный размер пачки
+            flush_interval_seconds: Максимальное время накопления пачки
+            spool_path: Путь к spool-файлу (None = пачки с ошибкой теряются)
+            max_replay_attempts: Сколько раз подряд повторять запись первой
+                пачки spool, прежде чем отложить её в <spool>.rejected
+        """
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.spool_path = Path(spool_path) if spool_path is not None else None
+        self.max_replay_attempts = max_replay_attempts
+
+        self.flushed_total = 0
+        self.spooled_total = 0
+        self.dropped_total = 0
+        self.rejected_total = 0
+        self.last_flush_latency_ms = 0.0
+        self.max_flush_latency_ms = 0.0
+
+        self._queue: asyncio.Queue[PendingTurn | None] = asyncio.Queue(maxsize=max_size)
+        self._pending: dict[tuple[TurnKind, int | str], int] = {}
+        self._flushed = asyncio.Condition()
+        self._task: asyncio.Task[None] | None = None
+        self._spool_dirty = self.spool_path is not None and self.spool_path.exists()
+        self._replay_failures = 0
+
+    @property
+    def depth(self) -> int:
+        """Текущая длина очереди."""
+        return self._queue.qsize()
+
+    async def enqueue(self, turn: PendingTurn) -> None:
+        """Поставить ход в очередь (ждёт, если очередь заполнена)."""
+        key = (turn.kind, turn.key)
+        self._pending[key] = self._pending.get(key, 0) + 1
+        await self._queue.put(turn)
+
+    async def wait_flushed(self, kind: TurnKind, key: int | str) -> None:
+        """
+        Дождаться записи всех поставленных ходов диалога.
+
+        Используется перед чтением истории из БД, чтобы пользователь
+        видел свой предыдущий ход (read-your-writes).
+        """
+        if (kind, key) not in self._pending:
+            return
+
+        async with self._flushed:
+            await self._flushed.wait_for(lambda: (kind, key) not in self._pending)
+
+    def get_stats(self) -> dict[str, float]:
+        """
+        Получить метрики очереди.
+
+        Returns:
+            Словарь: depth, flushed_total, spooled_total, dropped_total,
+            rejected_total, last_flush_latency_ms, max_flush_latency_ms
+        """
+        return {
+            "depth": self.depth,
+            "flushed_total": self.flushed_total,
+            "spooled_total": self.spooled_total,
+            "dropped_total": self.dropped_total,
+            "rejected_total": self.rejected_total,
+            "last_flush_latency_ms": round(self.last_flush_latency_ms, 1),
+            "max_flush_latency_ms": round(self.max_flush_latency_ms, 1),
+        }
+
+    def start(self) -> None:
+        """Запустить фоновый воркер записи."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Write-behind queue started (batch {self.batch_size}, "
+                f"interval {self.flush_interval_seconds}s)"
+            )
+
+    async def stop(self) -> None:
+        """Дописать все ходы из очереди и остановить воркер."""
+        if self._task is None:
+            return
+
+        # Маркер остановки встаёт в очередь после всех уже поставленных ходов
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info(f"Write-behind queue stopped: {self.get_stats()}")
+
+    async def replay_spool(self) -> int:
+        """
+        Повторить запись ходов из spool-файла.
+
+        Строки, которые не удаётся разобрать, переносятся в <spool>.rejected.
+        Если первая пачка не записалась max_replay_attempts раз подряд, она
+        тоже переносится туда, и повтор продолжается со следующей.
+
+        Returns:
+            Количество записанных ходов (0, если spool пуст)
+        """
+        if self.spool_path is None or not self._spool_dirty:
+            return 0
+
+        turns, corrupt_lines = await asyncio.to_thread(self._read_spool, self.spool_path)
+        if corrupt_lines:
+            logger.error(
+                f"Skipped {len(corrupt_lines)} corrupt lines in write-behind spool "
+                f"{self.spool_path}"
+            )
+            await self._reject(self.spool_path, corrupt_lines)
+
+        written = 0
+        while turns:
+            batch = turns[: self.batch_size]
+            try:
+                await self.writer(batch)
+            except Exception as e:
+                self._replay_failures += 1
+                logger.error(
+                    f"Error replaying write-behind spool {self.spool_path} "
+                    f"(attempt {self._replay_failures}/{self.max_replay_attempts}): {e}"
+                )
+                if self._replay_failures < self.max_replay_attempts:
+                    # Уже записанные пачки не должны повториться: оставляем только хвост
+                    await asyncio.to_thread(self._rewrite_spool, self.spool_path, turns)
+                    return written
+
+                logger.error(f"Parking {len(batch)} turns from write-behind spool")
+                await self._reject(self.spool_path, [turn.to_json() for turn in batch])
+            else:
+                written += len(batch)
+            self._replay_failures = 0
+            turns = turns[len(batch) :]
+
+        await asyncio.to_thread(self.spool_path.unlink, missing_ok=True)
+        self._spool_dirty = False
+        if written:
+            logger.info(f"Replayed {written} turns from write-behind spool")
+        return written
+
+    async def _run(self) -> None:
+        """Цикл: накопить пачку по размеру или времени и записать её."""
+        await self._guarded(self.replay_spool())
+
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.flush_interval_seconds
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    turn = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if turn is None:
+                    stopping = True
+                    break
+                batch.append(turn)
+
+            await self._guarded(self._flush(batch))
+
+    @staticmethod
+    async def _guarded(operation: Awaitable[object]) -> None:
+        """Выполнить шаг воркера; ошибка логируется, воркер продолжает работу."""
+        try:
+            await operation
+        except Exception as e:
+            logger.error(f"Write-behind worker error: {e}", exc_info=True)
+
+    async def _flush(self, batch: list[PendingTurn]) -> None:
+        """Записать пачку в БД, при ошибке — в spool-файл."""
+        started = time.perf_counter()
+        try:
+            await self.writer(batch)
+        except Exception as e:
+            logger.error(f"Error flushing {len(batch)} turns to database: {e}")
+            await self._spool(batch)
+        else:
+            self.flushed_total += len(batch)
+            # БД снова доступна: дописываем накопленное при сбое
+            await self.replay_spool()
+        finally:
+            self.last_flush_latency_ms = (time.perf_counter() - started) * 1000
+            self.max_flush_latency_ms = max(self.max_flush_latency_ms, self.last_flush_latency_ms)
+            await self._release(batch)
+
+        logger.debug(
+            f"Flushed {len(batch)} turns in {self.last_flush_latency_ms:.1f}ms, "
+            f"queue depth {self.depth}"
+        )
+
+    async def _spool(self, batch: list[PendingTurn]) -> None:
+        """Дописать пачку в spool-файл (или потерять, если он не настроен)."""
+        if self.spool_path is None:
+            self.dropped_total += len(batch)
+            logger.error(f"Dropped {len(batch)} turns: write-behind spool is not configured")
+            return
+
+        try:
+            await asyncio.to_thread(self._append_spool, self.spool_path, batch)
+        except OSError as e:
+            self.dropped_total += len(batch)
+            logger.error(f"Dropped {len(batch)} turns: cannot write spool {self.spool_path}: {e}")
+            return
+
+        self.spooled_total += len(batch)
+        self._spool_dirty = True
+        logger.warning(f"Spooled {len(batch)} turns to {self.spool_path}")
+
+    async def _reject(self, spool_path: Path, lines: list[str]) -> None:
+        """Перенести строки spool в <spool>.rejected для ручного разбора."""
+        rejected_path = spool_path.with_name(spool_path.name + REJECTED_SUFFIX)
+        await asyncio.to_thread(self._append_lines, rejected_path, lines)
+        self.rejected_total += len(lines)
+        logger.warning(f"Moved {len(lines)} spool lines to {rejected_path}")
+
+    @staticmethod
+    def _read_spool(spool_path: Path) -> tuple[list[PendingTurn], list[str]]:
+        """Прочитать spool-файл: разобранные ходы и строки, которые разобрать не удалось."""
+        turns: list[PendingTurn] = []
+        corrupt_lines: list[str] = []
+        for line in spool_path.read_text(encoding="utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                turns.append(PendingTurn.from_json(line))
+            except (ValueError, KeyError, TypeError):
+                corrupt_lines.append(line)
+        return turns, corrupt_lines
+
+    @staticmethod
+    def _append_spool(spool_path: Path, batch: list[PendingTurn]) -> None:
+        """Дописать строки в spool-файл с fsync."""
+        WriteBehindQueue._append_lines(spool_path, [turn.to_json() for turn in batch])
+
+    @staticmethod
+    def _append_lines(path: Path, lines: list[str]) -> None:
+        """Дописать строки в файл с fsync.
+
+        Если файл обрывается на недописанной строке (сбой процесса во время
+        записи), новые строки начинаются с новой строки и не склеиваются с ней.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists() and path.stat().st_size > 0:
+            with path.open("rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    lines = ["", *lines]
+        with path.open("a", encoding="utf-8") as spool:
+            for line in lines:
+                spool.write(line + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+
+    @staticmethod
+    def _rewrite_spool(spool_path: Path, turns: list[PendingTurn]) -> None:
+        """Атомарно заменить содержимое spool-файла."""
+        tmp_path = spool_path.with_suffix(spool_path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as spool:
+            for turn in turns:
+                spool.write(turn.to_json() + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        tmp_path.replace(spool_path)
+
+    async def _release(self, batch: list[PendingTurn]) -> None:
+        """Снять отметки ожидания с записанных (или отложенных в spool) ходов."""
+        for turn in batch:
+            key = (turn.kind, turn.key)
+            self._pending[key] -= 1
+            if self._pending[key] == 0:
+                del self._pending[key]
+
+        async with self._flushed:
+            self._flushed.notify_all()
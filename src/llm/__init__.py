@@ -1,8 +1,8 @@
 """Модуль работы с LLM."""
 
-from src.llm.llm_client import LLMClient
+from src.llm.llm_client import LLMClient, StreamedResponse
 
 # Conversation is deprecated, use MessageRepository from src.db.repository
 # from src.llm.conversation import Conversation
 
-__all__ = ["LLMClient"]
+__all__ = ["LLMClient", "StreamedResponse"]
@@ -2,7 +2,8 @@
 DEPRECATED: Управление историей диалогов пользователей.
 
 Этот модуль устарел и сохранён только для совместимости.
-Используйте src.db.repository.MessageRepository для работы с историей диалогов.
+Используйте src.db.repository.MessageRepository для работы с историей диалогов
+и src.db.history_cache.HistoryCache для кэширования истории в памяти.
 """
 
 import logging
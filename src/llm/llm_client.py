@@ -1,13 +1,34 @@
 """Клиент для работы с LLM через OpenRouter."""
 
+import asyncio
 import logging
 import time
-
-from openai import APIConnectionError, APIStatusError, APITimeoutError, AsyncOpenAI, RateLimitError
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import cast
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    AsyncStream,
+    RateLimitError,
+)
+from openai.types.chat import ChatCompletionChunk
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class StreamedResponse:
+    """Итог потокового ответа LLM (заполняется LLMClient.stream_response)."""
+
+    text: str = ""
+    time_to_first_token: float | None = None
+    elapsed: float | None = None
+
+
 class LLMClient:
     """
     Клиент для работы с LLM через OpenRouter API.
@@ -22,6 +43,7 @@ class LLMClient:
         model: str,
         timeout: int,
         system_prompt_path: str = "prompts/system_prompt.txt",
+        first_token_timeout: float | None = None,
     ) -> None:
         """
         Инициализация LLM клиента.
@@ -29,8 +51,10 @@ class LLMClient:
         Args:
             api_key: API ключ для OpenRouter
             model: Название модели для использования
-            timeout: Таймаут запроса в секундах
+            timeout: Таймаут запроса в секундах (для потокового ответа — на весь ответ)
             system_prompt_path: Путь к файлу с системным промптом
+            first_token_timeout: Таймаут до первого токена потокового ответа
+                в секундах (None = только общий таймаут)
 
         Raises:
             FileNotFoundError: Если файл с промптом не найден
@@ -44,6 +68,7 @@ class LLMClient:
         )
         self.model = model
         self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
 
         logger.info(f"LLMClient initialized with model: {model}")
         logger.info(f"System prompt loaded from: {system_prompt_path}")
@@ -98,18 +123,7 @@ class LLMClient:
         start_time = time.time()
 
         try:
-            # Формируем запрос с системным промптом
-            messages = [{"role": "system", "content": self.system_prompt}]
-
-            # Добавляем историю диалога, если есть
-            if history:
-                messages.extend(history)
-                logger.debug(f"Added {len(history)} messages from history")
-
-            # Добавляем текущее сообщение пользователя
-            messages.append({"role": "user", "content": user_message})
-
-            logger.debug(f"Total messages in context: {len(messages)}")
+            messages = self._build_messages(user_message, history)
 
             # Отправляем запрос
             response = await self.client.chat.completions.create(
@@ -121,37 +135,175 @@ class LLMClient:
             # Извлекаем ответ
             assistant_message = response.choices[0].message.content
 
-            if assistant_message is None:
-                raise RuntimeError("LLM returned empty response")
+        except Exception as e:
+            raise self._map_error(e, start_time) from e
 
-            # Измеряем время ответа
-            elapsed_time = time.time() - start_time
+        if assistant_message is None:
+            raise RuntimeError("LLM returned empty response")
 
-            if elapsed_time > 20:
-                logger.warning(f"Slow LLM response: {elapsed_time:.2f}s (threshold: 20s)")
+        # Измеряем время ответа
+        elapsed_time = time.time() - start_time
 
-            logger.info(f"Successfully received response from LLM (took {elapsed_time:.2f}s)")
-            logger.debug(f"Assistant response: {assistant_message}")
+        if elapsed_time > 20:
+            logger.warning(f"Slow LLM response: {elapsed_time:.2f}s (threshold: 20s)")
 
-            return assistant_message
+        logger.info(f"Successfully received response from LLM (took {elapsed_time:.2f}s)")
+        logger.debug(f"Assistant response: {assistant_message}")
 
-        except APITimeoutError as e:
-            elapsed_time = time.time() - start_time
-            logger.error(f"LLM request timeout after {elapsed_time:.2f}s: {e}", exc_info=True)
-            raise TimeoutError("Превышено время ожидания ответа от LLM") from e
+        return assistant_message
+
+    async def stream_response(
+        self,
+        user_message: str,
+        history: list[dict[str, str]] | None = None,
+        result: StreamedResponse | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Получить ответ от LLM потоком фрагментов текста.
 
-        except APIConnectionError as e:
-            logger.error(f"Network error connecting to LLM API: {e}", exc_info=True)
-            raise ConnectionError("Ошибка сети при подключении к LLM") from e
+        До первого фрагмента действует first_token_timeout, на весь ответ —
+        timeout. После завершения потока в result записываются полный текст
+        (для сохранения в историю), время до первого токена и общее время.
+
+        Args:
+            user_message: Сообщение от пользователя
+            history: История диалога в формате [{"role": "user", "content": "..."}, ...]
+            result: Объект для итогов ответа (None = итоги только в логе)
+
+        Yields:
+            Фрагменты ответа по мере генерации
+
+        Raises:
+            TimeoutError: Истёк таймаут первого токена или всего ответа
+            ConnectionError: Ошибка сети
+            ValueError: Превышен лимит запросов
+            RuntimeError: Ошибка API или пустой ответ
+        """
+        if result is None:
+            result = StreamedResponse()
+
+        logger.info(f"Sending streaming request to LLM (model: {self.model})")
+        logger.debug(f"User message: {user_message}")
+
+        start_time = time.time()
+        deadline = start_time + self.timeout
+        first_token_deadline = deadline
+        if self.first_token_timeout is not None:
+            first_token_deadline = min(start_time + self.first_token_timeout, deadline)
 
-        except RateLimitError as e:
-            logger.error(f"Rate limit exceeded for LLM API: {e}", exc_info=True)
-            raise ValueError("Превышен лимит запросов к LLM API") from e
+        parts: list[str] = []
+        stream: AsyncStream[ChatCompletionChunk] | None = None
+        try:
+            messages = self._build_messages(user_message, history)
+
+            # stream=True всегда даёт AsyncStream (перегрузки не выводятся из-за messages)
+            stream = cast(
+                AsyncStream[ChatCompletionChunk],
+                await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,  # type: ignore[arg-type]
+                        temperature=0.7,
+                        stream=True,
+                    ),
+                    timeout=max(first_token_deadline - time.time(), 0),
+                ),
+            )
 
-        except APIStatusError as e:
-            logger.error(f"LLM API error (status {e.status_code}): {e.message}", exc_info=True)
-            raise RuntimeError(f"Ошибка API LLM: {e.message}") from e
+            chunks = aiter(stream)
+            while True:
+                waiting_first = result.time_to_first_token is None
+                limit = first_token_deadline if waiting_first else deadline
+                try:
+                    chunk = await asyncio.wait_for(
+                        anext(chunks), timeout=max(limit - time.time(), 0)
+                    )
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    stage = "first token" if waiting_first else "complete response"
+                    logger.warning(f"LLM stream timed out waiting for {stage}")
+                    raise
+
+                # Служебные фрагменты (роль, finish_reason, usage) текста не содержат
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+
+                if waiting_first:
+                    result.time_to_first_token = time.time() - start_time
+                    logger.info(f"First LLM token received after {result.time_to_first_token:.2f}s")
+                parts.append(delta)
+                yield delta
 
         except Exception as e:
-            logger.error(f"Unexpected error getting LLM response: {e}", exc_info=True)
-            raise RuntimeError(f"Неожиданная ошибка при работе с LLM: {str(e)}") from e
+            raise self._map_error(e, start_time) from e
+
+        finally:
+            if stream is not None:
+                await stream.close()
+
+        if not parts:
+            raise RuntimeError("LLM returned empty response")
+
+        result.text = "".join(parts)
+        result.elapsed = time.time() - start_time
+
+        if result.elapsed > 20:
+            logger.warning(f"Slow LLM response: {result.elapsed:.2f}s (threshold: 20s)")
+
+        logger.info(
+            f"Successfully streamed response from LLM (took {result.elapsed:.2f}s, "
+            f"first token {result.time_to_first_token:.2f}s, {len(parts)} chunks)"
+        )
+        logger.debug(f"Assistant response: {result.text}")
+
+    def _build_messages(
+        self, user_message: str, history: list[dict[str, str]] | None
+    ) -> list[dict[str, str]]:
+        """Сформировать контекст запроса: системный промпт, история, сообщение пользователя."""
+        messages = [{"role": "system", "content": self.system_prompt}]
+
+        # Добавляем историю диалога, если есть
+        if history:
+            messages.extend(history)
+            logger.debug(f"Added {len(history)} messages from history")
+
+        # Добавляем текущее сообщение пользователя
+        messages.append({"role": "user", "content": user_message})
+
+        logger.debug(f"Total messages in context: {len(messages)}")
+        return messages
+
+    def _map_error(self, error: Exception, start_time: float) -> Exception:
+        """
+        Преобразовать ошибку запроса к LLM в исключение для обработчиков.
+
+        Args:
+            error: Исходная ошибка
+            start_time: Время начала запроса (time.time())
+
+        Returns:
+            TimeoutError, ConnectionError, ValueError (rate limit) или RuntimeError
+        """
+        if isinstance(error, (APITimeoutError, asyncio.TimeoutError)):
+            elapsed_time = time.time() - start_time
+            logger.error(f"LLM request timeout after {elapsed_time:.2f}s: {error}", exc_info=True)
+            return TimeoutError("Превышено время ожидания ответа от LLM")
+
+        if isinstance(error, APIConnectionError):
+            logger.error(f"Network error connecting to LLM API: {error}", exc_info=True)
+            return ConnectionError("Ошибка сети при подключении к LLM")
+
+        if isinstance(error, RateLimitError):
+            logger.error(f"Rate limit exceeded for LLM API: {error}", exc_info=True)
+            return ValueError("Превышен лимит запросов к LLM API")
+
+        if isinstance(error, APIStatusError):
+            logger.error(
+                f"LLM API error (status {error.status_code}): {error.message}", exc_info=True
+            )
+            return RuntimeError(f"Ошибка API LLM: {error.message}")
+
+        logger.error(f"Unexpected error getting LLM response: {error}", exc_info=True)
+        return RuntimeError(f"Неожиданная ошибка при работе с LLM: {str(error)}")
@@ -3,6 +3,7 @@
 import asyncio
 import logging
 import sys
+from functools import partial
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -10,6 +11,9 @@ from dotenv import load_dotenv
 from src.bot import MessageHandler, TelegramBot
 from src.config.settings import Settings
 from src.db import MessageRepository, get_session, init_db
+from src.db.database import create_tables, get_pool_stats, get_session_factory, is_sqlite_url
+from src.db.history_cache import HistoryCache
+from src.db.write_behind import WriteBehindQueue, persist_turns
 from src.llm import LLMClient
 
 
@@ -72,7 +76,19 @@ async def main() -> None:
     logger.info("=" * 50)
 
     # Инициализация базы данных
-    init_db(settings.database_url)
+    init_db(
+        settings.database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        statement_cache_size=settings.db_statement_cache_size,
+        prepared_statement_cache_size=settings.db_prepared_statement_cache_size,
+    )
+    if is_sqlite_url(settings.database_url):
+        # Локальный профиль SQLite: схема создаётся по моделям, без миграций
+        await create_tables()
     logger.info("Database initialized")
 
     # Инициализация компонентов
@@ -80,11 +96,39 @@ async def main() -> None:
         api_key=settings.openrouter_api_key,
         model=settings.openrouter_model,
         timeout=settings.llm_timeout,
+        first_token_timeout=settings.llm_first_token_timeout,
     )
 
+    history_cache = None
+    if settings.history_cache_enabled:
+        history_cache = HistoryCache(
+            max_messages=settings.max_history_messages,
+            max_users=settings.history_cache_max_users,
+            max_bytes=settings.history_cache_max_bytes,
+        )
+
+    # Агрегат нужен статистике только в режиме rollup/HLL: иначе не обновляем его
+    maintain_rollup = settings.stats_use_rollup or settings.stats_approximate_users
+    logger.info(f"Message rollup maintenance: {maintain_rollup}")
+
+    write_behind = None
+    if settings.write_behind_enabled:
+        write_behind = WriteBehindQueue(
+            writer=partial(persist_turns, get_session_factory(), maintain_rollup=maintain_rollup),
+            max_size=settings.write_behind_max_queue_size,
+            batch_size=settings.write_behind_batch_size,
+            flush_interval_seconds=settings.write_behind_flush_interval_seconds,
+            spool_path=settings.write_behind_spool_path,
+            max_replay_attempts=settings.write_behind_max_replay_attempts,
+        )
+        write_behind.start()
+
     message_handler = MessageHandler(
         llm_client=llm_client,
         max_history_messages=settings.max_history_messages,
+        history_cache=history_cache,
+        write_behind=write_behind,
+        maintain_rollup=maintain_rollup,
     )
 
     telegram_bot = TelegramBot(token=settings.telegram_bot_token, message_handler=message_handler)
@@ -99,6 +143,10 @@ async def main() -> None:
         sys.exit(1)
     finally:
         logger.info("Shutting down gracefully...")
+        if write_behind is not None:
+            # Дописываем в БД все ходы, ответы на которые уже отправлены
+            await write_behind.stop()
+        logger.info(f"Database pool stats: {get_pool_stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""Caching wrapper for statistics collectors."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from src.api.models import StatsResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    """Закэшированный ответ и момент его вычисления."""
+
+    response: StatsResponse
+    computed_at: float
+
+
+class CachedStatCollector:
+    """Кэширующий сборщик статистики с TTL и single-flight.
+
+    Реализует протокол StatCollector поверх функции загрузки статистики:
+    - в течение ttl_seconds ответ отдаётся из памяти;
+    - ещё stale_seconds после этого отдаётся устаревший ответ,
+      а пересчёт запускается в фоне (stale-while-revalidate);
+    - одновременные запросы одного периода ждут одно общее вычисление.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[StatsResponse]],
+        ttl_seconds: float,
+        stale_seconds: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация кэширующего коллектора.
+
+        Args:
+            loader: Функция, вычисляющая статистику за период
+            ttl_seconds: Время, в течение которого ответ считается свежим
+            stale_seconds: Время после TTL, когда отдаётся устаревший ответ
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.clock = clock
+        self._entries: dict[str, _CacheEntry] = {}
+        self._inflight: dict[str, asyncio.Task[StatsResponse]] = {}
+
+    async def get_stats(self, period: str) -> StatsResponse:
+        """Получить статистику за период из кэша или вычислить её.
+
+        Args:
+            period: Период для статистики ("day", "week", "month")
+
+        Returns:
+            StatsResponse: Данные статистики
+
+        Raises:
+            ValueError: Если передан невалидный период
+        """
+        entry = self._entries.get(period)
+        if entry is not None:
+            age = self.clock() - entry.computed_at
+            if age < self.ttl_seconds:
+                return entry.response
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._refresh(period)
+                logger.debug(f"Serving stale stats for period={period} (age {age:.1f}s)")
+                return entry.response
+
+        # shield: отмена одного ожидающего запроса не отменяет общее вычисление
+        return await asyncio.shield(self._refresh(period))
+
+    def invalidate(self, period: str | None = None) -> None:
+        """Сбросить кэш для периода (или для всех периодов).
+
+        Args:
+            period: Период для сброса (None = все)
+        """
+        if period is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(period, None)
+
+    def _refresh(self, period: str) -> asyncio.Task[StatsResponse]:
+        """Запускает вычисление периода, если оно ещё не выполняется."""
+        task = self._inflight.get(period)
+        if task is None:
+            task = asyncio.create_task(self._load(period))
+            task.add_done_callback(self._log_failure)
+            self._inflight[period] = task
+        return task
+
+    async def _load(self, period: str) -> StatsResponse:
+        """Вычисляет статистику и сохраняет её в кэш."""
+        try:
+            started_at = self.clock()
+            response = await self.loader(period)
+            self._entries[period] = _CacheEntry(response=response, computed_at=self.clock())
+            logger.info(f"Stats computed for period={period} in {self.clock() - started_at:.3f}s")
+            return response
+        finally:
+            self._inflight.pop(period, None)
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task[StatsResponse]) -> None:
+        """Логирует ошибку вычисления (в т.ч. фонового, которое никто не ждёт)."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and not isinstance(error, ValueError):
+            logger.error(f"Error computing stats: {error}", exc_info=error)
@@ -1,18 +1,74 @@
 """Real implementation of statistics collector with database queries."""
 
+import asyncio
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timedelta
-from sqlalchemy import func, select, distinct
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, NamedTuple, TypeVar
+
+from sqlalchemy import (
+    ColumnElement,
+    ScalarSelect,
+    Select,
+    and_,
+    case,
+    distinct,
+    func,
+    select,
+)
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src.api.models import (
-    StatsResponse,
-    Summary,
-    MetricValue,
     ActivityChart,
+    MetricValue,
     RecentConversation,
+    StatsResponse,
+    Summary,
     TopUser,
 )
-from src.db.models import User, Message
+from src.db.dialect import date_trunc
+from src.db.models import Message, MessageRollupHourly, MessageRollupHourlyUser, User
+from src.stats.hyperloglog import HyperLogLog
+
+# Параметры графика по периодам: (единица date_trunc, количество интервалов, формат метки)
+ACTIVITY_CHART_BUCKETS: dict[str, tuple[str, int, str]] = {
+    "day": ("hour", 24, "%H:00"),
+    "week": ("day", 7, "%Y-%m-%d"),
+    "month": ("day", 30, "%Y-%m-%d"),
+}
+
+# Гранулярности графика для произвольного диапазона: (шаг интервала, формат метки)
+CHART_GRANULARITIES: dict[str, tuple[timedelta, str]] = {
+    "minute": (timedelta(minutes=1), "%Y-%m-%d %H:%M"),
+    "hour": (timedelta(hours=1), "%Y-%m-%d %H:00"),
+    "day": (timedelta(days=1), "%Y-%m-%d"),
+    "week": (timedelta(weeks=1), "%Y-%m-%d"),
+}
+
+# Ограничение количества интервалов графика по умолчанию
+MAX_CHART_BUCKETS = 500
+
+T = TypeVar("T")
+
+
+class _SummaryCounts(NamedTuple):
+    """Сырые счётчики для сводки (те же поля, что у строки summary-запроса)."""
+
+    current_convs: int
+    prev_convs: int
+    current_users: int
+    prev_users: int
+    current_messages: int
+    prev_messages: int
+    total_users: int
+
+
+class _ChartBuckets(NamedTuple):
+    """Сетка интервалов графика активности."""
+
+    unit: str
+    first_bucket: datetime
+    bucket_count: int
+    label_format: str
 
 
 class RealStatCollector:
@@ -22,13 +78,28 @@ class RealStatCollector:
     Работает с таблицами users и messages.
     """
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        session_factory: async_sessionmaker[AsyncSession] | None = None,
+        max_concurrency: int = 2,
+        use_rollup: bool = False,
+        approximate_users: bool = False,
+    ):
         """Инициализация Real коллектора.
         
         Args:
             session: Асинхронная сессия SQLAlchemy для работы с БД
+            session_factory: Фабрика сессий для параллельного режима (None = последовательно)
+            max_concurrency: Максимум одновременных соединений на один вызов get_stats
+            use_rollup: Читать сводку и график из почасового агрегата message_rollup_hourly
+            approximate_users: Считать уникальных пользователей по HLL-скетчам агрегата
         """
         self.session = session
+        self.session_factory = session_factory
+        self.max_concurrency = max_concurrency
+        self.use_rollup = use_rollup
+        self.approximate_users = approximate_users
 
     async def get_stats(self, period: str) -> StatsResponse:
         """Получить реальную статистику за указанный период.
@@ -42,26 +113,14 @@ class RealStatCollector:
         Raises:
             ValueError: Если передан невалидный период
         """
-        if period not in ["day", "week", "month"]:
-            raise ValueError(f"Invalid period: {period}. Must be 'day', 'week', or 'month'")
-
         # Определяем временной диапазон
         now = datetime.utcnow()
-        if period == "day":
-            start_date = now - timedelta(days=1)
-            prev_start_date = now - timedelta(days=2)
-        elif period == "week":
-            start_date = now - timedelta(days=7)
-            prev_start_date = now - timedelta(days=14)
-        else:  # month
-            start_date = now - timedelta(days=30)
-            prev_start_date = now - timedelta(days=60)
+        start_date, prev_start_date = self._get_period_range(period, now)
+        chart = self._get_period_chart(period, now)
 
-        # Собираем все данные параллельно
-        summary = await self._generate_summary(start_date, prev_start_date)
-        activity_chart = await self._generate_activity_chart(period, start_date)
-        recent_conversations = await self._generate_recent_conversations()
-        top_users = await self._generate_top_users(start_date)
+        summary, activity_chart, recent_conversations, top_users = await self._collect_sections(
+            start_date, prev_start_date, None, chart
+        )
 
         return StatsResponse(
             period=period,
@@ -69,71 +128,258 @@ class RealStatCollector:
             activity_chart=activity_chart,
             recent_conversations=recent_conversations,
             top_users=top_users,
+            is_approximate=self.approximate_users,
         )
 
-    async def _generate_summary(self, start_date: datetime, prev_start_date: datetime) -> Summary:
-        """Генерирует сводную статистику на основе реальных данных."""
-        
-        # Количество диалогов (уникальных пользователей с сообщениями)
-        current_convs_query = select(func.count(distinct(Message.user_id))).where(
-            Message.created_at >= start_date,
-            Message.is_deleted == False
-        )
-        current_convs_result = await self.session.execute(current_convs_query)
-        current_convs = current_convs_result.scalar() or 0
-
-        # Количество диалогов за предыдущий период
-        prev_convs_query = select(func.count(distinct(Message.user_id))).where(
-            Message.created_at >= prev_start_date,
-            Message.created_at < start_date,
-            Message.is_deleted == False
-        )
-        prev_convs_result = await self.session.execute(prev_convs_query)
-        prev_convs = prev_convs_result.scalar() or 0
+    async def get_stats_for_range(
+        self,
+        start: datetime,
+        end: datetime,
+        granularity: str | None = None,
+        max_buckets: int = MAX_CHART_BUCKETS,
+    ) -> StatsResponse:
+        """Получить статистику за произвольный диапазон [start, end).
 
-        # Активные пользователи (пользователи с сообщениями в периоде)
-        current_users_query = select(func.count(distinct(User.id))).select_from(User).join(
-            Message, User.id == Message.user_id
-        ).where(
-            Message.created_at >= start_date,
-            Message.is_deleted == False,
-            User.is_deleted == False
+        Сводка сравнивается с предыдущим диапазоном той же длины.
+        Сводка и топ пользователей ограничены диапазоном, список последних
+        диалогов общий, как и для фиксированных периодов.
+
+        Args:
+            start: Начало диапазона (UTC, naive)
+            end: Конец диапазона (UTC, naive, не включается)
+            granularity: Шаг графика ("minute", "hour", "day", "week");
+                None = самый мелкий шаг, укладывающийся в max_buckets
+            max_buckets: Максимальное количество интервалов графика
+
+        Returns:
+            StatsResponse: Данные статистики с period="custom"
+
+        Raises:
+            ValueError: Если диапазон пуст, гранулярность неизвестна
+                или интервалов больше max_buckets
+        """
+        if start >= end:
+            raise ValueError("Invalid range: 'from' must be earlier than 'to'")
+
+        if granularity is None:
+            granularity = self._choose_granularity(start, end, max_buckets)
+        chart = self._get_range_chart(start, end, granularity)
+        if chart.bucket_count > max_buckets:
+            raise ValueError(
+                f"Too many chart buckets: {chart.bucket_count} (max {max_buckets}). "
+                "Use a coarser granularity or a shorter range"
+            )
+
+        prev_start = start - (end - start)
+        summary, activity_chart, recent_conversations, top_users = await self._collect_sections(
+            start, prev_start, end, chart
         )
-        current_users_result = await self.session.execute(current_users_query)
-        current_users = current_users_result.scalar() or 0
-
-        # Активные пользователи за предыдущий период
-        prev_users_query = select(func.count(distinct(User.id))).select_from(User).join(
-            Message, User.id == Message.user_id
-        ).where(
-            Message.created_at >= prev_start_date,
-            Message.created_at < start_date,
-            Message.is_deleted == False,
-            User.is_deleted == False
+
+        return StatsResponse(
+            period="custom",
+            summary=summary,
+            activity_chart=activity_chart,
+            recent_conversations=recent_conversations,
+            top_users=top_users,
+            is_approximate=self.approximate_users,
+            range_start=start,
+            range_end=end,
+            granularity=granularity,
         )
-        prev_users_result = await self.session.execute(prev_users_query)
-        prev_users = prev_users_result.scalar() or 0
 
-        # Средняя длина диалога (сообщений на пользователя)
-        avg_length_query = select(
-            func.count(Message.id) / func.count(distinct(Message.user_id))
-        ).where(
-            Message.created_at >= start_date,
-            Message.is_deleted == False
+    async def _collect_sections(
+        self,
+        start_date: datetime,
+        prev_start_date: datetime,
+        end_date: datetime | None,
+        chart: _ChartBuckets,
+    ) -> tuple[Summary, ActivityChart, list[RecentConversation], list[TopUser]]:
+        """Собирает все секции статистики за диапазон [start_date, end_date).
+
+        end_date=None означает открытый диапазон до текущего момента.
+        """
+        if self.session_factory is None:
+            # Последовательно в одной сессии
+            summary = await self._generate_summary(start_date, prev_start_date, end_date)
+            activity_chart = await self._generate_activity_chart(chart, start_date, end_date)
+            recent_conversations = await self._generate_recent_conversations()
+            top_users = await self._generate_top_users(start_date, end_date)
+            return summary, activity_chart, recent_conversations, top_users
+
+        # Собираем все данные параллельно, каждая секция в своей сессии
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        sections: tuple[Summary, ActivityChart, list[RecentConversation], list[TopUser]]
+        sections = await asyncio.gather(
+            self._run_in_own_session(
+                semaphore,
+                RealStatCollector._generate_summary,
+                start_date,
+                prev_start_date,
+                end_date,
+            ),
+            self._run_in_own_session(
+                semaphore, RealStatCollector._generate_activity_chart, chart, start_date, end_date
+            ),
+            self._run_in_own_session(
+                semaphore, RealStatCollector._generate_recent_conversations
+            ),
+            self._run_in_own_session(
+                semaphore, RealStatCollector._generate_top_users, start_date, end_date
+            ),
         )
-        avg_length_result = await self.session.execute(avg_length_query)
-        current_avg_length = float(avg_length_result.scalar() or 0)
-
-        # Средняя длина за предыдущий период
-        prev_avg_length_query = select(
-            func.count(Message.id) / func.count(distinct(Message.user_id))
-        ).where(
-            Message.created_at >= prev_start_date,
-            Message.created_at < start_date,
-            Message.is_deleted == False
+        return sections
+
+    async def get_data_version(self, period: str) -> str:
+        """Получить версию данных, от которых зависит статистика периода.
+
+        Для ETag без кэша: одно индексное чтение max(id) по messages и текущая
+        минута. Минута учитывает сдвиг временного окна, поэтому очистка
+        истории (soft delete не меняет max(id)) видна не позже чем через минуту.
+
+        Args:
+            period: Период для статистики ("day", "week", "month")
+
+        Returns:
+            Строка версии
+
+        Raises:
+            ValueError: Если передан невалидный период
+        """
+        now = datetime.utcnow()
+        # Проверка периода
+        self._get_period_range(period, now)
+
+        result = await self.session.execute(select(func.max(Message.id)))
+        max_id = result.scalar() or 0
+
+        return f"{period}:{max_id}:{now.strftime('%Y%m%d%H%M')}"
+
+    @staticmethod
+    def _get_period_range(period: str, now: datetime) -> tuple[datetime, datetime]:
+        """Возвращает начало текущего и предыдущего периода.
+        
+        Raises:
+            ValueError: Если передан невалидный период
+        """
+        if period not in ["day", "week", "month"]:
+            raise ValueError(f"Invalid period: {period}. Must be 'day', 'week', or 'month'")
+
+        if period == "day":
+            days = 1
+        elif period == "week":
+            days = 7
+        else:  # month
+            days = 30
+
+        return now - timedelta(days=days), now - timedelta(days=days * 2)
+
+    @staticmethod
+    def _get_period_chart(period: str, now: datetime) -> _ChartBuckets:
+        """Возвращает сетку графика фиксированного периода, заканчивающуюся текущим интервалом."""
+        unit, bucket_count, label_format = ACTIVITY_CHART_BUCKETS[period]
+        step, _ = CHART_GRANULARITIES[unit]
+        last_bucket = RealStatCollector._truncate(now, unit)
+        first_bucket = last_bucket - step * (bucket_count - 1)
+        return _ChartBuckets(unit, first_bucket, bucket_count, label_format)
+
+    @staticmethod
+    def _get_range_chart(start: datetime, end: datetime, granularity: str) -> _ChartBuckets:
+        """Возвращает сетку графика, покрывающую диапазон [start, end).
+
+        Raises:
+            ValueError: Если передана неизвестная гранулярность
+        """
+        if granularity not in CHART_GRANULARITIES:
+            raise ValueError(
+                f"Invalid granularity: {granularity}. "
+                "Must be 'minute', 'hour', 'day', or 'week'"
+            )
+
+        step, label_format = CHART_GRANULARITIES[granularity]
+        first_bucket = RealStatCollector._truncate(start, granularity)
+        # Округление вверх: последний интервал может быть неполным
+        bucket_count = -((first_bucket - end) // step)
+        return _ChartBuckets(granularity, first_bucket, bucket_count, label_format)
+
+    @staticmethod
+    def _choose_granularity(start: datetime, end: datetime, max_buckets: int) -> str:
+        """Выбирает самую мелкую гранулярность, дающую не больше max_buckets интервалов.
+
+        Raises:
+            ValueError: Если диапазон не укладывается даже в недельные интервалы
+        """
+        for granularity in CHART_GRANULARITIES:
+            chart = RealStatCollector._get_range_chart(start, end, granularity)
+            if chart.bucket_count <= max_buckets:
+                return granularity
+
+        raise ValueError(
+            f"Range is too long: more than {max_buckets} weekly chart buckets"
         )
-        prev_avg_length_result = await self.session.execute(prev_avg_length_query)
-        prev_avg_length = float(prev_avg_length_result.scalar() or 0)
+
+    @staticmethod
+    def _truncate(value: datetime, unit: str) -> datetime:
+        """Округляет время вниз до начала интервала (как date_trunc в PostgreSQL)."""
+        if unit == "minute":
+            return value.replace(second=0, microsecond=0)
+        if unit == "hour":
+            return value.replace(minute=0, second=0, microsecond=0)
+
+        day = value.replace(hour=0, minute=0, second=0, microsecond=0)
+        if unit == "week":
+            # date_trunc('week') начинает неделю с понедельника
+            return day - timedelta(days=day.weekday())
+        return day
+
+    async def _run_in_own_session(
+        self,
+        semaphore: asyncio.Semaphore,
+        section: Callable[..., Awaitable[T]],
+        *args: Any,
+    ) -> T:
+        """Выполняет секцию статистики в отдельной сессии из пула.
+
+        Семафор ограничивает число соединений, занятых одним вызовом get_stats.
+        """
+        if self.session_factory is None:
+            raise RuntimeError("session_factory is required for parallel stats collection")
+
+        async with semaphore, self.session_factory() as session:
+            collector = RealStatCollector(
+                session, use_rollup=self.use_rollup, approximate_users=self.approximate_users
+            )
+            return await section(collector, *args)
+
+    async def _generate_summary(
+        self, start_date: datetime, prev_start_date: datetime, end_date: datetime | None = None
+    ) -> Summary:
+        """Генерирует сводную статистику на основе реальных данных.
+
+        Все метрики обоих периодов считаются одним запросом с условной агрегацией
+        по объединённому диапазону [prev_start_date, end_date или now).
+        """
+        row: Any
+        if self.approximate_users:
+            row = await self._fetch_approximate_summary_counts(
+                start_date, prev_start_date, end_date
+            )
+        else:
+            if self.use_rollup:
+                query = self._build_summary_rollup_query(start_date, prev_start_date, end_date)
+            else:
+                query = self._build_summary_query(start_date, prev_start_date, end_date)
+            result = await self.session.execute(query)
+            row = result.one()
+
+        current_convs = row.current_convs or 0
+        prev_convs = row.prev_convs or 0
+        current_users = row.current_users or 0
+        prev_users = row.prev_users or 0
+
+        # Средняя длина диалога (сообщений на пользователя). Деление целочисленное,
+        # как count / count(distinct) в PostgreSQL до объединения запросов
+        current_avg_length = float(row.current_messages // current_convs) if current_convs else 0.0
+        prev_avg_length = float(row.prev_messages // prev_convs) if prev_convs else 0.0
 
         # Рассчитываем процентные изменения
         convs_change = self._calculate_change_percent(current_convs, prev_convs)
@@ -141,9 +387,7 @@ class RealStatCollector:
         length_change = self._calculate_change_percent(current_avg_length, prev_avg_length)
         
         # Growth rate (процент роста новых пользователей)
-        total_users_query = select(func.count(User.id)).where(User.is_deleted == False)
-        total_users_result = await self.session.execute(total_users_query)
-        total_users = total_users_result.scalar() or 1
+        total_users = row.total_users or 1
         
         growth_rate = (current_users / total_users * 100) if total_users > 0 else 0
 
@@ -174,63 +418,213 @@ class RealStatCollector:
             ),
         )
 
-    async def _generate_activity_chart(self, period: str, start_date: datetime) -> ActivityChart:
-        """Генерирует данные для графика активности на основе реальных данных."""
-        
-        now = datetime.utcnow()
+    @staticmethod
+    def _build_summary_query(
+        start_date: datetime, prev_start_date: datetime, end_date: datetime | None = None
+    ) -> Select[Any]:
+        """Строит запрос сводных метрик по сырым сообщениям."""
+        is_current = Message.created_at >= start_date
+        is_previous = Message.created_at < start_date
+        is_active_user = User.is_deleted == False
+
+        total_users_subquery = (
+            select(func.count(User.id)).where(User.is_deleted == False).scalar_subquery()
+        )
+
+        conditions = [Message.created_at >= prev_start_date, Message.is_deleted == False]
+        if end_date is not None:
+            conditions.append(Message.created_at < end_date)
+
+        return (
+            select(
+                # Количество диалогов (уникальных пользователей с сообщениями)
+                func.count(distinct(case((is_current, Message.user_id)))).label("current_convs"),
+                func.count(distinct(case((is_previous, Message.user_id)))).label("prev_convs"),
+                # Активные пользователи (не удалённые пользователи с сообщениями в периоде)
+                func.count(
+                    distinct(case((and_(is_current, is_active_user), Message.user_id)))
+                ).label("current_users"),
+                func.count(
+                    distinct(case((and_(is_previous, is_active_user), Message.user_id)))
+                ).label("prev_users"),
+                # Количество сообщений для расчёта средней длины диалога
+                func.count(case((is_current, Message.id))).label("current_messages"),
+                func.count(case((is_previous, Message.id))).label("prev_messages"),
+                total_users_subquery.label("total_users"),
+            )
+            .select_from(Message)
+            .join(User, User.id == Message.user_id)
+            .where(*conditions)
+        )
+
+    @staticmethod
+    def _build_summary_rollup_query(
+        start_date: datetime, prev_start_date: datetime, end_date: datetime | None = None
+    ) -> Select[Any]:
+        """Строит запрос сводных метрик по почасовому агрегату.
+
+        Начала периодов округляются вниз до начала часа, час с end_date
+        учитывается целиком.
+        """
+        start_bucket = start_date.replace(minute=0, second=0, microsecond=0)
+        prev_start_bucket = prev_start_date.replace(minute=0, second=0, microsecond=0)
+
+        is_current = MessageRollupHourlyUser.bucket_start >= start_bucket
+        is_previous = MessageRollupHourlyUser.bucket_start < start_bucket
+        is_active_user = User.is_deleted == False
+
+        total_users_subquery = (
+            select(func.count(User.id)).where(User.is_deleted == False).scalar_subquery()
+        )
+
+        conditions = [MessageRollupHourlyUser.bucket_start >= prev_start_bucket]
+        current_buckets = [MessageRollupHourly.bucket_start >= start_bucket]
+        if end_date is not None:
+            conditions.append(MessageRollupHourlyUser.bucket_start < end_date)
+            current_buckets.append(MessageRollupHourly.bucket_start < end_date)
+
+        return (
+            select(
+                func.count(distinct(case((is_current, MessageRollupHourlyUser.user_id)))).label(
+                    "current_convs"
+                ),
+                func.count(distinct(case((is_previous, MessageRollupHourlyUser.user_id)))).label(
+                    "prev_convs"
+                ),
+                func.count(
+                    distinct(
+                        case((and_(is_current, is_active_user), MessageRollupHourlyUser.user_id))
+                    )
+                ).label("current_users"),
+                func.count(
+                    distinct(
+                        case((and_(is_previous, is_active_user), MessageRollupHourlyUser.user_id))
+                    )
+                ).label("prev_users"),
+                RealStatCollector._rollup_messages_subquery(*current_buckets).label(
+                    "current_messages"
+                ),
+                RealStatCollector._rollup_messages_subquery(
+                    MessageRollupHourly.bucket_start >= prev_start_bucket,
+                    MessageRollupHourly.bucket_start < start_bucket,
+                ).label("prev_messages"),
+                total_users_subquery.label("total_users"),
+            )
+            .select_from(MessageRollupHourlyUser)
+            .join(User, User.id == MessageRollupHourlyUser.user_id)
+            .where(*conditions)
+        )
+
+    @staticmethod
+    def _rollup_messages_subquery(*conditions: ColumnElement[bool]) -> ScalarSelect[Any]:
+        """Скалярный подзапрос суммы сообщений из почасового агрегата."""
+        return (
+            select(func.coalesce(func.sum(MessageRollupHourly.message_count), 0))
+            .where(*conditions)
+            .scalar_subquery()
+        )
+
+    async def _fetch_approximate_summary_counts(
+        self, start_date: datetime, prev_start_date: datetime, end_date: datetime | None = None
+    ) -> "_SummaryCounts":
+        """Считает метрики сводки по агрегату, уникальных пользователей — по HLL.
+
+        Скетчи часов объединяются в Python отдельно для текущего и предыдущего
+        периода. Удалённые пользователи и очищенная история не вычитаются,
+        поэтому active_users совпадает с total_conversations.
+        """
+        start_bucket = start_date.replace(minute=0, second=0, microsecond=0)
+        prev_start_bucket = prev_start_date.replace(minute=0, second=0, microsecond=0)
+
+        sketch_conditions = [
+            MessageRollupHourly.bucket_start >= prev_start_bucket,
+            MessageRollupHourly.users_hll.is_not(None),
+        ]
+        current_buckets = [MessageRollupHourly.bucket_start >= start_bucket]
+        if end_date is not None:
+            sketch_conditions.append(MessageRollupHourly.bucket_start < end_date)
+            current_buckets.append(MessageRollupHourly.bucket_start < end_date)
+
+        totals_query = select(
+            self._rollup_messages_subquery(*current_buckets).label("current_messages"),
+            self._rollup_messages_subquery(
+                MessageRollupHourly.bucket_start >= prev_start_bucket,
+                MessageRollupHourly.bucket_start < start_bucket,
+            ).label("prev_messages"),
+            select(func.count(User.id))
+            .where(User.is_deleted == False)
+            .scalar_subquery()
+            .label("total_users"),
+        )
+        totals = (await self.session.execute(totals_query)).one()
+
+        sketches_query = select(
+            MessageRollupHourly.bucket_start, MessageRollupHourly.users_hll
+        ).where(*sketch_conditions)
+        current_sketch = HyperLogLog()
+        prev_sketch = HyperLogLog()
+        for bucket_start, users_hll in await self.session.execute(sketches_query):
+            sketch = current_sketch if bucket_start >= start_bucket else prev_sketch
+            sketch.merge(HyperLogLog(users_hll))
+
+        current_users = current_sketch.count()
+        prev_users = prev_sketch.count()
+        return _SummaryCounts(
+            current_convs=current_users,
+            prev_convs=prev_users,
+            current_users=current_users,
+            prev_users=prev_users,
+            current_messages=totals.current_messages,
+            prev_messages=totals.prev_messages,
+            total_users=totals.total_users,
+        )
+
+    async def _generate_activity_chart(
+        self,
+        chart: _ChartBuckets,
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
+    ) -> ActivityChart:
+        """Генерирует данные для графика активности на основе реальных данных.
+
+        Все интервалы считаются одним запросом с группировкой по date_trunc,
+        пустые интервалы заполняются нулями на стороне Python. Поминутный
+        график всегда строится по сырым сообщениям.
+        """
+        since = start_date if start_date is not None else chart.first_bucket
+
+        if self.use_rollup and chart.unit != "minute":
+            bucket = date_trunc(
+                self.session, chart.unit, MessageRollupHourly.bucket_start
+            ).label("bucket")
+            conditions = [MessageRollupHourly.bucket_start >= self._truncate(since, "hour")]
+            if end_date is not None:
+                conditions.append(MessageRollupHourly.bucket_start < end_date)
+            query = (
+                select(bucket, func.sum(MessageRollupHourly.message_count).label("message_count"))
+                .where(*conditions)
+                .group_by(bucket)
+            )
+        else:
+            bucket = date_trunc(self.session, chart.unit, Message.created_at).label("bucket")
+            conditions = [Message.created_at >= since, Message.is_deleted == False]
+            if end_date is not None:
+                conditions.append(Message.created_at < end_date)
+            query = (
+                select(bucket, func.count(Message.id).label("message_count"))
+                .where(*conditions)
+                .group_by(bucket)
+            )
+        result = await self.session.execute(query)
+        counts = {row.bucket: row.message_count for row in result.all()}
+
+        step, _ = CHART_GRANULARITIES[chart.unit]
         labels = []
         values = []
-
-        if period == "day":
-            # 24 часа по часам
-            for i in range(24):
-                hour_start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23-i)
-                hour_end = hour_start + timedelta(hours=1)
-                
-                query = select(func.count(Message.id)).where(
-                    Message.created_at >= hour_start,
-                    Message.created_at < hour_end,
-                    Message.is_deleted == False
-                )
-                result = await self.session.execute(query)
-                count = result.scalar() or 0
-                
-                labels.append(hour_start.strftime("%H:00"))
-                values.append(count)
-        
-        elif period == "week":
-            # 7 дней
-            for i in range(7):
-                day_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=6-i)
-                day_end = day_start + timedelta(days=1)
-                
-                query = select(func.count(Message.id)).where(
-                    Message.created_at >= day_start,
-                    Message.created_at < day_end,
-                    Message.is_deleted == False
-                )
-                result = await self.session.execute(query)
-                count = result.scalar() or 0
-                
-                labels.append(day_start.strftime("%Y-%m-%d"))
-                values.append(count)
-        
-        else:  # month
-            # 30 дней
-            for i in range(30):
-                day_start = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=29-i)
-                day_end = day_start + timedelta(days=1)
-                
-                query = select(func.count(Message.id)).where(
-                    Message.created_at >= day_start,
-                    Message.created_at < day_end,
-                    Message.is_deleted == False
-                )
-                result = await self.session.execute(query)
-                count = result.scalar() or 0
-                
-                labels.append(day_start.strftime("%Y-%m-%d"))
-                values.append(count)
+        for i in range(chart.bucket_count):
+            bucket_start = chart.first_bucket + step * i
+            labels.append(bucket_start.strftime(chart.label_format))
+            values.append(counts.get(bucket_start, 0))
 
         return ActivityChart(labels=labels, values=values)
 
@@ -281,9 +675,18 @@ class RealStatCollector:
         
         return conversations
 
-    async def _generate_top_users(self, start_date: datetime) -> list[TopUser]:
+    async def _generate_top_users(
+        self, start_date: datetime, end_date: datetime | None = None
+    ) -> list[TopUser]:
         """Генерирует топ-5 пользователей на основе реальных данных."""
-        
+        conditions = [
+            User.is_deleted == False,
+            Message.is_deleted == False,
+            Message.created_at >= start_date,
+        ]
+        if end_date is not None:
+            conditions.append(Message.created_at < end_date)
+
         # Получаем топ-5 пользователей по количеству диалогов (сообщений) за период
         query = (
             select(
@@ -294,11 +697,7 @@ class RealStatCollector:
             )
             .select_from(User)
             .join(Message, User.id == Message.user_id)
-            .where(
-                User.is_deleted == False,
-                Message.is_deleted == False,
-                Message.created_at >= start_date
-            )
+            .where(*conditions)
             .group_by(User.id, User.username, User.telegram_id)
             .order_by(func.count(Message.id).desc())
             .limit(5)
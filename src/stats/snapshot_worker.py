@@ -0,0 +1,122 @@
+"""Background worker that precomputes statistics snapshots."""
+
+import asyncio
+import contextlib
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from src.api.models import StatsResponse
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PERIODS = ("day", "week", "month")
+
+
+@dataclass
+class StatsSnapshot:
+    """Предварительно сериализованный ответ статистики."""
+
+    body: bytes
+    computed_at: float
+
+
+class StatsSnapshotWorker:
+    """Фоновый пересчёт статистики по всем периодам.
+
+    Периодически вычисляет StatsResponse для day/week/month и хранит
+    готовые JSON-байты в памяти, чтобы endpoint отдавал их без обращения к БД.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[StatsResponse]],
+        interval_seconds: float,
+        jitter_seconds: float = 0.0,
+        max_age_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Инициализация фонового воркера.
+
+        Args:
+            loader: Функция, вычисляющая статистику за период
+            interval_seconds: Интервал между пересчётами
+            jitter_seconds: Случайная добавка к интервалу (разносит пересчёты процессов)
+            max_age_seconds: Максимальный возраст снапшота, который можно отдавать
+                (None = без ограничения)
+            clock: Источник монотонного времени (для тестов)
+        """
+        self.loader = loader
+        self.interval_seconds = interval_seconds
+        self.jitter_seconds = jitter_seconds
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._snapshots: dict[str, StatsSnapshot] = {}
+        self._task: asyncio.Task[None] | None = None
+
+    def get_snapshot(self, period: str) -> tuple[bytes, float] | None:
+        """Получить готовый снапшот периода.
+
+        Args:
+            period: Период для статистики ("day", "week", "month")
+
+        Returns:
+            Пара (JSON-байты, возраст в секундах) или None,
+            если снапшота нет или он старше max_age_seconds
+        """
+        snapshot = self._snapshots.get(period)
+        if snapshot is None:
+            return None
+
+        age = self.clock() - snapshot.computed_at
+        if self.max_age_seconds is not None and age > self.max_age_seconds:
+            logger.warning(f"Stats snapshot for period={period} is too old: {age:.1f}s")
+            return None
+
+        return snapshot.body, age
+
+    async def refresh_all(self) -> None:
+        """Пересчитать снапшоты всех периодов.
+
+        Ошибка одного периода не мешает обновлению остальных:
+        предыдущий снапшот сохраняется до следующей успешной попытки.
+        """
+        for period in SNAPSHOT_PERIODS:
+            try:
+                started_at = self.clock()
+                response = await self.loader(period)
+                self._snapshots[period] = StatsSnapshot(
+                    body=response.model_dump_json().encode("utf-8"),
+                    computed_at=self.clock(),
+                )
+                logger.debug(
+                    f"Stats snapshot refreshed for period={period} "
+                    f"in {self.clock() - started_at:.3f}s"
+                )
+            except Exception as e:
+                logger.error(f"Error refreshing stats snapshot for period={period}: {e}")
+
+    def start(self) -> None:
+        """Запустить фоновый цикл пересчёта."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Stats snapshot worker started (interval {self.interval_seconds}s)")
+
+    async def stop(self) -> None:
+        """Остановить фоновый цикл пересчёта."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Stats snapshot worker stopped")
+
+    async def _run(self) -> None:
+        """Цикл: пересчёт всех периодов, затем пауза с jitter."""
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(self.interval_seconds + random.uniform(0, self.jitter_seconds))
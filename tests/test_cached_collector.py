@@ -0,0 +1,125 @@
+"""Тесты для кэширующего сборщика статистики."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from stats.cached_collector import CachedStatCollector
+
+
+class FakeClock:
+    """Управляемые часы для тестов TTL."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Фикстура с управляемыми часами."""
+    return FakeClock()
+
+
+async def test_concurrent_requests_share_one_computation(clock: FakeClock) -> None:
+    """Тест single-flight: 100 одновременных запросов вызывают загрузку один раз."""
+    # Arrange
+    calls = 0
+    response = MagicMock()
+
+    async def loader(period: str) -> MagicMock:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return response
+
+    cache = CachedStatCollector(loader=loader, ttl_seconds=60, clock=clock)
+
+    # Act
+    results = await asyncio.gather(*(cache.get_stats("week") for _ in range(100)))
+
+    # Assert
+    assert calls == 1
+    assert all(result is response for result in results)
+
+
+async def test_fresh_entry_served_from_cache(clock: FakeClock) -> None:
+    """Тест что в пределах TTL загрузка не повторяется."""
+    # Arrange
+    calls: list[str] = []
+
+    async def loader(period: str) -> MagicMock:
+        calls.append(period)
+        return MagicMock()
+
+    cache = CachedStatCollector(loader=loader, ttl_seconds=60, clock=clock)
+
+    # Act
+    first = await cache.get_stats("day")
+    clock.now = 59
+    second = await cache.get_stats("day")
+    await cache.get_stats("month")
+
+    # Assert: периоды кэшируются независимо
+    assert first is second
+    assert calls == ["day", "month"]
+
+
+async def test_stale_entry_served_while_revalidating(clock: FakeClock) -> None:
+    """Тест stale-while-revalidate: отдаётся старый ответ, пересчёт идёт в фоне."""
+    # Arrange
+    responses = [MagicMock(), MagicMock()]
+
+    async def loader(period: str) -> MagicMock:
+        return responses.pop(0)
+
+    cache = CachedStatCollector(loader=loader, ttl_seconds=60, stale_seconds=30, clock=clock)
+    old = await cache.get_stats("day")
+
+    # Act
+    clock.now = 70
+    stale = await cache.get_stats("day")
+    await asyncio.sleep(0)  # даём фоновому пересчёту завершиться
+    fresh = await cache.get_stats("day")
+
+    # Assert
+    assert stale is old
+    assert fresh is not old
+
+
+async def test_expired_entry_is_recomputed(clock: FakeClock) -> None:
+    """Тест что после TTL + stale запрос ждёт новое вычисление."""
+    # Arrange
+    responses = [MagicMock(), MagicMock()]
+
+    async def loader(period: str) -> MagicMock:
+        return responses.pop(0)
+
+    cache = CachedStatCollector(loader=loader, ttl_seconds=60, stale_seconds=30, clock=clock)
+    old = await cache.get_stats("day")
+
+    # Act
+    clock.now = 91
+    new = await cache.get_stats("day")
+
+    # Assert
+    assert new is not old
+
+
+async def test_loader_error_is_not_cached(clock: FakeClock) -> None:
+    """Тест что ошибка загрузки пробрасывается и не кэшируется."""
+
+    # Arrange
+    async def loader(period: str) -> MagicMock:
+        raise ValueError(f"Invalid period: {period}")
+
+    cache = CachedStatCollector(loader=loader, ttl_seconds=60, clock=clock)
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="Invalid period"):
+        await cache.get_stats("year")
+    with pytest.raises(ValueError, match="Invalid period"):
+        await cache.get_stats("year")
@@ -0,0 +1,88 @@
+"""Тесты постраничного чтения /api/v1/chat/history."""
+
+from collections.abc import AsyncIterator, Iterator
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import chat_api
+from db import database
+from db.models import ChatMessage
+from db.repository import ChatRepository
+
+SESSION_ID = "3f2b8c1e-0000-4000-8000-000000000001"
+
+
+@pytest.fixture
+def history_client(monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    """Клиент API чата поверх in-memory SQLite с историей из 7 сообщений."""
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db("sqlite+aiosqlite://")
+    session_factory = database.get_session_factory()
+
+    async def seed() -> None:
+        await database.create_tables()
+        async with session_factory() as session:
+            repository = ChatRepository(session)
+            chat_session_id = await repository.get_or_create_session_id(SESSION_ID)
+            # Пять сообщений с одинаковым created_at: порядок и курсор держатся на id
+            created = [datetime(2025, 10, 17, 12, 0)] * 5 + [datetime(2025, 10, 17, 12, 1)] * 2
+            session.add_all(
+                ChatMessage(
+                    session_id=chat_session_id,
+                    role="user",
+                    content=f"message {number}",
+                    created_at=created_at,
+                )
+                for number, created_at in enumerate(created)
+            )
+            await session.commit()
+
+    async def repository() -> AsyncIterator[ChatRepository]:
+        async with session_factory() as session:
+            yield ChatRepository(session)
+
+    app = FastAPI()
+    app.include_router(chat_api.router)
+    app.dependency_overrides[chat_api.get_chat_history_repository] = repository
+
+    with TestClient(app) as client:
+        client.portal.call(seed)
+        yield client
+        client.portal.call(database.engine.dispose)
+
+
+def test_history_pages_through_equal_timestamps(history_client: TestClient) -> None:
+    """Тест что страницы с одинаковыми created_at не теряют и не повторяют сообщения."""
+    # Act
+    contents: list[str] = []
+    page_sizes: list[int] = []
+    cursor = None
+    while True:
+        params = {"session_id": SESSION_ID, "limit": 2}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = history_client.get("/api/v1/chat/history", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        contents.extend(message["content"] for message in body["messages"])
+        page_sizes.append(len(body["messages"]))
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    # Assert
+    assert contents == [f"message {number}" for number in range(7)]
+    assert page_sizes == [2, 2, 2, 1]
+
+
+def test_history_rejects_invalid_cursor(history_client: TestClient) -> None:
+    """Тест что повреждённый курсор даёт 400."""
+    response = history_client.get(
+        "/api/v1/chat/history", params={"session_id": SESSION_ID, "cursor": "not a cursor!"}
+    )
+
+    assert response.status_code == 400
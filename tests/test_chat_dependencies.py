@@ -0,0 +1,42 @@
+"""Тесты зависимостей веб-чата."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from api import dependencies
+from api.models import StatsResponse
+from config.settings import Settings
+from stats.mock_collector import MockStatCollector
+
+
+async def test_chat_handler_opens_stats_session_only_for_admin_query(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Тест что без кэша статистики обработчик чата не держит сессию БД на весь запрос."""
+    # Arrange
+    settings = Settings(  # type: ignore[call-arg]
+        telegram_bot_token="token", openrouter_api_key="key", stats_cache_ttl_seconds=0
+    )
+    periods: list[str] = []
+
+    async def compute_stats(period: str) -> StatsResponse:
+        periods.append(period)
+        return MockStatCollector(seed=1).get_stats(period)
+
+    def no_session() -> None:
+        raise AssertionError("сессия статистики не должна открываться при создании обработчика")
+
+    monkeypatch.setattr(dependencies, "get_settings", lambda: settings)
+    monkeypatch.setattr(dependencies, "get_llm_client", MagicMock)
+    monkeypatch.setattr(dependencies, "get_session_factory", no_session)
+    monkeypatch.setattr(dependencies, "get_read_session_factory", no_session)
+    monkeypatch.setattr(dependencies, "compute_stats", compute_stats)
+
+    # Act
+    handler = dependencies.get_chat_handler()
+    stats = await handler.admin_handler.stat_collector.get_stats("week")
+
+    # Assert
+    assert periods == ["week"]
+    assert stats.period == "week"
@@ -0,0 +1,83 @@
+"""Тест что handle_text не держит соединение с БД во время запроса к LLM."""
+
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+import bot.message_handler
+import src.db.database
+from bot.message_handler import MessageHandler
+
+CONCURRENT_TURNS = 100
+POOL_SIZE = 5
+LLM_LATENCY_SECONDS = 0.2
+
+
+class SlowLLMClient:
+    """LLM, отвечающий с задержкой."""
+
+    system_prompt = "Ты помощник по оценке задач."
+
+    async def get_response(self, text: str, history: list[dict[str, str]]) -> str:
+        await asyncio.sleep(LLM_LATENCY_SECONDS)
+        return f"re: {text}"
+
+
+class QueryingRepository:
+    """Repository, который обращается к БД через сессию, как MessageRepository."""
+
+    def __init__(self, session: AsyncSession, **kwargs: object) -> None:
+        self.session = session
+
+    async def get_history(self, telegram_id: int, limit: int | None = None) -> list:
+        await self.session.execute(text("SELECT 1"))
+        return []
+
+    async def add_turn(self, telegram_id: int, *args: object, **kwargs: object) -> list[int]:
+        await self.session.execute(text("SELECT 1"))
+        return []
+
+
+@pytest.fixture
+async def small_pool(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[AsyncEngine]:
+    """Пул из POOL_SIZE соединений без overflow и с коротким ожиданием."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        pool_size=POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=1,
+    )
+    monkeypatch.setattr(src.db.database, "AsyncSessionLocal", async_sessionmaker(engine))
+    monkeypatch.setattr(bot.message_handler, "MessageRepository", QueryingRepository)
+    yield engine
+    await engine.dispose()
+
+
+async def test_concurrent_slow_turns_do_not_exhaust_pool(small_pool: AsyncEngine) -> None:
+    """Тест 100 одновременных ходов с медленным LLM на пуле из 5 соединений."""
+    # Arrange: при удержании соединения на время LLM ходы ждали бы пул 4 с > pool_timeout
+    handler = MessageHandler(llm_client=SlowLLMClient())
+    messages = []
+    for i in range(CONCURRENT_TURNS):
+        message = AsyncMock()
+        message.from_user = MagicMock(id=i, username=f"user{i}")
+        message.text = f"question {i}"
+        messages.append(message)
+
+    # Act
+    await asyncio.gather(*(handler.handle_text(message) for message in messages))
+
+    # Assert: каждый пользователь получил ответ LLM, а не сообщение об ошибке
+    for i, message in enumerate(messages):
+        message.answer.assert_called_once_with(f"re: question {i}")
+    assert small_pool.pool.checkedout() == 0
@@ -0,0 +1,98 @@
+"""Тесты для write-through кэша истории диалогов."""
+
+from sqlalchemy.orm import Session
+
+from db.history_cache import MESSAGE_OVERHEAD_BYTES, HistoryCache
+
+
+def _messages(count: int) -> list[dict[str, str]]:
+    """Сгенерировать историю из count сообщений."""
+    return [{"role": "user", "content": f"message {i}"} for i in range(count)]
+
+
+def test_append_keeps_last_messages_in_ring_buffer() -> None:
+    """Тест что буфер хранит только max_messages последних сообщений."""
+    # Arrange
+    cache = HistoryCache(max_messages=3)
+    cache.store(1, _messages(2), cache.begin_load(1))
+
+    # Act
+    cache.append(1, "assistant", "answer")
+    cache.append(1, "user", "question")
+
+    # Assert
+    history = cache.get(1, limit=3)
+    assert history is not None
+    assert [message["content"] for message in history] == ["message 1", "answer", "question"]
+    assert cache.get(1, limit=1) == [{"role": "user", "content": "question"}]
+
+
+def test_hit_and_miss_counters() -> None:
+    """Тест счётчиков попаданий и промахов."""
+    # Arrange
+    cache = HistoryCache()
+    cache.store(1, _messages(1), cache.begin_load(1))
+
+    # Act
+    cache.get(1, limit=20)
+    cache.get(2, limit=20)
+
+    # Assert
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["total_users"] == 1
+
+
+def test_lru_eviction_by_users_and_memory() -> None:
+    """Тест вытеснения давно неиспользуемых пользователей по лимитам."""
+    # Arrange: лимит памяти примерно на два коротких сообщения
+    cache = HistoryCache(max_users=2, max_bytes=2 * (MESSAGE_OVERHEAD_BYTES + 20))
+    for telegram_id in (1, 2):
+        cache.store(telegram_id, _messages(1), cache.begin_load(telegram_id))
+
+    # Act: обращение к 1 делает её свежей, затем добавляется третий пользователь
+    cache.get(1, limit=1)
+    cache.store(3, _messages(1), cache.begin_load(3))
+
+    # Assert
+    assert cache.get(2, limit=1) is None
+    assert cache.get(1, limit=1) is not None
+    assert cache.get(3, limit=1) is not None
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_load_overtaken_by_write_is_not_stored() -> None:
+    """Тест что история, загруженная до записи нового сообщения, не кэшируется."""
+    # Arrange
+    cache = HistoryCache()
+    token = cache.begin_load(1)
+
+    # Act: сообщение закоммичено, пока шла загрузка из БД
+    cache.append(1, "user", "new")
+    stored = cache.store(1, _messages(1), token)
+
+    # Assert
+    assert stored is False
+    assert cache.get(1, limit=20) is None
+
+
+def test_pending_ops_applied_only_on_commit() -> None:
+    """Тест что запись и очистка применяются к кэшу только после коммита."""
+    # Arrange
+    cache = HistoryCache()
+    cache.store(1, _messages(1), cache.begin_load(1))
+    session = Session()
+    session.begin()
+
+    # Act: откаченная транзакция не меняет кэш
+    cache.record_append(session, 1, "user", "rolled back")
+    assert HistoryCache.has_pending(session, 1)
+    session.rollback()
+
+    cache.record_invalidate(session, 1)
+    session.commit()
+
+    # Assert
+    assert cache.get_stats()["total_messages"] == 0
+    assert cache.get(1, limit=20) is None
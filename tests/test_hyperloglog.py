@@ -0,0 +1,77 @@
+"""Тесты для скетча HyperLogLog."""
+
+import pytest
+
+from stats.hyperloglog import HLL_REGISTERS, HyperLogLog
+
+
+def test_empty_sketch_counts_zero() -> None:
+    """Тест что пустой скетч оценивается в ноль."""
+    assert HyperLogLog().count() == 0
+
+
+def test_small_cardinality_is_almost_exact() -> None:
+    """Тест точности на малых множествах (linear counting)."""
+    # Arrange
+    sketch = HyperLogLog()
+
+    # Act: дубликаты не должны увеличивать оценку
+    for user_id in range(1, 51):
+        sketch.add(user_id)
+        sketch.add(user_id)
+
+    # Assert
+    assert abs(sketch.count() - 50) <= 2
+
+
+@pytest.mark.parametrize("cardinality", [1_000, 20_000])
+def test_large_cardinality_within_error_bound(cardinality: int) -> None:
+    """Тест что ошибка не превышает трёх стандартных ошибок (~10%)."""
+    # Arrange
+    sketch = HyperLogLog()
+
+    # Act
+    for user_id in range(cardinality):
+        sketch.add(user_id)
+
+    # Assert
+    relative_error = abs(sketch.count() - cardinality) / cardinality
+    assert relative_error < 0.1
+
+
+def test_merge_estimates_union() -> None:
+    """Тест что объединение скетчей оценивает объединение множеств."""
+    # Arrange: два пересекающихся множества, объединение = 3000
+    first = HyperLogLog()
+    second = HyperLogLog()
+    for user_id in range(0, 2000):
+        first.add(user_id)
+    for user_id in range(1000, 3000):
+        second.add(user_id)
+
+    # Act
+    first.merge(second)
+
+    # Assert
+    assert abs(first.count() - 3000) / 3000 < 0.1
+
+
+def test_serialization_roundtrip() -> None:
+    """Тест сериализации регистров в bytes и обратно."""
+    # Arrange
+    sketch = HyperLogLog()
+    for user_id in range(100):
+        sketch.add(user_id)
+
+    # Act
+    restored = HyperLogLog(sketch.to_bytes())
+
+    # Assert
+    assert len(sketch.to_bytes()) == HLL_REGISTERS
+    assert restored.count() == sketch.count()
+
+
+def test_invalid_size_raises() -> None:
+    """Тест ошибки при неверном размере регистров."""
+    with pytest.raises(ValueError, match="Invalid HyperLogLog size"):
+        HyperLogLog(b"\x00" * 10)
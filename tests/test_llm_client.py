@@ -1,10 +1,55 @@
 """Тесты для LLM клиента."""
 
+import asyncio
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 import pytest
+from openai import APIConnectionError
 
-from llm.llm_client import LLMClient
+from llm.llm_client import LLMClient, StreamedResponse
+
+
+class FakeStream:
+    """Поток фрагментов chat.completions с задержкой перед каждым фрагментом."""
+
+    def __init__(self, deltas: list[str | None], delay: float = 0.0) -> None:
+        self.deltas = deltas
+        self.delay = delay
+        self.closed = False
+
+    def __aiter__(self) -> "FakeStream":
+        return self
+
+    async def __anext__(self) -> SimpleNamespace:
+        if not self.deltas:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        delta = SimpleNamespace(content=self.deltas.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _streaming_client(
+    tmp_path: Path, create: object, timeout: int = 30, first_token_timeout: float | None = None
+) -> LLMClient:
+    """LLMClient с подменённым chat.completions.create."""
+    prompt_file = tmp_path / "system_prompt.txt"
+    prompt_file.write_text("Ты помощник по оценке задач.", encoding="utf-8")
+    client = LLMClient(
+        api_key="test_key",
+        model="test_model",
+        timeout=timeout,
+        system_prompt_path=str(prompt_file),
+        first_token_timeout=first_token_timeout,
+    )
+    client.client = SimpleNamespace(  # type: ignore[assignment]
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    return client
 
 
 def test_load_system_prompt_from_file(tmp_path: Path) -> None:
@@ -77,3 +122,93 @@ def test_load_system_prompt_whitespace_only(tmp_path: Path) -> None:
             timeout=30,
             system_prompt_path=str(prompt_file),
         )
+
+
+async def test_stream_response_yields_deltas_and_assembles_text(tmp_path: Path) -> None:
+    """Тест потокового ответа: фрагменты, итоговый текст и время до первого токена."""
+    # Arrange: первый фрагмент только с ролью (без текста)
+    stream = FakeStream([None, "Насколько ", "понятны ", "требования?"])
+
+    async def create(**kwargs: object) -> FakeStream:
+        assert kwargs["stream"] is True
+        return stream
+
+    client = _streaming_client(tmp_path, create)
+    result = StreamedResponse()
+
+    # Act
+    deltas = [delta async for delta in client.stream_response("Оцени задачу", result=result)]
+
+    # Assert
+    assert deltas == ["Насколько ", "понятны ", "требования?"]
+    assert result.text == "Насколько понятны требования?"
+    assert result.time_to_first_token is not None
+    assert result.elapsed is not None
+    assert result.elapsed >= result.time_to_first_token
+    assert stream.closed
+
+
+async def test_stream_response_first_token_timeout(tmp_path: Path) -> None:
+    """Тест что таймаут первого токена срабатывает раньше общего таймаута."""
+    # Arrange
+    stream = FakeStream(["поздно"], delay=1.0)
+
+    async def create(**kwargs: object) -> FakeStream:
+        return stream
+
+    client = _streaming_client(tmp_path, create, timeout=30, first_token_timeout=0.05)
+
+    # Act & Assert
+    with pytest.raises(TimeoutError, match="Превышено время ожидания"):
+        async for _ in client.stream_response("Оцени задачу"):
+            pass
+    assert stream.closed
+
+
+async def test_stream_response_total_timeout_after_first_token(tmp_path: Path) -> None:
+    """Тест общего таймаута, когда первый токен пришёл вовремя."""
+
+    # Arrange: каждый фрагмент через 0.4 с, общий таймаут 1 с
+    async def create(**kwargs: object) -> FakeStream:
+        return FakeStream(["a", "b", "c", "d"], delay=0.4)
+
+    client = _streaming_client(tmp_path, create, timeout=1, first_token_timeout=0.5)
+    deltas = []
+
+    # Act & Assert
+    with pytest.raises(TimeoutError):
+        async for delta in client.stream_response("Оцени задачу"):
+            deltas.append(delta)
+    assert deltas == ["a", "b"]
+
+
+async def test_stream_response_maps_connection_error(tmp_path: Path) -> None:
+    """Тест преобразования сетевой ошибки API в ConnectionError, как в get_response."""
+
+    # Arrange
+    async def create(**kwargs: object) -> FakeStream:
+        raise APIConnectionError(request=MagicMock())
+
+    client = _streaming_client(tmp_path, create)
+
+    # Act & Assert
+    with pytest.raises(ConnectionError, match="Ошибка сети"):
+        async for _ in client.stream_response("Оцени задачу"):
+            pass
+
+
+async def test_stream_response_empty_stream_raises_runtime_error(tmp_path: Path) -> None:
+    """Тест что поток без текста даёт RuntimeError о пустом ответе, а не «неожиданную ошибку»."""
+    # Arrange: только служебный фрагмент с ролью
+    stream = FakeStream([None])
+
+    async def create(**kwargs: object) -> FakeStream:
+        return stream
+
+    client = _streaming_client(tmp_path, create)
+
+    # Act & Assert
+    with pytest.raises(RuntimeError, match="^LLM returned empty response$"):
+        async for _ in client.stream_response("Оцени задачу"):
+            pass
+    assert stream.closed
@@ -0,0 +1,24 @@
+"""Тесты для курсоров keyset-пагинации истории."""
+
+from datetime import datetime
+
+import pytest
+
+from db.pagination import HistoryCursor
+
+
+def test_cursor_roundtrip() -> None:
+    """Тест что курсор восстанавливается из закодированной строки."""
+    cursor = HistoryCursor(created_at=datetime(2025, 10, 17, 12, 30, 0, 15), id=42)
+
+    encoded = cursor.encode()
+
+    assert "=" not in encoded
+    assert HistoryCursor.decode(encoded) == cursor
+
+
+@pytest.mark.parametrize("value", ["", "not a cursor!", "MjAyNS0xMC0xNw"])
+def test_invalid_cursor_raises_value_error(value: str) -> None:
+    """Тест что повреждённый курсор отклоняется с ValueError."""
+    with pytest.raises(ValueError):
+        HistoryCursor.decode(value)
@@ -0,0 +1,226 @@
+"""Тесты месячных партиций.
+
+Тесты миграции и обслуживания партиций идут на настоящем PostgreSQL и
+пропускаются без него. Адрес сервера задаётся TEST_POSTGRES_URL, например
+postgresql+asyncpg://postgres@localhost:5432/postgres; для каждого теста
+создаётся и удаляется отдельная база.
+"""
+
+import asyncio
+import os
+import uuid
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from alembic.config import Config
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from alembic import command
+from db.models import ChatMessage, ChatSession, Message, User
+from db.partitions import (
+    add_months,
+    detach_partitions_before,
+    ensure_partitions,
+    is_partitioned,
+    legacy_upper_bound,
+    month_start,
+    partition_name,
+)
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+# Ревизия перед партиционированием (e4c8a1f2b937)
+BEFORE_PARTITIONING = "d2e8f5a1c367"
+
+
+def test_add_months_crosses_year_boundary() -> None:
+    """Тест сдвига месяца через границу года в обе стороны."""
+    month = month_start(datetime(2025, 11, 17, 15, 30))
+
+    assert month == datetime(2025, 11, 1)
+    assert add_months(month, 2) == datetime(2026, 1, 1)
+    assert add_months(month, -11) == datetime(2024, 12, 1)
+
+
+def test_partition_name() -> None:
+    """Тест имени партиции таблицы за месяц."""
+    assert partition_name("messages", datetime(2025, 3, 1)) == "messages_p202503"
+
+
+def _alembic(url: str) -> Config:
+    """Конфигурация alembic без настройки логирования из alembic.ini."""
+    config = Config()
+    config.set_main_option("script_location", str(Path(__file__).parent.parent / "alembic"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+async def _execute_autocommit(url: str, statement: str) -> None:
+    """Выполнить служебную команду (CREATE/DROP DATABASE) вне транзакции."""
+    engine = create_async_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text(statement))
+    finally:
+        await engine.dispose()
+
+
+async def _seed(url: str) -> None:
+    """Заполнить непартиционированные таблицы сообщениями за несколько месяцев."""
+    engine = create_async_engine(url)
+    async with AsyncSession(engine) as session:
+        user = User(telegram_id=1, username="user")
+        chat_session = ChatSession(session_id="session")
+        session.add_all([user, chat_session])
+        await session.flush()
+        for month in range(1, 7):
+            created_at = datetime(2025, month, 15)
+            session.add(
+                Message(
+                    user_id=user.id,
+                    role="user",
+                    content="text",
+                    content_length=4,
+                    created_at=created_at,
+                )
+            )
+            session.add(
+                ChatMessage(
+                    session_id=chat_session.id, role="user", content="text", created_at=created_at
+                )
+            )
+        await session.commit()
+    await engine.dispose()
+
+
+@pytest.fixture
+def postgres_url(monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    """Отдельная база PostgreSQL с данными, мигрированная до партиционирования."""
+    if POSTGRES_URL is None:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+
+    server = make_url(POSTGRES_URL)
+    name = f"test_partitions_{uuid.uuid4().hex[:12]}"
+    try:
+        asyncio.run(_execute_autocommit(POSTGRES_URL, f"CREATE DATABASE {name}"))
+    except (OSError, OperationalError) as e:
+        pytest.skip(f"PostgreSQL is unavailable: {e}")
+
+    url = server.set(database=name).render_as_string(hide_password=False)
+    # alembic/env.py берёт адрес из DATABASE_URL
+    monkeypatch.setenv("DATABASE_URL", url)
+    try:
+        command.upgrade(_alembic(url), BEFORE_PARTITIONING)
+        asyncio.run(_seed(url))
+        yield url
+    finally:
+        asyncio.run(_execute_autocommit(POSTGRES_URL, f"DROP DATABASE {name} WITH (FORCE)"))
+
+
+async def _partition_counts(session: AsyncSession, table: str) -> dict[str, int]:
+    """Количество строк таблицы по партициям."""
+    result = await session.execute(
+        text(f"SELECT tableoid::regclass::text, count(*) FROM {table} GROUP BY 1")
+    )
+    return {name: count for name, count in result.all()}
+
+
+def test_migration_attaches_existing_table_as_legacy_partition(postgres_url: str) -> None:
+    """Тест что миграция не копирует строки, а присоединяет таблицу целиком."""
+    # Act
+    command.upgrade(_alembic(postgres_url), "head")
+
+    # Assert
+    async def check() -> None:
+        engine = create_async_engine(postgres_url)
+        async with AsyncSession(engine) as session:
+            assert await is_partitioned(session, "messages")
+            assert await is_partitioned(session, "chat_messages")
+            assert await _partition_counts(session, "messages") == {"messages_legacy": 6}
+            assert await _partition_counts(session, "chat_messages") == {"chat_messages_legacy": 6}
+
+            cutover = await legacy_upper_bound(session, "messages")
+            assert cutover is not None
+            assert cutover > datetime.utcnow()
+
+            # Новые строки идут в месячные партиции, id продолжают последовательность
+            user_id = (await session.execute(select(User.id))).scalar_one()
+            message = Message(
+                user_id=user_id, role="user", content="new", content_length=3, created_at=cutover
+            )
+            session.add(message)
+            await session.flush()
+            assert message.id == 7
+            await session.commit()
+            counts = await _partition_counts(session, "messages")
+            assert counts[partition_name("messages", cutover)] == 1
+        await engine.dispose()
+
+    asyncio.run(check())
+
+    command.downgrade(_alembic(postgres_url), BEFORE_PARTITIONING)
+
+    async def check_downgraded() -> None:
+        engine = create_async_engine(postgres_url)
+        async with AsyncSession(engine) as session:
+            assert not await is_partitioned(session, "messages")
+            assert (await session.execute(select(func.count(Message.id)))).scalar_one() == 7
+        await engine.dispose()
+
+    asyncio.run(check_downgraded())
+
+
+def test_ensure_partitions_moves_rows_out_of_default(postgres_url: str) -> None:
+    """Тест что месяц создаётся, даже если его строки уже лежат в DEFAULT-партиции."""
+    # Arrange
+    command.upgrade(_alembic(postgres_url), "head")
+    now = datetime.utcnow()
+    far_month = add_months(month_start(now), 8)
+
+    async def run() -> None:
+        engine = create_async_engine(postgres_url)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session:
+            user_id = (await session.execute(select(User.id))).scalar_one()
+            session.add(
+                Message(
+                    user_id=user_id,
+                    role="user",
+                    content="far",
+                    content_length=3,
+                    created_at=far_month.replace(day=10),
+                )
+            )
+            await session.commit()
+            assert (await _partition_counts(session, "messages"))["messages_default"] == 1
+
+        # Act
+        async with session_factory() as session:
+            created = await ensure_partitions(session, months_ahead=8, now=now)
+            await session.commit()
+
+        # Assert
+        async with session_factory() as session:
+            assert partition_name("messages", far_month) in created
+            assert partition_name("chat_messages", far_month) in created
+            # Месяцы legacy-партиции не создаются повторно
+            assert partition_name("messages", month_start(now)) not in created
+            counts = await _partition_counts(session, "messages")
+            assert counts[partition_name("messages", far_month)] == 1
+            assert "messages_default" not in counts
+
+            # Legacy-партиция отсоединяется целиком, когда её граница позади
+            cutover = await legacy_upper_bound(session, "messages")
+            assert cutover is not None
+            detached = await detach_partitions_before(session, cutover)
+            await session.commit()
+            assert detached == ["messages_legacy", "chat_messages_legacy"]
+            assert "messages_legacy" not in await _partition_counts(session, "messages")
+        await engine.dispose()
+
+    asyncio.run(run())
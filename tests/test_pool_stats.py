@@ -0,0 +1,67 @@
+"""Тесты для инструментированного пула соединений."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db import database
+from db.pool_stats import PoolStats
+
+
+def test_record_wait_fills_histogram_buckets() -> None:
+    """Тест распределения времени ожидания по корзинам гистограммы."""
+    # Arrange
+    stats = PoolStats()
+
+    # Act
+    stats.record_wait(0.5)
+    stats.record_wait(5)
+    stats.record_wait(70)
+    stats.record_wait(9000)
+
+    # Assert
+    assert stats.wait_histogram == [1, 1, 0, 0, 1, 0, 0, 0, 1]
+    assert stats.max_wait_ms == 9000
+
+
+async def test_pool_stats_count_checkouts_and_timeouts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест учёта выдач соединений и отказов по pool_timeout."""
+    # Arrange: пул из одного соединения без overflow; глобальные объекты восстанавливаются
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    assert database.engine is not None
+    session_factory = async_sessionmaker(database.engine, expire_on_commit=False)
+
+    async def hold(seconds: float) -> None:
+        async with session_factory() as session:
+            await session.execute(text("SELECT 1"))
+            await asyncio.sleep(seconds)
+
+    try:
+        # Act: второй запрос не дожидается единственного соединения
+        results = await asyncio.gather(hold(0.3), hold(0.3), return_exceptions=True)
+        stats = database.get_pool_stats()
+    finally:
+        await database.engine.dispose()
+
+    # Assert
+    assert sum(isinstance(result, PoolTimeoutError) for result in results) == 1
+    assert stats is not None
+    assert stats["size"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["connections_created"] == 1
+    assert stats["checkout_failures"] == 1
+    assert sum(stats["wait_ms_histogram"].values()) == 1
@@ -0,0 +1,49 @@
+"""Тесты для LRU-кэша с записью после коммита."""
+
+from sqlalchemy.orm import Session
+
+from db.post_commit_cache import PostCommitLRUCache
+
+
+def test_lru_evicts_least_recently_used() -> None:
+    """Тест вытеснения самой давно использованной записи."""
+    # Arrange
+    cache: PostCommitLRUCache[str, int] = PostCommitLRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    # Act: обращение к "a" делает её свежей, вытесняется "b"
+    cache.get("a")
+    cache.put("c", 3)
+
+    # Assert
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_pending_entries_applied_only_on_commit() -> None:
+    """Тест что записи транзакции видны только ей и попадают в кэш после коммита."""
+    # Arrange
+    cache: PostCommitLRUCache[str, int] = PostCommitLRUCache()
+    other: PostCommitLRUCache[str, int] = PostCommitLRUCache()
+    session = Session()
+    session.begin()
+
+    # Act: откаченная транзакция не попадает в кэш
+    cache.remember(session, "a", 1)
+    assert cache.lookup(session, "a") == 1
+    assert cache.get("a") is None
+    session.rollback()
+
+    cache.remember(session, "b", 2)
+    cache.remember(session, "c", 3)
+    cache.forget_pending(session, "c")
+    session.commit()
+
+    # Assert
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") is None
+    assert other.lookup(session, "b") is None
@@ -0,0 +1,282 @@
+"""Тесты для RealStatCollector."""
+
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db import database
+from db import repository as repository_module
+from db.models import MessageRollupHourly, MessageRollupHourlyUser
+from db.repository import MessageRepository
+from db.rollup import backfill_rollup
+from db.user_cache import UserIdCache
+from stats.real_collector import RealStatCollector
+
+# Начало диапазона для тестов на SQLite: понедельник
+RANGE_START = datetime(2025, 10, 13)
+RANGE_END = datetime(2025, 10, 27)
+
+
+@pytest.fixture
+async def seeded_sqlite(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    """In-memory SQLite (локальный профиль DATABASE_URL) с ходами 4 пользователей за 2 недели."""
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db("sqlite+aiosqlite://")
+    await database.create_tables()
+    session_factory = database.get_session_factory()
+
+    async with session_factory() as session:
+        repository = MessageRepository(session, user_cache=UserIdCache(), maintain_rollup=True)
+        for day in range(14):
+            for user in range(day % 4 + 1):
+                created_at = RANGE_START + timedelta(days=day, hours=user * 5, minutes=30)
+                await repository.add_turn(
+                    1000 + user, "вопрос", "ответ", username=f"user{user}", created_at=created_at
+                )
+        await session.commit()
+
+    yield session_factory
+    await database.engine.dispose()
+
+
+def test_range_chart_covers_partial_buckets() -> None:
+    """Тест что сетка графика округляет начало вниз, а количество интервалов вверх."""
+    # Arrange
+    start = datetime(2025, 10, 13, 10, 30)
+    end = datetime(2025, 10, 13, 13, 15)
+
+    # Act
+    chart = RealStatCollector._get_range_chart(start, end, "hour")
+
+    # Assert: 10:00, 11:00, 12:00, 13:00
+    assert chart.first_bucket == datetime(2025, 10, 13, 10, 0)
+    assert chart.bucket_count == 4
+
+
+def test_week_buckets_start_on_monday() -> None:
+    """Тест что недельные интервалы начинаются с понедельника, как date_trunc('week')."""
+    # Arrange: 2025-10-16 — четверг
+    start = datetime(2025, 10, 16, 8, 0)
+    end = datetime(2025, 10, 30, 0, 0)
+
+    # Act
+    chart = RealStatCollector._get_range_chart(start, end, "week")
+
+    # Assert
+    assert chart.first_bucket == datetime(2025, 10, 13)
+    assert chart.bucket_count == 3
+
+
+def test_choose_granularity_picks_finest_within_cap() -> None:
+    """Тест автоматического выбора самого мелкого шага в пределах лимита."""
+    start = datetime(2025, 10, 1)
+
+    assert RealStatCollector._choose_granularity(start, datetime(2025, 10, 1, 2), 500) == "minute"
+    assert RealStatCollector._choose_granularity(start, datetime(2025, 10, 8), 500) == "hour"
+    assert RealStatCollector._choose_granularity(start, datetime(2026, 1, 1), 500) == "day"
+
+
+def test_choose_granularity_raises_for_too_long_range() -> None:
+    """Тест ошибки, если даже недельных интервалов больше лимита."""
+    with pytest.raises(ValueError, match="Range is too long"):
+        RealStatCollector._choose_granularity(datetime(2000, 1, 1), datetime(2025, 1, 1), 100)
+
+
+def test_unknown_granularity_raises() -> None:
+    """Тест ошибки при неизвестной гранулярности."""
+    with pytest.raises(ValueError, match="Invalid granularity"):
+        RealStatCollector._get_range_chart(datetime(2025, 1, 1), datetime(2025, 1, 2), "year")
+
+
+async def _range_stats(
+    session_factory: async_sessionmaker[AsyncSession], granularity: str, **options: bool
+) -> tuple:
+    """Сводка и график за RANGE_START..RANGE_END."""
+    async with session_factory() as session:
+        stats = await RealStatCollector(session, **options).get_stats_for_range(
+            RANGE_START, RANGE_END, granularity
+        )
+    return stats.summary, stats.activity_chart
+
+
+async def test_summary_counts_on_sqlite(seeded_sqlite: async_sessionmaker[AsyncSession]) -> None:
+    """Тест метрик сводки одного запроса против посчитанных вручную."""
+    # Act: вторая неделя против первой
+    async with seeded_sqlite() as session:
+        stats = await RealStatCollector(session).get_stats_for_range(
+            RANGE_START + timedelta(days=7), RANGE_END, "day"
+        )
+
+    # Assert: ходов (4+1+2+3+4+1+2) против (1+2+3+4+1+2+3), по 4 пользователя
+    summary = stats.summary
+    assert summary.total_conversations.value == 4
+    assert summary.total_conversations.change_percent == 0.0
+    assert summary.active_users.value == 4
+    # 34 и 32 сообщения на 4 пользователей: целочисленное деление
+    assert summary.avg_conversation_length.value == 8.0
+    assert summary.avg_conversation_length.change_percent == 0.0
+    assert summary.growth_rate.value == 100.0
+
+
+async def test_period_chart_fills_empty_buckets_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест графика периода "day": один GROUP BY, пустые часы заполнены нулями."""
+    # Arrange: 4-й день, ходы пользователей в 00:30, 05:30, 10:30 и 15:30
+    chart = RealStatCollector._get_period_chart("day", datetime(2025, 10, 16, 23, 10))
+
+    # Act
+    async with seeded_sqlite() as session:
+        activity = await RealStatCollector(session)._generate_activity_chart(chart)
+
+    # Assert
+    assert activity.labels == [f"{hour:02d}:00" for hour in range(24)]
+    assert activity.values == [2 if hour in (0, 5, 10, 15) else 0 for hour in range(24)]
+
+
+async def test_parallel_sections_match_sequential_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что секции в отдельных сессиях (asyncio.gather) дают тот же ответ."""
+    # Act
+    async with seeded_sqlite() as session:
+        sequential = await RealStatCollector(session).get_stats_for_range(
+            RANGE_START, RANGE_END, "day"
+        )
+        parallel = await RealStatCollector(
+            session, session_factory=seeded_sqlite, max_concurrency=2
+        ).get_stats_for_range(RANGE_START, RANGE_END, "day")
+
+    # Assert
+    assert parallel == sequential
+    assert len(parallel.top_users) == 4
+
+
+@pytest.mark.parametrize("granularity", ["hour", "day", "week"])
+async def test_rollup_matches_raw_messages_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession], granularity: str
+) -> None:
+    """Тест что агрегат (инкрементальный и после backfill) совпадает с сырыми сообщениями."""
+    # Act
+    raw = await _range_stats(seeded_sqlite, granularity)
+    incremental = await _range_stats(seeded_sqlite, granularity, use_rollup=True)
+    async with seeded_sqlite() as session:
+        await backfill_rollup(session)
+        await session.commit()
+    backfilled = await _range_stats(seeded_sqlite, granularity, use_rollup=True)
+
+    # Assert: 2 сообщения на ход, (1+2+3+4) * 3 + 1 + 2 ходов
+    summary, chart = raw
+    assert sum(chart.values) == 2 * 33
+    assert summary.total_conversations.value == 4
+    assert incremental == raw
+    assert backfilled == raw
+
+
+async def test_rollup_not_maintained_by_default_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что без maintain_rollup запись хода не трогает агрегат."""
+    total = select(func.sum(MessageRollupHourly.message_count))
+    async with seeded_sqlite() as session:
+        before = await session.scalar(total)
+
+        # Act
+        repository = MessageRepository(session, user_cache=UserIdCache())
+        await repository.add_turn(1000, "вопрос", "ответ", created_at=RANGE_START)
+        await session.commit()
+
+        # Assert
+        assert await session.scalar(total) == before
+
+
+async def _rollup_rows(session_factory: async_sessionmaker[AsyncSession]) -> tuple:
+    """Содержимое почасового агрегата и отметок пользователей."""
+    async with session_factory() as session:
+        hourly = await session.execute(
+            select(
+                MessageRollupHourly.bucket_start,
+                MessageRollupHourly.message_count,
+                MessageRollupHourly.distinct_users,
+                MessageRollupHourly.user_message_count,
+                MessageRollupHourly.assistant_message_count,
+                MessageRollupHourly.total_content_length,
+            )
+            .where(MessageRollupHourly.message_count > 0)
+            .order_by(MessageRollupHourly.bucket_start)
+        )
+        users = await session.execute(
+            select(MessageRollupHourlyUser.bucket_start, MessageRollupHourlyUser.user_id).order_by(
+                MessageRollupHourlyUser.bucket_start, MessageRollupHourlyUser.user_id
+            )
+        )
+        return hourly.all(), users.all()
+
+
+async def test_chunked_clear_keeps_rollup_consistent_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест что каждая закоммиченная порция очистки истории согласована с агрегатом."""
+    pauses: list[float] = []
+
+    async def interrupt_once(seconds: float) -> None:
+        pauses.append(seconds)
+        if len(pauses) == 1:
+            raise RuntimeError("очистка прервана")
+
+    # Arrange: порция из 3 сообщений разрывает ход, записанный в один час
+    monkeypatch.setattr(repository_module, "asyncio", SimpleNamespace(sleep=interrupt_once))
+
+    async def rebuild() -> tuple:
+        async with seeded_sqlite() as session:
+            await backfill_rollup(session)
+            await session.commit()
+        return await _rollup_rows(seeded_sqlite)
+
+    async with seeded_sqlite() as session:
+        repository = MessageRepository(session, user_cache=UserIdCache(), maintain_rollup=True)
+
+        # Act: прерываем после первой порции, затем дочищаем
+        with pytest.raises(RuntimeError):
+            await repository.clear_history(1001, chunk_size=3)
+        partial = await _rollup_rows(seeded_sqlite)
+        partial_rebuilt = await rebuild()
+        count = await repository.clear_history(1001, chunk_size=3)
+        cleared = await _rollup_rows(seeded_sqlite)
+
+    # Assert: у пользователя 1 было 3 + 3 + 3 + 1 ходов по 2 сообщения
+    assert partial == partial_rebuilt
+    assert count == 17
+    assert cleared == await rebuild()
+    assert all(row.user_id != 2 for row in cleared[1])
+
+
+async def test_week_chart_buckets_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест недельных интервалов SQLite (неделя с понедельника, как date_trunc)."""
+    # Act
+    _, chart = await _range_stats(seeded_sqlite, "week")
+
+    # Assert
+    assert chart.labels == ["2025-10-13", "2025-10-20"]
+    assert chart.values == [2 * (1 + 2 + 3 + 4 + 1 + 2 + 3), 2 * (4 + 1 + 2 + 3 + 4 + 1 + 2)]
+
+
+async def test_approximate_users_on_sqlite(
+    seeded_sqlite: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что HLL-скетчи в SQLite дают точный счёт для малого числа пользователей."""
+    # Act
+    summary, _ = await _range_stats(seeded_sqlite, "day", use_rollup=True, approximate_users=True)
+
+    # Assert
+    assert summary.total_conversations.value == 4
+    assert summary.active_users.value == 4
@@ -0,0 +1,132 @@
+"""Тесты для маршрутизации чтения на реплику."""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from db import database
+from db.replica import ReplicaRouter
+
+
+class LaggingRouter(ReplicaRouter):
+    """Маршрутизатор с заданным отставанием реплики вместо запроса к БД."""
+
+    lag: float | Exception = 0.0
+    delay = 0.0
+    checks = 0
+
+    async def measure_lag(self) -> float:
+        self.checks += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(self.lag, Exception):
+            raise self.lag
+        return self.lag
+
+
+def _router(check_interval_seconds: float = 0.0) -> LaggingRouter:
+    """Маршрутизатор с отдельными фабриками primary и реплики (без подключения)."""
+    return LaggingRouter(
+        primary=async_sessionmaker(),
+        replica=async_sessionmaker(),
+        max_lag_seconds=5.0,
+        check_interval_seconds=check_interval_seconds,
+    )
+
+
+async def test_lag_guard_falls_back_to_primary() -> None:
+    """Тест переключения на primary при отставании и недоступности реплики."""
+    # Arrange
+    router = _router()
+
+    # Act & Assert: свежая реплика
+    router.lag = 1.0
+    assert await router.get_session_factory() is router.replica
+
+    # Отставание больше допустимого
+    router.lag = 30.0
+    assert await router.get_session_factory() is router.primary
+
+    # Реплика недоступна
+    router.lag = ConnectionError("replica is down")
+    assert await router.get_session_factory() is router.primary
+
+    # Реплика догнала primary
+    router.lag = 0.0
+    assert await router.get_session_factory() is router.replica
+
+    stats = router.get_stats()
+    assert stats["replica_reads"] == 2
+    assert stats["primary_fallbacks"] == 2
+
+
+async def test_lag_checked_once_per_interval() -> None:
+    """Тест что отставание проверяется не чаще check_interval_seconds."""
+    # Arrange
+    router = _router(check_interval_seconds=60.0)
+
+    # Act
+    for _ in range(10):
+        await router.get_session_factory()
+
+    # Assert
+    assert router.checks == 1
+
+
+async def test_hanging_replica_check_times_out_without_blocking_readers() -> None:
+    """Тест что зависшая проверка не держит запросы: они идут на primary."""
+    # Arrange: реплика свежая, но следующая проверка отвечает дольше таймаута
+    router = _router()
+    router.check_timeout_seconds = 0.2
+    assert await router.get_session_factory() is router.replica
+    router.delay = 10.0
+
+    # Act: первый запрос проверяет реплику, второй не ждёт проверки
+    checking = asyncio.create_task(router.get_session_factory())
+    await asyncio.sleep(0)
+    concurrent = await router.get_session_factory()
+    checked = await asyncio.wait_for(checking, timeout=1.0)
+
+    # Assert
+    assert concurrent is router.replica
+    assert checked is router.primary
+    assert router.checks == 2
+    assert router.get_stats()["replica_ok"] is False
+
+
+async def test_read_session_uses_replica_database(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Тест чтения из реплики при init_db с replica_url (SQLite-файлы вместо PostgreSQL)."""
+    # Arrange: в «primary» и «реплике» разные данные
+    urls = {}
+    for name in ("primary", "replica"):
+        urls[name] = f"sqlite+aiosqlite:///{tmp_path / name}.db"
+        setup_engine = create_async_engine(urls[name])
+        async with setup_engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE source (name TEXT)"))
+            await conn.execute(text("INSERT INTO source VALUES (:name)"), {"name": name})
+        await setup_engine.dispose()
+
+    for name in ("engine", "AsyncSessionLocal", "pool_stats", "replica_engine", "replica_router"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db(urls["primary"], replica_url=urls["replica"])
+
+    async def read_source(session_factory: async_sessionmaker) -> str:
+        async with session_factory() as session:
+            return (await session.execute(text("SELECT name FROM source"))).scalar_one()
+
+    try:
+        # Act
+        read_from = await read_source(await database.get_read_session_factory())
+        written_to = await read_source(database.get_session_factory())
+    finally:
+        await database.engine.dispose()
+        await database.replica_engine.dispose()
+
+    # Assert
+    assert read_from == "replica"
+    assert written_to == "primary"
+    assert database.get_replica_stats()["replica_reads"] == 1
@@ -0,0 +1,139 @@
+"""Тесты для архива сообщений и воркера хранения."""
+
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db import database
+from db.models import Message, User
+from db.retention import MessageArchive, RetentionWorker
+
+
+def _rows(first_id: int, count: int) -> list[dict]:
+    """Сгенерировать пачку сообщений."""
+    return [
+        {
+            "id": first_id + i,
+            "user_id": 1,
+            "role": "user",
+            "content": f"Сообщение {i}",
+            "content_length": 11,
+            "created_at": datetime(2025, 1, 1, 12, i),
+            "is_deleted": i == 0,
+        }
+        for i in range(count)
+    ]
+
+
+def test_segments_roundtrip_and_index(tmp_path: Path) -> None:
+    """Тест что сегменты читаются обратно и перечислены в индексе."""
+    # Arrange
+    archive = MessageArchive(tmp_path)
+
+    # Act
+    first = archive.write_segment(_rows(1, 3))
+    archive.write_segment(_rows(10, 2))
+
+    # Assert
+    segments = archive.segments()
+    assert [segment.rows for segment in segments] == [3, 2]
+    assert segments[0] == first
+    assert first.min_created_at == "2025-01-01T12:00:00"
+    assert archive.read_segment(first) == _rows(1, 3)
+
+
+def test_rewritten_segment_is_indexed_once(tmp_path: Path) -> None:
+    """Тест что повторная запись той же пачки не дублирует сегмент в индексе."""
+    archive = MessageArchive(tmp_path)
+
+    archive.write_segment(_rows(1, 3))
+    archive.write_segment(_rows(1, 3))
+
+    assert len(archive.segments()) == 1
+
+
+def test_corrupted_segment_raises_value_error(tmp_path: Path) -> None:
+    """Тест проверки контрольной суммы сегмента."""
+    # Arrange
+    archive = MessageArchive(tmp_path)
+    segment = archive.write_segment(_rows(1, 3))
+    (tmp_path / segment.name).write_bytes(b"broken")
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        archive.read_segment(segment)
+
+
+@pytest.fixture
+async def sqlite_factory(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    """In-memory SQLite с пользователем и пятью сообщениями."""
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db("sqlite+aiosqlite://")
+    await database.create_tables()
+    session_factory = database.get_session_factory()
+
+    now = datetime.utcnow()
+    async with session_factory() as session:
+        user = User(telegram_id=1000, username="alice")
+        session.add(user)
+        await session.flush()
+        # id 1-2 устарели, id 3 удалён, id 4-5 живые и свежие
+        for number, (age_days, is_deleted) in enumerate(
+            [(40, False), (35, False), (1, True), (1, False), (0, False)], start=1
+        ):
+            session.add(
+                Message(
+                    id=number,
+                    user_id=user.id,
+                    role="user",
+                    content=f"Сообщение {number}",
+                    content_length=11,
+                    created_at=now - timedelta(days=age_days),
+                    is_deleted=is_deleted,
+                )
+            )
+        await session.commit()
+
+    yield session_factory
+    await database.engine.dispose()
+
+
+async def _messages(session_factory: async_sessionmaker[AsyncSession]) -> list[tuple[int, str]]:
+    """(id, content) сообщений в БД по возрастанию id."""
+    async with session_factory() as session:
+        result = await session.execute(select(Message.id, Message.content).order_by(Message.id))
+        return [(row.id, row.content) for row in result]
+
+
+async def test_archive_and_restore_roundtrip_on_sqlite(
+    sqlite_factory: async_sessionmaker[AsyncSession], tmp_path: Path
+) -> None:
+    """Тест что архивированные пачками сообщения удаляются и восстанавливаются без дублей."""
+    # Arrange
+    before = await _messages(sqlite_factory)
+    worker = RetentionWorker(
+        sqlite_factory, MessageArchive(tmp_path), retention_days=30, batch_size=2
+    )
+
+    # Act
+    archived = await worker.run_once()
+
+    # Assert: устаревшие и удалённые ушли в два сегмента, живые остались
+    assert archived == 3
+    assert [segment.rows for segment in worker.archive.segments()] == [2, 1]
+    assert await _messages(sqlite_factory) == before[3:]
+
+    # Act: повторное восстановление не дублирует строки
+    restored = await worker.restore()
+    restored_again = await worker.restore()
+
+    # Assert
+    assert restored == restored_again == 3
+    assert await _messages(sqlite_factory) == before
@@ -0,0 +1,106 @@
+"""Тесты для фонового воркера снапшотов статистики."""
+
+import json
+
+import pytest
+
+from stats.mock_collector import MockStatCollector
+from stats.snapshot_worker import StatsSnapshotWorker
+
+
+class FakeClock:
+    """Управляемые часы для тестов возраста снапшотов."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    """Фикстура с управляемыми часами."""
+    return FakeClock()
+
+
+async def test_refresh_all_stores_serialized_json(clock: FakeClock) -> None:
+    """Тест что после пересчёта для каждого периода есть готовый JSON."""
+    # Arrange
+    mock_collector = MockStatCollector()
+
+    async def loader(period: str):  # type: ignore[no-untyped-def]
+        return mock_collector.get_stats(period)
+
+    worker = StatsSnapshotWorker(loader=loader, interval_seconds=60, clock=clock)
+
+    # Act
+    await worker.refresh_all()
+    clock.now = 12.5
+
+    # Assert
+    for period in ["day", "week", "month"]:
+        snapshot = worker.get_snapshot(period)
+        assert snapshot is not None
+        body, age = snapshot
+        assert json.loads(body)["period"] == period
+        assert age == 12.5
+
+
+async def test_snapshot_older_than_budget_is_not_served(clock: FakeClock) -> None:
+    """Тест что снапшот старше max_age_seconds не отдаётся."""
+    # Arrange
+    mock_collector = MockStatCollector()
+
+    async def loader(period: str):  # type: ignore[no-untyped-def]
+        return mock_collector.get_stats(period)
+
+    worker = StatsSnapshotWorker(
+        loader=loader, interval_seconds=60, max_age_seconds=120, clock=clock
+    )
+    await worker.refresh_all()
+
+    # Act
+    clock.now = 121
+
+    # Assert
+    assert worker.get_snapshot("day") is None
+
+
+async def test_failed_period_keeps_previous_snapshot(clock: FakeClock) -> None:
+    """Тест что ошибка пересчёта одного периода не затирает его старый снапшот."""
+    # Arrange
+    mock_collector = MockStatCollector()
+    failing = False
+
+    async def loader(period: str):  # type: ignore[no-untyped-def]
+        if failing and period == "week":
+            raise ConnectionError("Database unavailable")
+        return mock_collector.get_stats(period)
+
+    worker = StatsSnapshotWorker(loader=loader, interval_seconds=60, clock=clock)
+    await worker.refresh_all()
+
+    # Act
+    failing = True
+    clock.now = 30
+    await worker.refresh_all()
+
+    # Assert
+    week_snapshot = worker.get_snapshot("week")
+    day_snapshot = worker.get_snapshot("day")
+    assert week_snapshot is not None and week_snapshot[1] == 30
+    assert day_snapshot is not None and day_snapshot[1] == 0
+
+
+def test_missing_snapshot_returns_none(clock: FakeClock) -> None:
+    """Тест что до первого пересчёта снапшотов нет."""
+
+    # Arrange
+    async def loader(period: str):  # type: ignore[no-untyped-def]
+        raise AssertionError("loader should not be called")
+
+    worker = StatsSnapshotWorker(loader=loader, interval_seconds=60, clock=clock)
+
+    # Act & Assert
+    assert worker.get_snapshot("day") is None
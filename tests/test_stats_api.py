@@ -0,0 +1,69 @@
+"""Тесты conditional GET для /api/v1/stats."""
+
+import hashlib
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import stats_api
+from api.models import StatsResponse
+from config.settings import Settings
+from stats.cached_collector import CachedStatCollector
+from stats.mock_collector import MockStatCollector
+
+
+@pytest.fixture
+def cached_client(monkeypatch: pytest.MonkeyPatch) -> tuple[TestClient, CachedStatCollector]:
+    """Клиент API статистики с включённым кэшем и ETag."""
+    seeds = iter(range(100))
+
+    async def load(period: str) -> StatsResponse:
+        return MockStatCollector(seed=next(seeds)).get_stats(period)
+
+    async def no_version(period: str) -> str:
+        raise AssertionError("версия данных не нужна, когда ответ идёт из кэша")
+
+    cache = CachedStatCollector(loader=load, ttl_seconds=60)
+
+    async def collector() -> AsyncIterator[CachedStatCollector]:
+        yield cache
+
+    settings = Settings(  # type: ignore[call-arg]
+        telegram_bot_token="token", openrouter_api_key="key", stats_cache_ttl_seconds=60
+    )
+    monkeypatch.setattr(stats_api, "compute_stats_version", no_version)
+
+    app = FastAPI()
+    app.include_router(stats_api.router)
+    app.dependency_overrides[stats_api.get_stat_collector] = collector
+    app.dependency_overrides[stats_api.get_settings] = lambda: settings
+    app.dependency_overrides[stats_api.get_stats_snapshots] = lambda: None
+    return TestClient(app), cache
+
+
+def test_cached_etag_describes_served_body(
+    cached_client: tuple[TestClient, CachedStatCollector],
+) -> None:
+    """Тест что ETag из кэша считается по отданному телу и меняется вместе с ним."""
+    client, cache = cached_client
+
+    # Act
+    first = client.get("/api/v1/stats", params={"period": "week"})
+    repeated = client.get(
+        "/api/v1/stats", params={"period": "week"}, headers={"If-None-Match": first.headers["ETag"]}
+    )
+    cache.invalidate()
+    recomputed = client.get(
+        "/api/v1/stats", params={"period": "week"}, headers={"If-None-Match": first.headers["ETag"]}
+    )
+
+    # Assert
+    assert first.status_code == 200
+    assert first.headers["ETag"] == f'"{hashlib.sha1(first.content).hexdigest()}"'
+    assert "Last-Modified" not in first.headers
+    assert repeated.status_code == 304
+    assert recomputed.status_code == 200
+    assert recomputed.headers["ETag"] == f'"{hashlib.sha1(recomputed.content).hexdigest()}"'
+    assert recomputed.headers["ETag"] != first.headers["ETag"]
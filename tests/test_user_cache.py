@@ -0,0 +1,97 @@
+"""Тесты для кэша telegram_id → users.id в MessageRepository."""
+
+from collections.abc import AsyncIterator
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db import database
+from db.models import User
+from db.repository import MessageRepository
+from db.user_cache import UserIdCache
+
+
+@pytest.fixture
+async def sqlite_factory(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    """Пустая in-memory SQLite."""
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db("sqlite+aiosqlite://")
+    await database.create_tables()
+    yield database.get_session_factory()
+    await database.engine.dispose()
+
+
+async def _resolve(
+    session_factory: async_sessionmaker[AsyncSession], cache: UserIdCache, username: str
+) -> int:
+    """ID пользователя 1000 через репозиторий с данным кэшем (с коммитом)."""
+    async with session_factory() as session:
+        user_id = await MessageRepository(session, user_cache=cache).get_or_create_user_id(
+            1000, username
+        )
+        await session.commit()
+    return user_id
+
+
+async def _is_deleted(session_factory: async_sessionmaker[AsyncSession]) -> bool:
+    """Флаг is_deleted пользователя 1000."""
+    async with session_factory() as session:
+        return bool(await session.scalar(select(User.is_deleted).where(User.telegram_id == 1000)))
+
+
+async def test_username_change_is_a_miss(
+    sqlite_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что смена username приводит к промаху и upsert той же строки."""
+    # Arrange
+    cache = UserIdCache()
+    user_id = await _resolve(sqlite_factory, cache, "alice")
+
+    # Act
+    renamed_id = await _resolve(sqlite_factory, cache, "alice_new")
+
+    # Assert
+    assert renamed_id == user_id
+    assert cache.get(1000) == (user_id, "alice_new")
+
+
+async def test_cache_hit_skips_soft_delete_from_another_process(
+    sqlite_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что попадание в кэш возвращает ID пользователя, удалённого другим процессом."""
+    # Arrange: у каждого процесса свой кэш
+    cache = UserIdCache()
+    user_id = await _resolve(sqlite_factory, cache, "alice")
+    async with sqlite_factory() as session:
+        assert await MessageRepository(session, user_cache=UserIdCache()).delete_user(1000)
+        await session.commit()
+
+    # Act
+    cached_id = await _resolve(sqlite_factory, cache, "alice")
+
+    # Assert: кэш не читает is_deleted, пользователь остаётся удалённым
+    assert cached_id == user_id
+    assert await _is_deleted(sqlite_factory)
+
+
+async def test_upsert_restores_soft_deleted_user(
+    sqlite_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что upsert при промахе кэша восстанавливает soft-deleted пользователя."""
+    # Arrange
+    cache = UserIdCache()
+    user_id = await _resolve(sqlite_factory, cache, "alice")
+    async with sqlite_factory() as session:
+        assert await MessageRepository(session, user_cache=cache).delete_user(1000)
+        await session.commit()
+
+    # Act: delete_user сбросил запись кэша, поэтому выполняется upsert
+    restored_id = await _resolve(sqlite_factory, cache, "alice")
+
+    # Assert
+    assert restored_id == user_id
+    assert not await _is_deleted(sqlite_factory)
@@ -0,0 +1,215 @@
+"""Тесты для очереди отложенной записи ходов диалога."""
+
+from collections.abc import AsyncIterator
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db import database
+from db.repository import ChatRepository, MessageRepository
+from db.write_behind import PendingTurn, WriteBehindQueue, persist_turns
+
+
+def _turn(key: int, text: str = "hello") -> PendingTurn:
+    """Создать ход диалога бота."""
+    return PendingTurn(
+        kind="message",
+        key=key,
+        user_content=text,
+        assistant_content=f"re: {text}",
+        created_at=datetime(2025, 10, 17, 12, 0),
+    )
+
+
+@pytest.fixture
+async def sqlite_factory(
+    monkeypatch: pytest.MonkeyPatch,
+) -> AsyncIterator[async_sessionmaker[AsyncSession]]:
+    """Пустая in-memory SQLite."""
+    for name in ("engine", "AsyncSessionLocal", "pool_stats"):
+        monkeypatch.setattr(database, name, getattr(database, name))
+    database.init_db("sqlite+aiosqlite://")
+    await database.create_tables()
+    yield database.get_session_factory()
+    await database.engine.dispose()
+
+
+class FakeWriter:
+    """Запись в "БД" с возможностью имитировать недоступность."""
+
+    def __init__(self) -> None:
+        self.batches: list[list[PendingTurn]] = []
+        self.available = True
+
+    async def __call__(self, turns: list[PendingTurn]) -> None:
+        if not self.available:
+            raise ConnectionError("Database unavailable")
+        self.batches.append(list(turns))
+
+
+async def test_stop_drains_queue_in_batches() -> None:
+    """Тест что при остановке все ходы записываются пачками не больше batch_size."""
+    # Arrange
+    writer = FakeWriter()
+    queue = WriteBehindQueue(writer, batch_size=2, flush_interval_seconds=10)
+    queue.start()
+
+    # Act
+    for i in range(5):
+        await queue.enqueue(_turn(i))
+    await queue.stop()
+
+    # Assert
+    assert [len(batch) for batch in writer.batches] == [2, 2, 1]
+    assert queue.get_stats()["flushed_total"] == 5
+    assert queue.depth == 0
+
+
+async def test_wait_flushed_returns_after_write() -> None:
+    """Тест read-your-writes: ожидание завершается после записи хода."""
+    # Arrange
+    writer = FakeWriter()
+    queue = WriteBehindQueue(writer, batch_size=10, flush_interval_seconds=0.01)
+    queue.start()
+
+    # Act
+    await queue.enqueue(_turn(42))
+    await queue.wait_flushed("message", 42)
+
+    # Assert
+    assert writer.batches == [[_turn(42)]]
+    await queue.stop()
+
+
+async def test_failed_batch_is_spooled_and_replayed(tmp_path: Path) -> None:
+    """Тест что при недоступной БД ходы попадают в spool и дописываются позже."""
+    # Arrange
+    writer = FakeWriter()
+    writer.available = False
+    spool_path = tmp_path / "spool.jsonl"
+    queue = WriteBehindQueue(
+        writer, batch_size=10, flush_interval_seconds=0.01, spool_path=spool_path
+    )
+    queue.start()
+
+    # Act: первая пачка уходит в spool, вторая — после восстановления БД
+    await queue.enqueue(_turn(1, "lost?"))
+    await queue.wait_flushed("message", 1)
+    assert spool_path.exists()
+
+    writer.available = True
+    await queue.enqueue(_turn(2))
+    await queue.stop()
+
+    # Assert
+    written = [turn for batch in writer.batches for turn in batch]
+    assert _turn(1, "lost?") in written
+    assert _turn(2) in written
+    assert not spool_path.exists()
+    assert queue.get_stats()["spooled_total"] == 1
+
+
+def test_pending_turn_json_roundtrip() -> None:
+    """Тест сериализации хода для spool-файла."""
+    turn = _turn(7, "Привет")
+
+    assert PendingTurn.from_json(turn.to_json()) == turn
+
+
+async def test_truncated_spool_line_is_moved_aside(tmp_path: Path) -> None:
+    """Тест что недописанная строка spool не блокирует повтор остальных ходов."""
+    # Arrange: процесс упал посреди записи второй строки
+    spool_path = tmp_path / "spool.jsonl"
+    truncated = _turn(2).to_json()[:25]
+    spool_path.write_text(_turn(1).to_json() + "\n" + truncated, encoding="utf-8")
+    writer = FakeWriter()
+    queue = WriteBehindQueue(writer, batch_size=10, spool_path=spool_path)
+
+    # Act: новый ход дописывается с новой строки и повторяется вместе с первым
+    await queue._spool([_turn(3)])
+    written = await queue.replay_spool()
+
+    # Assert
+    assert written == 2
+    assert writer.batches == [[_turn(1), _turn(3)]]
+    assert not spool_path.exists()
+    rejected_path = tmp_path / "spool.jsonl.rejected"
+    assert rejected_path.read_text(encoding="utf-8") == truncated + "\n"
+    assert queue.get_stats()["rejected_total"] == 1
+
+
+async def test_failing_spool_batch_is_parked(tmp_path: Path) -> None:
+    """Тест что пачка, не записанная max_replay_attempts раз подряд, откладывается."""
+
+    # Arrange: ход 1 не записывается никогда, ход 2 — без ошибок
+    async def writer(turns: list[PendingTurn]) -> None:
+        if _turn(1) in turns:
+            raise ValueError("violates foreign key constraint")
+        written.extend(turns)
+
+    written: list[PendingTurn] = []
+    spool_path = tmp_path / "spool.jsonl"
+    queue = WriteBehindQueue(writer, batch_size=1, spool_path=spool_path, max_replay_attempts=3)
+    await queue._spool([_turn(1), _turn(2)])
+
+    # Act
+    attempts = [await queue.replay_spool() for _ in range(3)]
+
+    # Assert: две неудачи оставляют spool как есть, третья откладывает пачку
+    assert attempts == [0, 0, 1]
+    assert written == [_turn(2)]
+    assert not spool_path.exists()
+    rejected = (tmp_path / "spool.jsonl.rejected").read_text(encoding="utf-8").splitlines()
+    assert [PendingTurn.from_json(line) for line in rejected] == [_turn(1)]
+
+
+async def test_worker_survives_unexpected_error() -> None:
+    """Тест что неожиданная ошибка шага воркера логируется, а воркер продолжает работу."""
+    # Arrange: без spool ошибка записи уходит в _spool, который здесь падает
+    writer = FakeWriter()
+    writer.available = False
+    queue = WriteBehindQueue(writer, batch_size=1, flush_interval_seconds=0.01)
+
+    async def broken_spool(batch: list[PendingTurn]) -> None:
+        raise RuntimeError("spool is broken")
+
+    queue._spool = broken_spool  # type: ignore[method-assign]
+    queue.start()
+
+    # Act
+    await queue.enqueue(_turn(1))
+    await queue.wait_flushed("message", 1)
+    writer.available = True
+    await queue.enqueue(_turn(2))
+    await queue.stop()
+
+    # Assert
+    assert writer.batches == [[_turn(2)]]
+
+
+async def test_clear_history_removes_queued_turns(
+    sqlite_factory: async_sessionmaker[AsyncSession],
+) -> None:
+    """Тест что очистка истории удаляет и ходы, ещё не записанные из очереди."""
+    # Arrange: интервал больше времени очистки, ход ещё в очереди
+    queue = WriteBehindQueue(partial(persist_turns, sqlite_factory), flush_interval_seconds=0.2)
+    queue.start()
+    async with sqlite_factory() as session:
+        messages = MessageRepository(session, write_behind=queue)
+        chats = ChatRepository(session, write_behind=queue)
+        await messages.add_turn(1000, "hello", "re: hello", username="alice")
+        await chats.add_chat_turn("session-1", "hello", "re: hello")
+
+        # Act
+        cleared_messages = await messages.clear_history(1000)
+        cleared_chat = await chats.clear_chat_history("session-1")
+
+        # Assert
+        assert cleared_messages == 2
+        assert cleared_chat == 2
+        assert await messages.get_history(1000) == []
+        assert await chats.get_chat_history("session-1") == []
+    await queue.stop()